@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark article extraction: the previous whole-page parser against parse_article_html
+"""
+import argparse
+import time
+
+from bs4 import BeautifulSoup
+
+from fixtures import load_html_fixtures
+from news_scraper.scrapers.extraction import parse_article_html
+
+
+def legacy_extract(html):
+    """Extraction as previously done in NewsScraper.extract_article"""
+    soup = BeautifulSoup(html, 'html.parser')
+    title_elem = soup.find('h1')
+    heading = title_elem.get_text().strip() if title_elem else "No heading found"
+    article_body = soup.find('article') or soup.find('main')
+    if article_body:
+        text_blocks = article_body.find_all(['div', 'p'])
+        content = ' '.join(block.get_text().strip() for block in text_blocks if block.get_text().strip())
+    else:
+        paragraphs = soup.find_all('p')
+        content = ' '.join(p.get_text().strip() for p in paragraphs if p.get_text().strip())
+    return heading, content
+
+
+def run(name, extract, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, html in pages:
+            heading, content = extract(html)
+    elapsed = time.perf_counter() - start
+    total_chars = sum(len(extract(html)[1]) for _, html in pages)
+    count = len(pages) * repeat
+    print(f"{name:<10} {count / elapsed:8.1f} pages/s  {elapsed / count * 1000:7.2f} ms/page  "
+          f"{total_chars / len(pages):9.0f} content chars/page")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--html-dir', help='directory of saved article .html pages (default: rendered from data/)')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    pages = load_html_fixtures(args.html_dir)
+    print(f"Extracting {len(pages)} pages x {args.repeat}")
+    run('legacy', legacy_extract, pages, args.repeat)
+    run('targeted', parse_article_html, pages, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
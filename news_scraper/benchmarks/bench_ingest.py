@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Benchmark article preparation: one article at a time against the batched path
+"""
+import argparse
+import tempfile
+import time
+
+from fixtures import StubModels, scaled_articles
+from news_scraper.db.backends import LocalIndex
+from news_scraper.db.vector_store import VectorDBStorage
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--articles', type=int, default=64)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--summary-batch-size', type=int, default=8)
+    parser.add_argument('--skip-sequential', action='store_true', help='only time the batched path')
+    parser.add_argument('--stand-in-models', action='store_true',
+                        help='use the hash embedder and lead summarizer stand-ins, timing only the code around the models')
+    args = parser.parse_args()
+
+    # Preparation never touches the index; a throwaway local one avoids Pinecone
+    store = VectorDBStorage(backend=LocalIndex(tempfile.mkdtemp()),
+                            models=StubModels() if args.stand_in_models else None)
+    articles = scaled_articles(args.articles)
+
+    # Load both models up front so neither run pays for it
+    store.prepare_article_vectors(articles[:2])
+
+    if not args.skip_sequential:
+        start = time.perf_counter()
+        for article in articles:
+            store.prepare_article_vector(article)
+        sequential = time.perf_counter() - start
+        print(f"sequential {len(articles) / sequential:8.2f} articles/s  ({sequential:.1f}s)")
+
+    start = time.perf_counter()
+    store.prepare_article_vectors(articles, batch_size=args.batch_size,
+                                  summary_batch_size=args.summary_batch_size)
+    batched = time.perf_counter() - start
+    print(f"batched    {len(articles) / batched:8.2f} articles/s  ({batched:.1f}s)")
+
+    if not args.skip_sequential:
+        print(f"speedup    {sequential / batched:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the scrape, ingest and search hot paths, compared against
+a baseline recorded on the same machine
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from fixtures import StubModels, load_saved_articles, render_article_html, scaled_articles, serve_pages
+from news_scraper.db.article_store import ArticleWriter
+from news_scraper.db.backends import LocalIndex
+from news_scraper.db.vector_store import VectorDBStorage
+from news_scraper.models import registry
+from news_scraper.scrapers.bbc_scraper import EXTRA_STOP_WORDS, NewsScraper, load_stop_words
+from news_scraper.search.news_search import NewsSearch
+
+# Machine specific, so recorded locally with --update-baseline and never committed
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+class Suite:
+    """
+    Builds the inputs for each stage. Every stage returns (call, items) from a
+    fresh setup so the timed pass and the memory pass start from the same state.
+    The scraper is stateless between calls, so one is shared by every pass;
+    its stopwords are loaded up front without downloading, leaving network
+    access and NLTK's loading out of the timings.
+    """
+
+    def __init__(self, base_url, scale, queries, models):
+        self.base_url = base_url
+        self.models = models
+        base = load_saved_articles()
+        self.articles = scaled_articles(len(base) * scale)
+        self.queries = [article['heading'] for article in base if article['heading']][:queries]
+        self.workdir = tempfile.mkdtemp()
+        self.scraper = NewsScraper(base_url, delay=0, max_workers=1)
+        try:
+            self.scraper._stop_words = load_stop_words(download=False)
+        except LookupError:
+            print("NLTK stopwords are not installed; keyword extraction uses the built-in list only")
+            self.scraper._stop_words = set(EXTRA_STOP_WORDS)
+
+    def _storage(self):
+        return VectorDBStorage(backend=LocalIndex(tempfile.mkdtemp(dir=self.workdir)), models=self.models)
+
+    def extract_article(self):
+        urls = [self.base_url + link['href'] for link in self.scraper.get_soup(self.base_url).find_all('a')]
+        return self.scraper.extract_article, urls
+
+    def extract_keywords_simple(self):
+        items = [(article['content'], article['heading']) for article in self.articles]
+        return lambda item: self.scraper.extract_keywords_simple(*item), items
+
+    def prepare_article_vector(self):
+        return self._storage().prepare_article_vector, self.articles
+
+    def store_articles(self, files=8):
+        """One call per articles file, each holding an equal share of the scaled corpus"""
+        paths = []
+        per_file = max(1, len(self.articles) // files)
+        for i in range(0, len(self.articles), per_file):
+            path = os.path.join(tempfile.mkdtemp(dir=self.workdir), 'news_articles.jsonl')
+            with ArticleWriter(path) as writer:
+                for article in self.articles[i:i + per_file]:
+                    writer.write(article)
+            paths.append(path)
+        return self._storage().store_articles, paths
+
+    def search(self):
+        """Uncached searches against an index holding the scaled corpus"""
+        storage = self._storage()
+        with contextlib.redirect_stdout(io.StringIO()):
+            storage.upsert_vectors(storage.backend, storage.prepare_article_vectors(self.articles))
+        search = NewsSearch(models=self.models, backend=storage.backend,
+                            embedding_cache_size=0, result_cache_ttl=0)
+        return search.search, self.queries
+
+
+STAGES = ['extract_article', 'extract_keywords_simple', 'prepare_article_vector', 'store_articles', 'search']
+
+
+def measure(setup, repeat=7, min_seconds=2.0, max_passes=50):
+    """
+    Time each call of a stage after a warm-up call over at least repeat passes
+    (more for quick stages, until min_seconds have been spent timing, up to
+    max_passes), then run it once more under tracemalloc for the peak memory;
+    each pass gets a fresh setup. Throughput and latencies are the median
+    over passes, so one slow or unusually fast pass does not move them, and
+    spread is the interquartile range of pass times relative to their median.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        call, items = setup()
+        call(items[0])
+        elapsed, percentiles = [], []
+        while len(elapsed) < repeat or (sum(elapsed) < min_seconds and len(elapsed) < max_passes):
+            call, items = setup()
+            run_latencies = []
+            start = time.perf_counter()
+            for item in items:
+                item_start = time.perf_counter()
+                call(item)
+                run_latencies.append(time.perf_counter() - item_start)
+            elapsed.append(time.perf_counter() - start)
+            percentiles.append(np.percentile(np.asarray(run_latencies) * 1000, [50, 95, 99]))
+
+        call, items = setup()
+        tracemalloc.start()
+        for item in items:
+            call(item)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    p50, p95, p99 = np.median(percentiles, axis=0)
+    q1, median, q3 = np.percentile(elapsed, [25, 50, 75])
+    return {
+        'items': len(items),
+        'passes': len(elapsed),
+        'spread': round(float((q3 - q1) / median), 3),
+        'throughput': round(len(items) / float(median), 2),
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'peak_memory_mb': round(peak / 2 ** 20, 2),
+    }
+
+
+def calibrate(repeat=100):
+    """
+    Machine speed score: passes per second of a fixed mix of Python string
+    work and small NumPy products like the stages'. Runs are short and the
+    best of repeat is kept, so brief load from other processes is ignored.
+    """
+    text = ' '.join(f'word{i % 97} Token{i % 13}.' for i in range(2000))
+    matrix = np.random.default_rng(0).standard_normal((256, 384)).astype(np.float32)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(2):
+            counts = {}
+            for token in text.lower().split():
+                counts[token.strip('.')] = counts.get(token.strip('.'), 0) + 1
+            (matrix @ matrix.T).argmax(axis=1)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(2 / best, 2)
+
+
+def compare(results, baseline, tolerance, speed=1.0):
+    """
+    Print each stage next to its baseline and return the stages that regressed:
+    throughput or median latency worse by more than the stage's band, which is
+    tolerance widened by the larger spread of the two runs so stages whose
+    passes vary a lot are not flagged on noise. The baseline is first scaled
+    by speed, this machine's calibration score relative to the baseline's, so
+    a slower or busier machine is not reported as a regression. Tail
+    latencies are shown but not gated on, since they are too noisy on shared
+    machines.
+    """
+    regressions = []
+    print(f"\n{'stage':<24} {'throughput':>12} {'vs base':>9} {'p50 ms':>9} {'vs base':>9} {'p95 ms':>9} {'vs base':>9} "
+          f"{'band':>7}")
+    for stage, result in results.items():
+        base = baseline.get(stage)
+        if base is None:
+            print(f"{stage:<24} {result['throughput']:>12.2f} {'-':>9} {result['p50_ms']:>9.3f} {'-':>9} "
+                  f"{result['p95_ms']:>9.3f} {'-':>9} {'-':>7}")
+            continue
+        band = tolerance + max(result.get('spread', 0.0), base.get('spread', 0.0))
+        expected = {'throughput': base['throughput'] * speed,
+                    'p50_ms': base['p50_ms'] / speed, 'p95_ms': base['p95_ms'] / speed}
+        changes = {}
+        for key, value in expected.items():
+            changes[key] = result[key] / value - 1 if value else 0.0
+        regressed = changes['throughput'] < -band or changes['p50_ms'] > band
+        if regressed:
+            regressions.append(stage)
+        print(f"{stage:<24} {result['throughput']:>12.2f} {changes['throughput']:>+9.1%} "
+              f"{result['p50_ms']:>9.3f} {changes['p50_ms']:>+9.1%} "
+              f"{result['p95_ms']:>9.3f} {changes['p95_ms']:>+9.1%} {band:>7.0%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=4, help='copies of the saved corpus to ingest and search')
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--repeat', type=int, default=7,
+                        help='minimum timed passes per stage; the median pass is reported')
+    parser.add_argument('--real-models', action='store_true',
+                        help='use the real models (cached locally by sentence-transformers) instead of stand-ins')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true', help='save these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.35,
+                        help='relative throughput drop or median latency rise that counts as a regression, '
+                             'widened per stage by the spread of its timed passes')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    calibration = calibrate()
+    pages = {f'/news/articles/{i}': render_article_html(article)
+             for i, article in enumerate(load_saved_articles())}
+    results = {}
+    with serve_pages(pages) as base_url:
+        suite = Suite(base_url, args.scale, args.queries, registry if args.real_models else StubModels())
+        for stage in args.stages:
+            results[stage] = measure(getattr(suite, stage), args.repeat)
+            result = results[stage]
+            print(f"{stage:<24} {result['items']:>6} items  {result['throughput']:>10.2f}/s  "
+                  f"p50 {result['p50_ms']:.3f}  p95 {result['p95_ms']:.3f}  p99 {result['p99_ms']:.3f} ms  "
+                  f"peak {result['peak_memory_mb']:.2f} MB")
+    # Calibrating on both sides of the stages evens out load that came and went
+    calibration = max(calibration, calibrate())
+    print(f"{'calibration':<24} {calibration:>10.2f} passes/s")
+
+    report = {
+        'python': platform.python_version(),
+        'scale': args.scale,
+        'real_models': args.real_models,
+        'calibration': calibration,
+        'stages': results,
+    }
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("\nNo baseline to compare against; run with --update-baseline to save one")
+        return
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if (baseline.get('scale'), baseline.get('real_models')) != (args.scale, args.real_models):
+        print("\nWarning: baseline was recorded with different --scale or models; comparison is indicative only")
+    speed = calibration / baseline['calibration'] if baseline.get('calibration') else 1.0
+    if abs(speed - 1) > 0.1:
+        print(f"\nThis machine calibrates at {speed:.2f}x the baseline's speed; baseline figures are scaled to match")
+    regressions = compare(results, baseline['stages'], args.tolerance, speed)
+    if regressions:
+        print(f"\nRegressed beyond their band: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
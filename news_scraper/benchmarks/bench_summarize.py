@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark summarizers on the saved articles: throughput and summary length
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from fixtures import load_saved_articles
+from news_scraper.db.backends import LocalIndex
+from news_scraper.db.vector_store import VectorDBStorage
+from news_scraper.summarizers import AbstractiveSummarizer, ExtractiveSummarizer, SummaryCache
+
+
+def run(name, summarizer, texts, batch_size):
+    """Summarize texts once and report articles per second and mean summary length"""
+    start = time.perf_counter()
+    summaries = summarizer.summarize(texts, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    words = sum(len(summary.split()) for summary in summaries) / max(len(summaries), 1)
+    print(f"{name:18} {len(texts) / elapsed:10.2f} articles/s  {words:6.1f} words/summary  ({elapsed:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--minilm', action='store_true', help='also time TextRank over MiniLM sentence embeddings')
+    parser.add_argument('--abstractive', action='store_true', help='also time the BART model (slow)')
+    args = parser.parse_args()
+
+    texts = [article['content'] for article in load_saved_articles()]
+    source_words = sum(len(text.split()) for text in texts) / max(len(texts), 1)
+    print(f"{len(texts)} articles, {source_words:.1f} words on average\n")
+
+    summarizers = [('textrank', ExtractiveSummarizer())]
+    if args.minilm:
+        summarizers.append(('textrank-minilm', ExtractiveSummarizer(use_embeddings=True)))
+    if args.abstractive:
+        summarizers.append(('abstractive', AbstractiveSummarizer()))
+
+    for name, summarizer in summarizers:
+        # Load any model up front so the timed run does not pay for it
+        summarizer.summarize(texts[:1])
+        run(name, summarizer, texts, args.batch_size)
+
+    # A re-ingest of unchanged articles is served from the summary cache
+    workdir = tempfile.mkdtemp()
+    store = VectorDBStorage(backend=LocalIndex(workdir), summarizer=summarizers[-1][1],
+                            summary_cache=SummaryCache(os.path.join(workdir, 'summaries.sqlite')))
+    store.generate_summaries(texts, batch_size=args.batch_size)
+    start = time.perf_counter()
+    store.generate_summaries(texts, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"{'cached':18} {len(texts) / elapsed:10.2f} articles/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark upserts against a slow, failing index stand-in: one batch at a time
+against several in flight, then an ingest that dies mid-upsert and is resumed
+from its checkpoint
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from fixtures import FlakyIndex, HashEmbedder, StubModels, scaled_articles
+from news_scraper.db.backends import LocalIndex
+from news_scraper.db.upsert import UpsertCheckpoint
+from news_scraper.db.vector_store import VectorDBStorage
+
+
+class CountingEmbedder(HashEmbedder):
+    """Stub embedder counting the texts it embeds, to show what a resume saves"""
+
+    def __init__(self):
+        super().__init__()
+        self.embedded = 0
+
+    def encode(self, texts, **kwargs):
+        self.embedded += 1 if isinstance(texts, str) else len(texts)
+        return super().encode(texts, **kwargs)
+
+
+class CountingModels(StubModels):
+    def __init__(self):
+        super().__init__()
+        self._embedder = CountingEmbedder()
+
+    @property
+    def embedded(self):
+        return self._embedder.embedded
+
+
+def time_upserts(vectors, workers, args):
+    index = FlakyIndex(LocalIndex(tempfile.mkdtemp()), latency=args.latency,
+                       failure_rate=args.failure_rate, seed=1)
+    storage = VectorDBStorage(backend=index, models=StubModels(), upsert_workers=workers)
+    start = time.perf_counter()
+    storage.upsert_vectors(index, vectors, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"{workers} in flight  {len(vectors) / elapsed:8.1f} vectors/s  ({elapsed:.2f}s, "
+          f"{index.failures} injected failures retried)")
+    return elapsed
+
+
+def resume(articles, args):
+    work_dir = tempfile.mkdtemp()
+    articles_file = os.path.join(work_dir, 'articles.jsonl')
+    with open(articles_file, 'w', encoding='utf-8') as f:
+        for article in articles:
+            f.write(json.dumps(article) + '\n')
+    local = LocalIndex(os.path.join(work_dir, 'index'))
+    checkpoint = UpsertCheckpoint(os.path.join(work_dir, 'checkpoint.sqlite'))
+
+    models = CountingModels()
+    outage = FlakyIndex(local, fail_after=len(articles) // args.batch_size // 2)
+    storage = VectorDBStorage(backend=outage, models=models, upsert_workers=args.workers)
+    try:
+        storage.store_articles(articles_file, chunk_size=len(articles), checkpoint=checkpoint)
+    except ConnectionError:
+        pass
+    print(f"failed run   embedded {models.embedded}, stored {len(local)}, checkpoint {checkpoint.stats()}")
+
+    models = CountingModels()
+    storage = VectorDBStorage(backend=local, models=models, upsert_workers=args.workers)
+    storage.store_articles(articles_file, chunk_size=len(articles), checkpoint=checkpoint)
+    print(f"resumed run  embedded {models.embedded}, stored {len(local)}, checkpoint {checkpoint.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--articles', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds per upsert request')
+    parser.add_argument('--failure-rate', type=float, default=0.05)
+    args = parser.parse_args()
+
+    articles = scaled_articles(args.articles)
+    storage = VectorDBStorage(backend=LocalIndex(tempfile.mkdtemp()), models=StubModels())
+    vectors = storage.prepare_article_vectors(articles)
+
+    sequential = time_upserts(vectors, 1, args)
+    parallel = time_upserts(vectors, args.workers, args)
+    print(f"speedup      {sequential / parallel:8.2f}x")
+
+    resume(articles, args)
+
+
+if __name__ == "__main__":
+    main()
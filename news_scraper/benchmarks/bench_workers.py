@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark how article preparation (summarize and embed) scales with the number
+of inference worker processes, against the in-process baseline
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from fixtures import StubModels, scaled_articles
+from news_scraper.db.backends import LocalIndex
+from news_scraper.db.vector_store import VectorDBStorage
+from news_scraper.inference import InferencePool
+from news_scraper.models import ModelRegistry, registry
+
+
+def worker_counts(limit):
+    """1, 2, 4, ... up to limit, always ending at limit"""
+    counts = []
+    workers = 1
+    while workers < limit:
+        counts.append(workers)
+        workers *= 2
+    return counts + [limit]
+
+
+def time_prepare(storage, articles, args):
+    start = time.perf_counter()
+    storage.prepare_article_vectors(articles, batch_size=args.batch_size, summary_batch_size=args.summary_batch_size)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--articles', type=int, default=2000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=1, help='inference threads per worker')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--summary-batch-size', type=int, default=8)
+    parser.add_argument('--real-models', action='store_true',
+                        help='use the real models (cached locally by sentence-transformers) instead of stand-ins')
+    args = parser.parse_args()
+
+    articles = scaled_articles(args.articles)
+    # The extractive summarizer is real CPU work either way; only the embedder is a stand-in
+    models_factory = ModelRegistry if args.real_models else StubModels
+    print(f"{len(articles)} articles, {os.cpu_count()} cores, {args.threads} threads per worker\n")
+
+    models = registry if args.real_models else StubModels()
+    if args.real_models:
+        models.configure(num_threads=args.threads)
+    storage = VectorDBStorage(backend=LocalIndex(tempfile.mkdtemp()), models=models)
+    time_prepare(storage, articles[:8], args)
+    elapsed = time_prepare(storage, articles, args)
+    print(f"{'in process':12} {len(articles) / elapsed:10.1f} articles/s  ({elapsed:.2f}s)")
+
+    single = None
+    for workers in worker_counts(args.max_workers):
+        with InferencePool(workers=workers, num_threads=args.threads, models_factory=models_factory) as pool:
+            # Model loading happens here, outside the timed run
+            pool.start()
+            storage = VectorDBStorage(backend=LocalIndex(tempfile.mkdtemp()), models=models, inference=pool)
+            elapsed = time_prepare(storage, articles, args)
+        single = single or elapsed
+        speedup = single / elapsed
+        print(f"{workers:3d} workers  {len(articles) / elapsed:10.1f} articles/s  ({elapsed:.2f}s)  "
+              f"{speedup:5.2f}x  {speedup / workers:4.0%} efficiency")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Offline fixtures for benchmarks built from the saved article files in data/
+"""
+import contextlib
+import glob
+import hashlib
+import html
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from news_scraper.db.backends import IndexBackend
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+_SENTENCE_END = re.compile(r'(?<=[.!?"])(?=[A-Z"])|(?<=[.!?])\s+')
+
+
+def load_saved_articles(data_dir=DATA_DIR):
+    """Load every article from data/news_articles_*.json, normalising the older file layout"""
+    articles = []
+    for path in sorted(glob.glob(os.path.join(data_dir, 'news_articles_*.json'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            for article in json.load(f):
+                articles.append({
+                    'url': article['url'],
+                    'heading': article.get('heading') or article.get('title', ''),
+                    'content': article.get('content', ''),
+                    'keywords': article.get('keywords', []),
+                    'source': article.get('source', 'BBC News'),
+                    'timestamp': article.get('timestamp') or article.get('scraped_at', ''),
+                })
+    return articles
+
+
+def split_paragraphs(text, sentences_per_paragraph=3):
+    """Split run-together article text into paragraphs of a few sentences"""
+    sentences = [s.strip() for s in _SENTENCE_END.split(text) if s and s.strip()]
+    return [' '.join(sentences[i:i + sentences_per_paragraph])
+            for i in range(0, len(sentences), sentences_per_paragraph)]
+
+
+def render_article_html(article):
+    """Render an article as a page with the structure of a BBC article page"""
+    heading = html.escape(article['heading'])
+    text_blocks = ''.join(
+        '<div data-component="text-block"><div class="sc-text"><p>{}</p></div></div>'.format(html.escape(p))
+        for p in split_paragraphs(article['content'])
+    )
+    nav = ''.join(f'<li><a href="/news/section-{i}">Section {i}</a></li>' for i in range(40))
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>{heading} - BBC News</title>
+<script>window.__INITIAL_DATA__ = {json.dumps({'heading': article['heading']})};</script>
+<style>.sc-text {{ margin: 0 }}</style></head>
+<body><header><nav><ul>{nav}</ul></nav></header>
+<main id="main-content"><article>
+<div data-component="headline-block"><h1>{heading}</h1></div>
+<div data-component="byline-block"><div><div><div><time>13 hours ago</time></div>
+<div><button>Share</button><button>Save</button></div></div>
+<div><div><span>Staff reporter</span><span>BBC News</span></div></div></div></div>
+<figure><img src="/image.jpg" alt=""><figcaption>Getty Images</figcaption></figure>
+{text_blocks}
+</article></main>
+<footer><ul>{nav}</ul><p>Copyright 2025 BBC.</p></footer></body></html>"""
+
+
+def load_html_fixtures(html_dir=None):
+    """Return (url, html) pairs from saved pages in html_dir, or rendered from data/ when html_dir is None"""
+    if html_dir:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(html_dir, '*.html'))):
+            with open(path, 'r', encoding='utf-8') as f:
+                pages.append((os.path.basename(path), f.read()))
+        return pages
+    return [(article['url'], render_article_html(article)) for article in load_saved_articles()]
+
+
+def scaled_articles(count, data_dir=DATA_DIR):
+    """Repeat the saved articles until there are count of them, with distinct URLs"""
+    base = load_saved_articles(data_dir)
+    return [dict(base[i % len(base)], url=f"{base[i % len(base)]['url']}?copy={i}") for i in range(count)]
+
+
+@contextlib.contextmanager
+def serve_pages(pages):
+    """
+    Serve {path: html} from a local HTTP server on a free port for the duration
+    of the block, yielding its base URL; '/' lists every page as a link
+    """
+    listing = ''.join(f'<a href="{path}">{path}</a>' for path in pages)
+    routes = dict(pages, **{'/': f'<html><body><main>{listing}</main></body></html>'})
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = routes.get(self.path)
+            if body is None:
+                self.send_error(404)
+                return
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class HashEmbedder:
+    """Stand-in for the sentence embedding model: deterministic vectors derived from text hashes"""
+
+    def __init__(self, dimension=384):
+        self.dimension = dimension
+
+    def _embed(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little')
+        return np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, show_progress_bar=False, **kwargs):
+        if isinstance(texts, str):
+            return self._embed(texts)
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.stack([self._embed(text) for text in texts])
+
+
+class LeadSummarizer:
+    """Stand-in for the summarization pipeline returning the first words of each input"""
+
+    def __call__(self, texts, max_length=150, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        return [{'summary_text': ' '.join(text.split()[:max_length // 2])} for text in texts]
+
+
+class StubModels:
+    """Model registry handing out the stand-in models, so benchmarks need neither torch nor downloads"""
+
+    def __init__(self):
+        self._embedder = HashEmbedder()
+        self._summarizer = LeadSummarizer()
+
+    def embedding_model(self, name=None):
+        return self._embedder
+
+    def summarizer(self, name=None):
+        return self._summarizer
+
+
+class FlakyIndex(IndexBackend):
+    """
+    Stand-in for a remote vector index wrapping a local one: every upsert takes
+    latency seconds and fails with probability failure_rate, and after
+    fail_after successful upserts every further one fails, as in an outage
+    """
+
+    def __init__(self, index, latency=0.0, failure_rate=0.0, fail_after=None, seed=0):
+        self.index = index
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.fail_after = fail_after
+        self.upserts = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self.index.version
+
+    def refresh(self):
+        self.index.refresh()
+
+    def upsert(self, vectors):
+        time.sleep(self.latency)
+        with self._lock:
+            failed = (self._rng.random() < self.failure_rate
+                      or (self.fail_after is not None and self.upserts >= self.fail_after))
+            if failed:
+                self.failures += 1
+            else:
+                self.upserts += 1
+        if failed:
+            raise ConnectionError('injected upsert failure')
+        self.index.upsert(vectors)
+
+    def query(self, vector, top_k=10, include_metadata=True, filter=None):
+        return self.index.query(vector, top_k=top_k, include_metadata=include_metadata, filter=filter)
+
+    def delete(self, ids):
+        self.index.delete(ids)
+
+    def describe_index_stats(self):
+        return self.index.describe_index_stats()
+
+    def fetch(self, ids):
+        return self.index.fetch(ids)
+
+    def flush(self):
+        self.index.flush()
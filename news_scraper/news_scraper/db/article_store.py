@@ -0,0 +1,214 @@
+"""
+Article files: append-only JSON Lines writing, streaming reading and ingest progress
+"""
+import gzip
+import io
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+ARTICLE_FILE_PREFIX = 'news_articles_'
+ARTICLE_FILE_SUFFIXES = ('.jsonl', '.jsonl.gz', '.jsonl.zst', '.json')
+COMPRESSION_SUFFIXES = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+
+def _open_text(path: str, mode: str):
+    """Open path as UTF-8 text, compressing or decompressing by file suffix"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    if path.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstd compressed article files require the 'zstandard' package")
+        if mode == 'r':
+            stream = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True,
+                                                                closefd=True)
+        else:
+            stream = zstandard.ZstdCompressor().stream_writer(open(path, mode + 'b'), closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def normalize_article(article: Dict) -> Dict:
+    """Return article in the current schema; early files used 'title' and 'scraped_at'"""
+    if 'heading' in article and 'timestamp' in article:
+        return article
+    normalized = dict(article)
+    normalized.setdefault('heading', article.get('title', ''))
+    normalized.setdefault('timestamp', article.get('scraped_at', ''))
+    normalized.setdefault('keywords', [])
+    normalized.setdefault('source', 'BBC News')
+    normalized.setdefault('content', '')
+    return normalized
+
+
+def timestamp_seconds(value) -> Optional[float]:
+    """
+    Epoch seconds of an article timestamp: '%Y%m%d_%H%M%S' as written by the
+    scraper, or ISO 8601 as in early files, both in local time. None if unparseable.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y%m%d_%H%M%S').timestamp()
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+def iter_articles(path: str, start: Optional[Dict] = None) -> Iterator[Tuple[Dict, Dict]]:
+    """
+    Yield (article, position) for every record of an article file after start.
+    position can be passed back as start to resume after that record: it holds
+    the record count and, for uncompressed JSON Lines, the byte offset to seek to.
+    For compressed files it also holds the file size before reading began, all
+    of which has been read once iteration finishes.
+    A trailing line still being written is not yielded.
+    """
+    records = start['records'] if start else 0
+
+    if path.endswith('.json'):
+        # Legacy indented JSON arrays cannot be streamed
+        with open(path, 'r', encoding='utf-8') as f:
+            articles = json.load(f)
+        for records, article in enumerate(articles[records:], records + 1):
+            yield normalize_article(article), {'records': records, 'offset': None}
+        return
+
+    if path.endswith('.jsonl'):
+        offset = (start.get('offset') or 0) if start else 0
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                if not line.strip():
+                    continue
+                records += 1
+                yield normalize_article(json.loads(line)), {'records': records, 'offset': offset}
+        return
+
+    # Compressed offsets do not map to file bytes; whatever the file held before reading will have been read
+    size = os.path.getsize(path)
+    with _open_text(path, 'r') as f:
+        seen = 0
+        for line in f:
+            if not line.endswith('\n'):
+                break
+            if not line.strip():
+                continue
+            seen += 1
+            if seen <= records:
+                continue
+            yield normalize_article(json.loads(line)), {'records': seen, 'offset': None, 'size': size}
+
+
+class ArticleWriter:
+    """Appends articles to a JSON Lines file as they are scraped; safe to share between threads"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = _open_text(path, 'a')
+        # Compressed streams are only flushed on close to keep the compression ratio
+        self._flush_each = path.endswith('.jsonl')
+
+    def write(self, article: Dict) -> None:
+        line = json.dumps(article, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            if self._flush_each:
+                self._file.flush()
+            self.count += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ArticleStore:
+    """
+    Directory of article files with a manifest recording how far each file has
+    been ingested, so ingestion resumes after the last processed record.
+    """
+
+    MANIFEST_FILE = 'ingest_manifest.json'
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self.manifest_path = os.path.join(data_dir, self.MANIFEST_FILE)
+        self._manifest: Dict[str, Dict] = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self._manifest = json.load(f)
+
+    def new_writer(self, compression: Optional[str] = None) -> ArticleWriter:
+        """Open a new timestamped JSON Lines file; compression is None, 'gzip' or 'zstd'"""
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unknown compression: {compression}")
+        os.makedirs(self.data_dir, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        name = f'{ARTICLE_FILE_PREFIX}{timestamp}.jsonl{COMPRESSION_SUFFIXES[compression]}'
+        return ArticleWriter(os.path.join(self.data_dir, name))
+
+    def article_files(self) -> List[str]:
+        """Paths of every article file in the directory, oldest first"""
+        names = [name for name in os.listdir(self.data_dir)
+                 if name.startswith(ARTICLE_FILE_PREFIX) and name.endswith(ARTICLE_FILE_SUFFIXES)]
+        return [os.path.join(self.data_dir, name) for name in sorted(names)]
+
+    def position(self, path: str) -> Optional[Dict]:
+        """Where ingestion of path stopped, or None if it was never ingested"""
+        entry = self._manifest.get(os.path.basename(path))
+        return entry['position'] if entry else None
+
+    def is_up_to_date(self, path: str) -> bool:
+        """Whether path has been fully ingested and has not grown since"""
+        entry = self._manifest.get(os.path.basename(path))
+        return entry is not None and entry['size'] == os.path.getsize(path)
+
+    def pending_files(self) -> List[str]:
+        """Article files with records that have not been ingested yet"""
+        return [path for path in self.article_files() if not self.is_up_to_date(path)]
+
+    def iter_pending(self, path: str) -> Iterator[Tuple[Dict, Dict]]:
+        """Yield (article, position) for the records of path not ingested yet"""
+        return iter_articles(path, self.position(path))
+
+    def mark_processed(self, path: str, position: Dict, complete: bool = False) -> None:
+        """
+        Record that every record of path up to position has been ingested. With
+        complete, the file counts as up to date until it grows past the bytes
+        read up to position, so records appended meanwhile are ingested next time.
+        """
+        size = None
+        if complete:
+            if path.endswith('.jsonl'):
+                size = position['offset']
+            elif path.endswith('.json'):
+                # Whole-array files are rewritten rather than appended to
+                size = os.path.getsize(path)
+            else:
+                # Positions recorded before sizes were kept fall back to the current size
+                size = position.get('size', os.path.getsize(path))
+        self._manifest[os.path.basename(path)] = {'position': position, 'size': size}
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
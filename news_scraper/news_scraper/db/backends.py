@@ -0,0 +1,384 @@
+"""
+Vector index backends: the remote Pinecone index and a local NumPy index
+"""
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from news_scraper.db.filters import matches_filter
+
+
+def file_version(path: str) -> Optional[tuple]:
+    """Identity of the file saved at path, which changes whenever any process replaces it"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class IndexBackend:
+    """
+    Interface shared by the vector indexes used by VectorDBStorage and NewsSearch.
+    Vectors are dicts with 'id', 'values' and 'metadata'; query results have the
+    shape {'matches': [{'id', 'score', 'metadata'}, ...]}. Query filters use the
+    Pinecone metadata filter syntax (see news_scraper.db.filters).
+    """
+
+    # Changes whenever the vectors this object serves change, including when
+    # refresh() reloads them; None when the backend cannot tell
+    version = None
+
+    def refresh(self) -> None:
+        """Pick up vectors other processes have saved; a no-op for backends that always read the stored state"""
+
+    def upsert(self, vectors: List[Dict]) -> None:
+        """Insert vectors, replacing any with the same id"""
+        raise NotImplementedError
+
+    def query(self, vector, top_k: int = 10, include_metadata: bool = True, filter: Optional[Dict] = None) -> Dict:
+        """Return the top_k vectors most similar to vector among those whose metadata matches filter"""
+        raise NotImplementedError
+
+    def delete(self, ids: List[str]) -> None:
+        """Remove the vectors with ids, ignoring ids that do not exist"""
+        raise NotImplementedError
+
+    def describe_index_stats(self) -> Dict:
+        """Return at least 'total_vector_count' and 'dimension'"""
+        raise NotImplementedError
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict]:
+        """Return the stored vectors for the ids that exist, keyed by id"""
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """Persist pending writes; a no-op for backends that write through"""
+
+
+def _field(obj, name, default=None):
+    """Read name from a Pinecone response object or a plain dict"""
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+class PineconeBackend(IndexBackend):
+    """Adapter normalising a Pinecone Index to the IndexBackend interface"""
+
+    FETCH_BATCH_SIZE = 100
+
+    def __init__(self, index):
+        self.index = index
+
+    def upsert(self, vectors: List[Dict]) -> None:
+        self.index.upsert(vectors=vectors)
+
+    def query(self, vector, top_k: int = 10, include_metadata: bool = True, filter: Optional[Dict] = None) -> Dict:
+        options = {'filter': filter} if filter else {}
+        results = self.index.query(vector=list(map(float, vector)), top_k=top_k,
+                                   include_metadata=include_metadata, **options)
+        return {
+            'matches': [
+                {'id': _field(match, 'id'), 'score': _field(match, 'score'),
+                 'metadata': _field(match, 'metadata') or {}}
+                for match in _field(results, 'matches', [])
+            ]
+        }
+
+    def delete(self, ids: List[str]) -> None:
+        for i in range(0, len(ids), self.FETCH_BATCH_SIZE):
+            self.index.delete(ids=ids[i:i + self.FETCH_BATCH_SIZE])
+
+    def describe_index_stats(self) -> Dict:
+        stats = self.index.describe_index_stats()
+        return {
+            'total_vector_count': _field(stats, 'total_vector_count', 0),
+            'dimension': _field(stats, 'dimension'),
+        }
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict]:
+        found = {}
+        for i in range(0, len(ids), self.FETCH_BATCH_SIZE):
+            response = self.index.fetch(ids=ids[i:i + self.FETCH_BATCH_SIZE])
+            for vector_id, vector in (_field(response, 'vectors') or {}).items():
+                found[vector_id] = {
+                    'id': vector_id,
+                    'values': _field(vector, 'values'),
+                    'metadata': _field(vector, 'metadata') or {},
+                }
+        return found
+
+
+class LocalIndex(IndexBackend):
+    """
+    In-process index of L2-normalised vectors scored by dot product (cosine).
+    Stored as vectors.npy, memory-mapped on load, plus a metadata.json sidecar.
+    Writes are kept in memory until flush(). With approximate=True, corpora of at
+    least ivf_min_size vectors are searched through an IVF (k-means cell) index
+    probing the nprobe closest cells instead of scanning every vector.
+
+    Queries may run alongside writes: writers only append past the rows a query
+    has already taken, and replace rather than modify the matrix and metadata
+    list whenever they change existing rows, so a query scores a consistent
+    snapshot without holding the lock while it scores. refresh() reloads the
+    files once another process has flushed over them, unless this index has
+    unsaved writes of its own.
+    """
+
+    VECTORS_FILE = 'vectors.npy'
+    METADATA_FILE = 'metadata.json'
+
+    def __init__(self, path: str, dimension: int = 384, approximate: bool = False,
+                 nlist: Optional[int] = None, nprobe: int = 8, ivf_min_size: int = 10000):
+        self.path = path
+        self.dimension = dimension
+        self.approximate = approximate
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.ivf_min_size = ivf_min_size
+        self._ids: List[str] = []
+        self._metadata: List[Dict] = []
+        self._rows: Dict[str, int] = {}
+        self._matrix = np.zeros((0, dimension), dtype=np.float32)
+        self._size = 0
+        self._dirty = False
+        self._ivf = None
+        self._writes = 0
+        # Identity of the metadata file the vectors were loaded from or saved to
+        self._loaded_version = None
+        # Serialises writers with fetch() and flush(), e.g. in the ingest pipeline
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self) -> bool:
+        """Read the saved files, if any; False when a flush replaced them mid-read"""
+        vectors_path = os.path.join(self.path, self.VECTORS_FILE)
+        metadata_path = os.path.join(self.path, self.METADATA_FILE)
+        if not os.path.exists(vectors_path):
+            return True
+        loaded_version = file_version(metadata_path)
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            sidecar = json.load(f)
+        matrix = np.load(vectors_path, mmap_mode='r')
+        if matrix.shape[0] < len(sidecar['ids']):
+            return False
+        self._ids = sidecar['ids']
+        self._metadata = sidecar['metadata']
+        self._rows = {vector_id: row for row, vector_id in enumerate(self._ids)}
+        self._matrix = matrix
+        self._size = len(self._ids)
+        self.dimension = matrix.shape[1]
+        self._loaded_version = loaded_version
+        return True
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def version(self):
+        """Writes and reloads so far; every change to the vectors served bumps it"""
+        return self._writes
+
+    def refresh(self) -> None:
+        """Reload the saved files if another process has flushed since they were read"""
+        current = file_version(os.path.join(self.path, self.METADATA_FILE))
+        if current == self._loaded_version:
+            return
+        with self._lock:
+            if current == self._loaded_version or self._dirty:
+                return
+            if self._load():
+                self._ivf = None
+                self._writes += 1
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _ensure_capacity(self, size: int):
+        """Make the matrix writable and large enough for size rows"""
+        capacity = self._matrix.shape[0]
+        if size <= capacity and not isinstance(self._matrix, np.memmap):
+            return
+        grown = np.zeros((max(size, capacity * 2, 64), self.dimension), dtype=np.float32)
+        grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
+
+    def upsert(self, vectors: List[Dict]) -> None:
+        if not vectors:
+            return
+        values = self._normalize(np.asarray([vector['values'] for vector in vectors], dtype=np.float32))
+        with self._lock:
+            new_ids = [vector['id'] for vector in vectors if vector['id'] not in self._rows]
+            if len(new_ids) < len(vectors):
+                # Updated rows go into copies, leaving running queries their snapshot
+                self._matrix = np.array(self._matrix)
+                self._metadata = list(self._metadata)
+            self._ensure_capacity(self._size + len(new_ids))
+            for vector, row_values in zip(vectors, values):
+                row = self._rows.get(vector['id'])
+                if row is None:
+                    row = self._size
+                    self._matrix[row] = row_values
+                    self._ids.append(vector['id'])
+                    self._metadata.append(vector.get('metadata') or {})
+                    self._rows[vector['id']] = row
+                    self._size += 1
+                else:
+                    self._matrix[row] = row_values
+                    self._metadata[row] = vector.get('metadata') or {}
+            self._dirty = True
+            self._ivf = None
+            self._writes += 1
+
+    def _build_ivf(self, iterations: int = 10):
+        """Cluster the vectors with spherical k-means and bucket rows by nearest centroid"""
+        vectors = self._matrix[:self._size]
+        nlist = min(self.nlist or max(1, int(np.sqrt(self._size))), self._size)
+        rng = np.random.default_rng(0)
+        # Train on a sample; assigning every row afterwards is a single matrix product
+        sample = vectors[rng.choice(self._size, size=min(self._size, nlist * 256), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty]
+            centroids = self._normalize(sums)
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind='stable')
+        bounds = np.searchsorted(assignment[order], np.arange(nlist + 1))
+        cells = [order[bounds[cell]:bounds[cell + 1]] for cell in range(nlist)]
+        self._ivf = (centroids, cells)
+
+    def _candidate_rows(self, query: np.ndarray) -> Optional[np.ndarray]:
+        """Rows to score for query, or None to scan the whole matrix"""
+        if not self.approximate or self._size < self.ivf_min_size:
+            return None
+        if self._ivf is None:
+            self._build_ivf()
+        centroids, cells = self._ivf
+        nprobe = min(self.nprobe, len(cells))
+        closest = np.argpartition(-(centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([cells[cell] for cell in closest])
+
+    def query(self, vector, top_k: int = 10, include_metadata: bool = True, filter: Optional[Dict] = None) -> Dict:
+        if self._size == 0 or top_k <= 0:
+            return {'matches': []}
+        query = self._normalize(np.asarray(vector, dtype=np.float32))
+        with self._lock:
+            # Consistent references only; scoring happens outside the lock
+            size, matrix, ids, metadata = self._size, self._matrix, self._ids, self._metadata
+            rows = self._candidate_rows(query)
+        if rows is None:
+            scores = matrix[:size] @ query
+            rows = np.arange(size)
+        else:
+            scores = matrix[rows] @ query
+        if not len(rows):
+            return {'matches': []}
+        if filter:
+            # Walk candidates best first until top_k of them match
+            best = []
+            for i in np.argsort(-scores):
+                if matches_filter(metadata[rows[i]], filter):
+                    best.append(i)
+                    if len(best) >= top_k:
+                        break
+        else:
+            k = min(top_k, len(rows))
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+        return {
+            'matches': [
+                {'id': ids[rows[i]], 'score': float(scores[i]),
+                 'metadata': metadata[rows[i]] if include_metadata else {}}
+                for i in best
+            ]
+        }
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            drop = {self._rows[vector_id] for vector_id in ids if vector_id in self._rows}
+            if not drop:
+                return
+            keep = [row for row in range(self._size) if row not in drop]
+            self._matrix = np.array(self._matrix[keep], dtype=np.float32).reshape(len(keep), self.dimension)
+            self._ids = [self._ids[row] for row in keep]
+            self._metadata = [self._metadata[row] for row in keep]
+            self._rows = {vector_id: row for row, vector_id in enumerate(self._ids)}
+            self._size = len(keep)
+            self._dirty = True
+            self._ivf = None
+            self._writes += 1
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return list(self._ids)
+
+    def metadata(self) -> List[Dict]:
+        """Metadata of every stored vector, in the order of ids()"""
+        with self._lock:
+            return list(self._metadata)
+
+    def vectors(self) -> List[Dict]:
+        """Every stored vector, e.g. to copy the index into another one"""
+        with self._lock:
+            return [{'id': vector_id, 'values': np.array(self._matrix[row]), 'metadata': self._metadata[row]}
+                    for row, vector_id in enumerate(self._ids)]
+
+    def describe_index_stats(self) -> Dict:
+        return {'total_vector_count': self._size, 'dimension': self.dimension}
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict]:
+        found = {}
+        with self._lock:
+            for vector_id in ids:
+                row = self._rows.get(vector_id)
+                if row is not None:
+                    found[vector_id] = {
+                        'id': vector_id,
+                        'values': np.array(self._matrix[row]),
+                        'metadata': self._metadata[row],
+                    }
+        return found
+
+    def flush(self) -> None:
+        """Write the vectors and metadata sidecar, replacing the previous files atomically"""
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(self.path, exist_ok=True)
+            vectors_path = os.path.join(self.path, self.VECTORS_FILE)
+            metadata_path = os.path.join(self.path, self.METADATA_FILE)
+            with open(vectors_path + '.tmp', 'wb') as f:
+                np.save(f, np.ascontiguousarray(self._matrix[:self._size]))
+            with open(metadata_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump({'ids': self._ids, 'metadata': self._metadata}, f, ensure_ascii=False)
+            os.replace(vectors_path + '.tmp', vectors_path)
+            os.replace(metadata_path + '.tmp', metadata_path)
+            self._loaded_version = file_version(metadata_path)
+            self._dirty = False
+
+
+def backend_from_env(default_path: str) -> Optional[IndexBackend]:
+    """
+    Return a LocalIndex when NEWS_INDEX_BACKEND=local, or a SegmentedIndex split
+    by day when it is segmented, stored at NEWS_INDEX_PATH or default_path; None
+    means the Pinecone index should be used.
+    """
+    backend = os.getenv('NEWS_INDEX_BACKEND', 'pinecone').lower()
+    if backend not in ('local', 'segmented'):
+        return None
+    path = os.getenv('NEWS_INDEX_PATH', default_path)
+    approximate = os.getenv('NEWS_INDEX_APPROXIMATE', '').lower() in ('1', 'true', 'yes')
+    if backend == 'segmented':
+        from news_scraper.db.segments import SegmentedIndex
+        return SegmentedIndex(path, approximate=approximate)
+    return LocalIndex(path, approximate=approximate)
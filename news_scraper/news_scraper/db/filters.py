@@ -0,0 +1,97 @@
+"""
+Metadata filters in the Pinecone filter syntax, evaluated locally and used to prune index segments
+"""
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+_COMPARISONS = {
+    '$eq': lambda value, operand: value == operand,
+    '$ne': lambda value, operand: value != operand,
+    '$gt': lambda value, operand: value is not None and value > operand,
+    '$gte': lambda value, operand: value is not None and value >= operand,
+    '$lt': lambda value, operand: value is not None and value < operand,
+    '$lte': lambda value, operand: value is not None and value <= operand,
+    '$in': lambda value, operand: value in operand,
+    '$nin': lambda value, operand: value not in operand,
+}
+
+
+def _seconds(value) -> float:
+    return value.timestamp() if isinstance(value, datetime) else float(value)
+
+
+def build_filter(since=None, until=None, sources: Optional[Iterable[str]] = None) -> Optional[Dict]:
+    """
+    Filter for articles scraped in [since, until) from any of sources; the
+    times are datetimes or epoch seconds. None when nothing is restricted.
+    """
+    conditions = {}
+    if since is not None or until is not None:
+        scraped = {}
+        if since is not None:
+            scraped['$gte'] = _seconds(since)
+        if until is not None:
+            scraped['$lt'] = _seconds(until)
+        conditions['scraped_ts'] = scraped
+    if sources:
+        conditions['source'] = {'$in': sorted(set(sources))}
+    return conditions or None
+
+
+def matches_filter(metadata: Dict, filter: Optional[Dict]) -> bool:
+    """Whether metadata satisfies filter: {field: value or {operator: operand}} with every field required"""
+    if not filter:
+        return True
+    for field, condition in filter.items():
+        value = metadata.get(field)
+        if not isinstance(condition, dict):
+            condition = {'$eq': condition}
+        for operator, operand in condition.items():
+            compare = _COMPARISONS.get(operator)
+            if compare is None:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+            if not compare(value, operand):
+                return False
+    return True
+
+
+def filter_range(filter: Optional[Dict], field: str) -> Tuple[float, float]:
+    """(low, high) bounds the filter puts on a numeric field, inclusive, infinite where open"""
+    low, high = float('-inf'), float('inf')
+    condition = (filter or {}).get(field)
+    if condition is None:
+        return low, high
+    if not isinstance(condition, dict):
+        return condition, condition
+    for operator, operand in condition.items():
+        if operator in ('$gt', '$gte'):
+            low = max(low, operand)
+        elif operator in ('$lt', '$lte'):
+            high = min(high, operand)
+        elif operator == '$eq':
+            low, high = max(low, operand), min(high, operand)
+    return low, high
+
+
+def filter_values(filter: Optional[Dict], field: str) -> Optional[Set]:
+    """The values the filter allows for field, or None when it allows any"""
+    condition = (filter or {}).get(field)
+    if condition is None:
+        return None
+    if not isinstance(condition, dict):
+        return {condition}
+    if '$eq' in condition:
+        return {condition['$eq']}
+    if '$in' in condition:
+        return set(condition['$in'])
+    return None
+
+
+def filter_key(filter: Optional[Dict]) -> Optional[Tuple]:
+    """Hashable form of filter, e.g. for cache keys"""
+    if not filter:
+        return None
+    return tuple(sorted(
+        (field, tuple(sorted((op, tuple(v) if isinstance(v, list) else v) for op, v in condition.items()))
+         if isinstance(condition, dict) else condition)
+        for field, condition in filter.items()))
@@ -0,0 +1,357 @@
+"""
+Time-partitioned local vector index: one LocalIndex segment per day, pruned by metadata filters
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from news_scraper.db.article_store import timestamp_seconds
+from news_scraper.db.backends import IndexBackend, LocalIndex, file_version
+from news_scraper.db.filters import filter_range, filter_values
+from news_scraper.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Vectors whose scrape time is unknown; never matched by a time filter
+UNDATED = 'undated'
+
+
+def vector_time(metadata: Dict) -> Optional[float]:
+    """Scrape time of a vector in epoch seconds, from scraped_ts or the older scraped_at string"""
+    value = metadata.get('scraped_ts')
+    if value is not None:
+        return float(value)
+    return timestamp_seconds(metadata.get('scraped_at'))
+
+
+def _segment_stats(metadata: List[Dict]) -> Dict:
+    times = [t for t in (vector_time(m) for m in metadata) if t is not None]
+    return {
+        'count': len(metadata),
+        'min_ts': min(times) if times else None,
+        'max_ts': max(times) if times else None,
+        'sources': dict(Counter(m.get('source') for m in metadata)),
+    }
+
+
+class SegmentedIndex(IndexBackend):
+    """
+    Local index split by scrape day: each day's vectors live in their own
+    LocalIndex under segments/YYYYMMDD, with per-segment statistics (count,
+    time range and vectors per source) kept in segments.json. Queries with a
+    time or source filter skip every segment the statistics rule out, and
+    segments wholly inside the filter are scanned without checking metadata,
+    so searching the last day or week costs the same however large the
+    archive grows.
+
+    compact() merges old daily segments into one per month (segments/YYYYMM,
+    searched through IVF when approximate=True); drop() deletes whole
+    segments older than a cutoff, which makes retention a directory removal,
+    and returns the ids dropped for the lexical and near-duplicate indexes.
+    An existing unsegmented LocalIndex at path is split into segments the
+    first time the index is opened. refresh() picks up segments another
+    process has flushed since, reloading only the segments that changed.
+    """
+
+    MANIFEST_FILE = 'segments.json'
+    SEGMENTS_DIR = 'segments'
+
+    def __init__(self, path: str, dimension: int = 384, approximate: bool = False, nprobe: int = 8,
+                 ivf_min_size: int = 10000):
+        self.path = path
+        self.dimension = dimension
+        self.approximate = approximate
+        self.nprobe = nprobe
+        self.ivf_min_size = ivf_min_size
+        self._segments: Dict[str, LocalIndex] = {}
+        self._stats: Dict[str, Dict] = {}
+        self._locations: Dict[str, str] = {}
+        self._dirty = set()
+        self._writes = 0
+        self._loaded_version = None
+        self._lock = threading.RLock()
+        self._load()
+
+    @property
+    def version(self):
+        """Writes and reloads so far; every change to the vectors served bumps it"""
+        return self._writes
+
+    def refresh(self) -> None:
+        """Reload the manifest and changed segments if another process has flushed since they were read"""
+        current = file_version(os.path.join(self.path, self.MANIFEST_FILE))
+        if current == self._loaded_version:
+            return
+        with self._lock:
+            if current == self._loaded_version or self._dirty or current is None:
+                return
+            self._read_manifest()
+            self._writes += 1
+
+    # Segment bookkeeping
+
+    def _open(self, name: str) -> LocalIndex:
+        return LocalIndex(os.path.join(self.path, self.SEGMENTS_DIR, name), dimension=self.dimension,
+                          approximate=self.approximate, nprobe=self.nprobe, ivf_min_size=self.ivf_min_size)
+
+    def _load(self):
+        manifest_path = os.path.join(self.path, self.MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            if os.path.exists(os.path.join(self.path, LocalIndex.VECTORS_FILE)):
+                self._import_flat_index()
+            return
+        self._read_manifest()
+
+    def _read_manifest(self):
+        """Rebuild the segment tables from segments.json, reusing (and refreshing) segments already open"""
+        manifest_path = os.path.join(self.path, self.MANIFEST_FILE)
+        loaded_version = file_version(manifest_path)
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        segments, stats, locations = {}, {}, {}
+        for name, segment_stats in manifest['segments'].items():
+            segment = self._segments.get(name)
+            if segment is None:
+                segment = self._open(name)
+            else:
+                segment.refresh()
+            segments[name] = segment
+            stats[name] = segment_stats
+            for vector_id in segment.ids():
+                locations[vector_id] = name
+        self.dimension = manifest.get('dimension', self.dimension)
+        self._segments, self._stats, self._locations = segments, stats, locations
+        self._loaded_version = loaded_version
+
+    def _import_flat_index(self):
+        flat = LocalIndex(self.path, dimension=self.dimension)
+        logger.info("Splitting %d vectors of the unsegmented index at %s into daily segments", len(flat), self.path)
+        self.dimension = flat.dimension
+        self.upsert(flat.vectors())
+        self.flush()
+
+    def segment_name(self, scraped_ts: Optional[float]) -> str:
+        """Segment a vector scraped at scraped_ts belongs in"""
+        if scraped_ts is None:
+            return UNDATED
+        day = datetime.fromtimestamp(scraped_ts).strftime('%Y%m%d')
+        # Days already merged into their month keep going there
+        if day not in self._segments and day[:6] in self._segments:
+            return day[:6]
+        return day
+
+    def _segment(self, name: str) -> LocalIndex:
+        segment = self._segments.get(name)
+        if segment is None:
+            segment = self._segments[name] = self._open(name)
+            self._stats[name] = _segment_stats([])
+        return segment
+
+    def _widen_stats(self, name: str, vectors: List[Dict]):
+        """Grow a segment's statistics to cover vectors; they are recomputed exactly on flush"""
+        stats = self._stats[name]
+        for vector in vectors:
+            scraped_ts = vector_time(vector.get('metadata') or {})
+            if scraped_ts is not None:
+                stats['min_ts'] = scraped_ts if stats['min_ts'] is None else min(stats['min_ts'], scraped_ts)
+                stats['max_ts'] = scraped_ts if stats['max_ts'] is None else max(stats['max_ts'], scraped_ts)
+            source = (vector.get('metadata') or {}).get('source')
+            stats['sources'][source] = stats['sources'].get(source, 0) + 1
+        stats['count'] = len(self._segments[name])
+
+    def _select(self, filter: Optional[Dict]) -> List[tuple]:
+        """(segment, needs_filter) for every segment that may hold vectors matching filter"""
+        low, high = filter_range(filter, 'scraped_ts')
+        timed = 'scraped_ts' in (filter or {})
+        sources = filter_values(filter, 'source')
+        other_fields = set(filter or {}) - {'scraped_ts', 'source'}
+        selected = []
+        with self._lock:
+            for name, segment in self._segments.items():
+                stats = self._stats[name]
+                if not len(segment):
+                    continue
+                if timed and (stats['min_ts'] is None or stats['max_ts'] < low or stats['min_ts'] > high):
+                    continue
+                if sources is not None and not sources.intersection(stats['sources']):
+                    continue
+                # Segments wholly inside the filter need no per-vector checks
+                covered = (not other_fields
+                           and (not timed or (low <= stats['min_ts'] and stats['max_ts'] < high))
+                           and (sources is None or sources.issuperset(stats['sources'])))
+                selected.append((segment, None if covered else filter))
+        return selected
+
+    # IndexBackend
+
+    def upsert(self, vectors: List[Dict]) -> None:
+        if not vectors:
+            return
+        with self._lock:
+            groups = defaultdict(list)
+            for vector in vectors:
+                metadata = vector.get('metadata') or {}
+                scraped_ts = vector_time(metadata)
+                if scraped_ts is not None and 'scraped_ts' not in metadata:
+                    # Vectors stored before scraped_ts existed get it, so time filters match them
+                    vector = dict(vector, metadata=dict(metadata, scraped_ts=scraped_ts))
+                name = self.segment_name(scraped_ts)
+                previous = self._locations.get(vector['id'])
+                if previous is not None and previous != name:
+                    # A re-scraped article moves to the segment of its new scrape time
+                    self._segments[previous].delete([vector['id']])
+                    self._dirty.add(previous)
+                groups[name].append(vector)
+            for name, group in groups.items():
+                self._segment(name).upsert(group)
+                self._widen_stats(name, group)
+                for vector in group:
+                    self._locations[vector['id']] = name
+                self._dirty.add(name)
+            self._writes += 1
+
+    def query(self, vector, top_k: int = 10, include_metadata: bool = True, filter: Optional[Dict] = None) -> Dict:
+        selected = self._select(filter)
+        metrics.increment('index_segments', len(selected), outcome='scanned')
+        metrics.increment('index_segments', len(self._segments) - len(selected), outcome='pruned')
+        matches = []
+        for segment, segment_filter in selected:
+            matches.extend(segment.query(vector, top_k=top_k, include_metadata=include_metadata,
+                                         filter=segment_filter)['matches'])
+        matches.sort(key=lambda match: match['score'], reverse=True)
+        return {'matches': matches[:top_k]}
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict]:
+        groups = defaultdict(list)
+        with self._lock:
+            for vector_id in ids:
+                name = self._locations.get(vector_id)
+                if name is not None:
+                    groups[name].append(vector_id)
+            found = {}
+            for name, group in groups.items():
+                found.update(self._segments[name].fetch(group))
+        return found
+
+    def delete(self, ids: List[str]) -> None:
+        groups = defaultdict(list)
+        with self._lock:
+            for vector_id in ids:
+                name = self._locations.pop(vector_id, None)
+                if name is not None:
+                    groups[name].append(vector_id)
+            for name, group in groups.items():
+                self._segments[name].delete(group)
+                self._dirty.add(name)
+            if groups:
+                self._writes += 1
+
+    def describe_index_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'total_vector_count': sum(len(segment) for segment in self._segments.values()),
+                'dimension': self.dimension,
+                'segments': len(self._segments),
+            }
+
+    def flush(self) -> None:
+        """Write changed segments and refresh their statistics, removing segments left empty"""
+        with self._lock:
+            if not self._dirty:
+                return
+            for name in sorted(self._dirty):
+                segment = self._segments.get(name)
+                if segment is None:
+                    continue
+                if not len(segment):
+                    self._remove_segment(name)
+                    continue
+                segment.flush()
+                self._stats[name] = _segment_stats(segment.metadata())
+            self._dirty.clear()
+            self._write_manifest()
+
+    def _write_manifest(self):
+        os.makedirs(self.path, exist_ok=True)
+        manifest_path = os.path.join(self.path, self.MANIFEST_FILE)
+        manifest = {
+            'dimension': self.dimension,
+            'segments': {name: self._stats[name] for name in sorted(self._segments)},
+        }
+        with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        os.replace(manifest_path + '.tmp', manifest_path)
+        self._loaded_version = file_version(manifest_path)
+
+    def _remove_segment(self, name: str):
+        segment = self._segments.pop(name)
+        self._stats.pop(name, None)
+        self._dirty.discard(name)
+        for vector_id in segment.ids():
+            if self._locations.get(vector_id) == name:
+                del self._locations[vector_id]
+        shutil.rmtree(segment.path, ignore_errors=True)
+
+    # Maintenance
+
+    def segment_stats(self) -> List[Dict]:
+        """Name, vector count, time range and per-source counts of every segment, oldest first"""
+        with self._lock:
+            return [dict(self._stats[name], name=name) for name in sorted(self._segments)]
+
+    def compact(self, before: float) -> int:
+        """
+        Merge the daily segments whose vectors were all scraped before the
+        given epoch seconds into one segment per month; returns how many
+        daily segments were merged
+        """
+        merged = 0
+        with self._lock:
+            self.flush()
+            months = defaultdict(list)
+            for name, stats in self._stats.items():
+                if len(name) == 8 and stats['max_ts'] is not None and stats['max_ts'] < before:
+                    months[name[:6]].append(name)
+            for month, days in sorted(months.items()):
+                target = self._segment(month)
+                for day in sorted(days):
+                    vectors = self._segments[day].vectors()
+                    target.upsert(vectors)
+                    self._widen_stats(month, vectors)
+                    for vector in vectors:
+                        self._locations[vector['id']] = month
+                target.flush()
+                self._stats[month] = _segment_stats(target.metadata())
+                for day in days:
+                    self._remove_segment(day)
+                merged += len(days)
+                logger.info("Compacted %d daily segments into %s", len(days), month)
+            self._write_manifest()
+            self._writes += 1
+        return merged
+
+    def drop(self, before: float) -> List[str]:
+        """
+        Delete every segment whose vectors were all scraped before the given
+        epoch seconds and return the ids of the vectors removed, so indexes
+        kept alongside (lexical, near-duplicate) can drop them too
+        """
+        dropped = []
+        with self._lock:
+            self.flush()
+            for name, stats in list(self._stats.items()):
+                if stats['max_ts'] is not None and stats['max_ts'] < before:
+                    dropped.extend(self._segments[name].ids())
+                    self._remove_segment(name)
+                    logger.info("Dropped segment %s (%d vectors)", name, stats['count'])
+            self._write_manifest()
+            self._writes += 1
+        return dropped
+
+    def __len__(self):
+        return self.describe_index_stats()['total_vector_count']
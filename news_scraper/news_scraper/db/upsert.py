@@ -0,0 +1,220 @@
+"""
+Concurrent, size-aware and resumable upserts into a vector index
+"""
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from news_scraper.db.backends import IndexBackend
+from news_scraper.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Pinecone rejects upsert requests over 2MB or 1000 vectors
+MAX_BATCH_BYTES = 2 * 1024 * 1024
+MAX_BATCH_VECTORS = 1000
+
+# Approximate bytes per vector value in a JSON request body
+_VALUE_BYTES = 12
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_CHUNK = 500
+
+
+def vector_bytes(vector: Dict) -> int:
+    """Approximate size of vector in an upsert request"""
+    metadata = json.dumps(vector.get('metadata') or {}, ensure_ascii=False).encode('utf-8')
+    return len(vector['id']) + len(metadata) + len(vector['values']) * _VALUE_BYTES + 64
+
+
+def to_payload(vectors: List[Dict]) -> List[Dict]:
+    """Convert NumPy vector values to the plain lists the index client expects"""
+    return [
+        {**vector, 'values': vector['values'].tolist()} if isinstance(vector['values'], np.ndarray) else vector
+        for vector in vectors
+    ]
+
+
+def batch_by_size(vectors: List[Dict], batch_size: int = 100,
+                  max_bytes: int = MAX_BATCH_BYTES) -> List[List[Dict]]:
+    """Split vectors into batches of at most batch_size vectors and about max_bytes each"""
+    batches = []
+    batch = []
+    size = 0
+    for vector in vectors:
+        nbytes = vector_bytes(vector)
+        if batch and (len(batch) >= batch_size or size + nbytes > max_bytes):
+            batches.append(batch)
+            batch = []
+            size = 0
+        batch.append(vector)
+        size += nbytes
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class UpsertCheckpoint:
+    """
+    SQLite record of prepared vectors and which of them the index has
+    acknowledged. Vectors are saved as soon as they are prepared, so an ingest
+    that fails part way through can upsert them again on the next run instead
+    of repeating summarization and embedding; entries are dropped with
+    discard() once the articles they came from are recorded as stored.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS vectors (
+                id TEXT PRIMARY KEY,
+                vector_values BLOB NOT NULL,
+                metadata TEXT NOT NULL,
+                acked INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def save(self, vectors: List[Dict]) -> None:
+        """Record freshly prepared vectors as not yet acknowledged"""
+        rows = [(vector['id'], np.asarray(vector['values'], dtype=np.float32).tobytes(),
+                 json.dumps(vector['metadata'], ensure_ascii=False))
+                for vector in vectors]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO vectors VALUES (?, ?, ?, 0)", rows)
+            self._conn.commit()
+
+    def load(self, ids: List[str]) -> Dict[str, Tuple[Dict, bool]]:
+        """Return (vector, acknowledged) for the ids that have a saved vector, keyed by id"""
+        found = {}
+        with self._lock:
+            for i in range(0, len(ids), _QUERY_CHUNK):
+                chunk = ids[i:i + _QUERY_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT id, vector_values, metadata, acked FROM vectors WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk)
+                for vector_id, values, metadata, acked in rows:
+                    vector = {
+                        'id': vector_id,
+                        'values': np.frombuffer(values, dtype=np.float32),
+                        'metadata': json.loads(metadata),
+                    }
+                    found[vector_id] = (vector, bool(acked))
+        return found
+
+    def ack(self, ids: List[str]) -> None:
+        """Record that the index has accepted the vectors with ids"""
+        with self._lock:
+            self._conn.executemany("UPDATE vectors SET acked = 1 WHERE id = ?", [(i,) for i in ids])
+            self._conn.commit()
+
+    def discard(self, ids: List[str]) -> None:
+        """Forget vectors whose articles no longer need them"""
+        with self._lock:
+            self._conn.executemany("DELETE FROM vectors WHERE id = ?", [(i,) for i in ids])
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT acked, COUNT(*) FROM vectors GROUP BY acked").fetchall()
+        counts = dict(rows)
+        return {'pending': counts.get(0, 0), 'acked': counts.get(1, 0)}
+
+    def close(self) -> None:
+        """Close the underlying database"""
+        with self._lock:
+            self._conn.close()
+
+
+class ParallelUpserter:
+    """
+    Upserts vectors with up to max_in_flight batches outstanding at once.
+    Batches hold at most batch_size vectors and about max_batch_bytes of
+    request body, so articles with large metadata do not trip the index's
+    request limit. A failed batch is retried up to max_retries times with
+    full-jitter exponential backoff; if it still fails, the batches already
+    in flight are allowed to finish, flushed and acknowledged in the
+    checkpoint before the error is raised.
+    """
+
+    def __init__(self, index: IndexBackend, max_in_flight: int = 4, batch_size: int = 100,
+                 max_batch_bytes: int = MAX_BATCH_BYTES, max_retries: int = 4, backoff: float = 0.5,
+                 max_backoff: float = 30.0, checkpoint: Optional[UpsertCheckpoint] = None):
+        self.index = index
+        self.max_in_flight = max(1, max_in_flight)
+        self.batch_size = min(batch_size, MAX_BATCH_VECTORS)
+        self.max_batch_bytes = max_batch_bytes
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.checkpoint = checkpoint
+
+    def _send(self, batch: List[Dict]) -> List[str]:
+        payload = to_payload(batch)
+        attempt = 0
+        while True:
+            try:
+                with metrics.timer('upsert'):
+                    self.index.upsert(vectors=payload)
+                break
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                wait_seconds = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+                attempt += 1
+                metrics.increment('upsert_retries')
+                logger.warning("Upsert of %d vectors failed (attempt %d), retrying in %.2fs: %s",
+                               len(batch), attempt, wait_seconds, e)
+                time.sleep(wait_seconds)
+        metrics.increment('upserted_vectors', len(batch))
+        logger.info("Stored batch of %d articles", len(batch))
+        return [vector['id'] for vector in batch]
+
+    def upsert(self, vectors: List[Dict], flush: bool = True) -> int:
+        """
+        Upsert vectors, flush the index and return how many were stored; with
+        flush=False the caller flushes later, and the checkpoint, which only
+        records persisted vectors, is left untouched
+        """
+        batches = batch_by_size(vectors, self.batch_size, self.max_batch_bytes)
+        stored = []
+        error = None
+        with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='upsert') as executor:
+            pending = iter(batches)
+            in_flight = set()
+            while True:
+                while error is None and len(in_flight) < self.max_in_flight:
+                    batch = next(pending, None)
+                    if batch is None:
+                        break
+                    in_flight.add(executor.submit(self._send, batch))
+                if not in_flight:
+                    break
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        stored.extend(future.result())
+                    except Exception as e:
+                        logger.error("Error storing batch: %s", e)
+                        error = error or e
+        # Batches only count as acknowledged once the index has persisted them
+        if stored and flush:
+            self.index.flush()
+            if self.checkpoint is not None:
+                self.checkpoint.ack(stored)
+        if error is not None:
+            raise error
+        return len(stored)
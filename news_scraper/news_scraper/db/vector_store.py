@@ -1,32 +1,74 @@
 """
-Vector database storage module using Pinecone
+Vector database storage module using Pinecone or a local index
 """
+import logging
 import os
-from pinecone import Pinecone, ServerlessSpec
-from sentence_transformers import SentenceTransformer
-from transformers import pipeline
+import time
+from itertools import islice
 from typing import List, Dict
-import json
+import numpy as np
+from news_scraper.db.article_store import ArticleStore, iter_articles, timestamp_seconds
+from news_scraper.db.backends import IndexBackend, PineconeBackend
+from news_scraper.db.upsert import ParallelUpserter, UpsertCheckpoint
+from news_scraper.hashing import article_id, content_hash
+from news_scraper.inference import InferencePool
+from news_scraper.metrics import metrics
+from news_scraper.models import ModelRegistry, registry
+from news_scraper.near_duplicates import NearDuplicateIndex
+from news_scraper.search.bm25 import BM25Index
+from news_scraper.summarizers import Summarizer, SummaryCache, summarizer_from_env
 
-# Initialize models
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-summarizer = pipeline("summarization", model="facebook/bart-large-cnn", max_length=150)
+logger = logging.getLogger(__name__)
 
 class VectorDBStorage:
-    def __init__(self, api_key: str, index_name: str = "news-articles-index", environment: str = "us-west1-gcp"):
-        """Initialize Pinecone client with API key"""
+    def __init__(self, api_key: str = None, index_name: str = "news-articles-index", environment: str = "us-west1-gcp",
+                 models: ModelRegistry = None, backend: IndexBackend = None, lexical_index: BM25Index = None,
+                 summarizer: Summarizer = None, summary_cache: SummaryCache = None,
+                 near_duplicates: NearDuplicateIndex = None, upsert_workers: int = 4,
+                 inference: InferencePool = None):
+        """
+        Initialize storage on the Pinecone index index_name, or on backend when one
+        is given; models are loaded lazily from the shared registry. Stored articles
+        are also added to lexical_index, if given, for keyword search. Summaries
+        come from summarizer (by default the one named by NEWS_SUMMARIZER) and are
+        kept in summary_cache, if given. With near_duplicates, articles that repeat
+        an already stored story under another URL are skipped before any model work.
+        Up to upsert_workers upsert batches are sent to the index at once. With
+        an inference pool, summarization and embedding run in its worker
+        processes instead of in this process; summaries then come from the pool's
+        summarizer, so summarizer must not be given as well.
+        """
+        self.models = models or registry
+        self.inference = inference
+        if inference is not None:
+            # The pool's workers build their own summarizer; another one here would key the cache wrongly
+            if summarizer is not None:
+                raise ValueError("Give the InferencePool a summarizer_factory instead of passing summarizer with inference")
+            summarizer = inference.summarizer
+        self.summarizer = summarizer or summarizer_from_env(self.models)
+        self.summary_cache = summary_cache
+        self.near_duplicates = near_duplicates
+        self.upsert_workers = upsert_workers
+        self.lexical_index = lexical_index
         self.api_key = api_key
         self.environment = environment
-        self.pc = Pinecone(api_key=api_key)
+        self.backend = backend
+        self.pc = None
+        if backend is None:
+            from pinecone import Pinecone
+            self.pc = Pinecone(api_key=api_key)
         self.index_name = index_name
         
-    def get_index(self, index_name: str):
-        """Get or create Pinecone index"""
+    def get_index(self, index_name: str) -> IndexBackend:
+        """Get the configured backend, or get or create the Pinecone index"""
+        if self.backend is not None:
+            return self.backend
         try:
+            from pinecone import ServerlessSpec
             existing_indexes = self.pc.list_indexes()
             
             if index_name not in [index.name for index in existing_indexes]:
-                print(f"Creating new index: {index_name}")
+                logger.info("Creating new index: %s", index_name)
                 self.pc.create_index(
                     name=index_name,
                     dimension=384,  # all-MiniLM-L6-v2 produces 384-dimensional embeddings
@@ -34,47 +76,76 @@ class VectorDBStorage:
                     spec=ServerlessSpec(cloud="aws", region="us-west-2")
                 )
             else:
-                print(f"Using existing index: {index_name}")
+                logger.info("Using existing index: %s", index_name)
                 
-            return self.pc.Index(name=index_name)
+            return PineconeBackend(self.pc.Index(name=index_name))
         except Exception as e:
-            print(f"Error with Pinecone index: {str(e)}")
+            logger.error("Error with Pinecone index: %s", e)
             raise
 
     def generate_embedding(self, text: str) -> List[float]:
         """Generate embedding for text"""
-        embedding = embedding_model.encode(text)
+        embedding = self.models.embedding_model().encode(text)
         return [float(x) for x in embedding]
 
+    def generate_embeddings(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Generate embeddings for texts in batched forward passes, one float32 row per text"""
+        with metrics.timer('embed', kind='article'):
+            if self.inference is not None:
+                embeddings = self.inference.embed(texts, batch_size=batch_size)
+            else:
+                embeddings = self.models.embedding_model().encode(texts,
+                                                                  batch_size=batch_size,
+                                                                  convert_to_numpy=True,
+                                                                  show_progress_bar=False)
+        metrics.increment('embedded_texts', len(texts))
+        return np.asarray(embeddings, dtype=np.float32)
+
     def generate_summary(self, text: str, max_length: int = 150) -> str:
         """Generate a concise summary of the article"""
-        try:
-            paragraphs = text.split('\n\n')[:3]
-            text_to_summarize = ' '.join(paragraphs)
-            words = text_to_summarize.split()[:1000]
-            truncated_text = ' '.join(words)
-            
-            summary = summarizer(truncated_text, 
-                              max_length=max_length, 
-                              min_length=30, 
-                              do_sample=False,
-                              truncation=True)[0]['summary_text']
-            return summary.strip()
-        except Exception as e:
-            print(f"Warning: Could not generate summary: {str(e)}")
-            return text.split('\n\n')[0] if text else ""
+        return self.generate_summaries([text], batch_size=1, max_length=max_length)[0]
 
-    def prepare_article_vector(self, article: Dict) -> Dict:
-        """Prepare article data for vector database storage"""
-        summary = self.generate_summary(article['content'])
-        
-        # Combine title and first few paragraphs for embedding
+    def generate_summaries(self, texts: List[str], batch_size: int = 8, max_length: int = 150) -> List[str]:
+        """
+        Summarize texts with the configured summarizer. With a summary cache,
+        texts summarized before are looked up instead of summarized again.
+        """
+        if self.summary_cache is None:
+            return self._summarize(texts, max_length, batch_size)
+        keys = [SummaryCache.key(self.summarizer, text, max_length) for text in texts]
+        cached = self.summary_cache.get_many(keys)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+        metrics.increment('summary_cache', len(texts) - len(missing), outcome='hit')
+        if missing:
+            fresh = dict(zip(missing, self._summarize(list(missing.values()), max_length, batch_size)))
+            self.summary_cache.put_many(fresh)
+            cached.update(fresh)
+        return [cached[key] for key in keys]
+
+    def _summarize(self, texts: List[str], max_length: int, batch_size: int) -> List[str]:
+        with metrics.timer('summarize', summarizer=self.summarizer.name):
+            if self.inference is not None:
+                summaries = self.inference.summarize(texts, max_length=max_length, batch_size=batch_size)
+            else:
+                summaries = self.summarizer.summarize(texts, max_length=max_length, batch_size=batch_size)
+        metrics.increment('summarized_texts', len(texts))
+        return summaries
+
+    @staticmethod
+    def _embedding_text(article: Dict) -> str:
+        """Combine title and first few paragraphs for embedding"""
         paragraphs = article['content'].split('\n\n')[:3]
-        content_for_embedding = f"{article['heading']} {' '.join(paragraphs)}"
-        embedding = self.generate_embedding(content_for_embedding)
-        
-        # Create unique ID
-        unique_id = str(abs(hash(article['url'])))[:12]
+        return f"{article['heading']} {' '.join(paragraphs)}"
+
+    @staticmethod
+    def _build_vector(article: Dict, summary: str, embedding) -> Dict:
+        """Assemble the id, embedding and metadata stored for an article"""
+        # Stable ID derived from the URL, so re-ingesting an article replaces its vector
+        unique_id = article_id(article['url'])
+        paragraphs = article['content'].split('\n\n')[:1]
         
         # Create truncated metadata to stay under Pinecone's 40KB limit
         metadata = {
@@ -84,7 +155,10 @@ class VectorDBStorage:
             'keywords': article['keywords'][:500],  # Limit keywords length
             'source': article['source'][:100],  # Limit source length
             'scraped_at': article['timestamp'],
-            'content_preview': ' '.join(paragraphs[:1])[:2000]  # Limit preview length and use only first paragraph
+            # Numeric copy for time-range filters; the index cannot compare strings
+            'scraped_ts': timestamp_seconds(article['timestamp']) or time.time(),
+            'content_hash': content_hash(article),
+            'content_preview': ' '.join(paragraphs)[:2000]  # Limit preview length and use only first paragraph
         }
         
         return {
@@ -93,54 +167,211 @@ class VectorDBStorage:
             'metadata': metadata
         }
 
-    def store_articles(self, articles_file: str) -> None:
-        """Store articles from JSON file in vector database"""
-        print(f"Loading articles from: {articles_file}\n")
-        with open(articles_file, 'r', encoding='utf-8') as f:
-            articles = json.load(f)
-        
-        print(f"Storing articles in index: {self.index_name}")
+    def prepare_article_vector(self, article: Dict) -> Dict:
+        """Prepare article data for vector database storage"""
+        summary = self.generate_summary(article['content'])
+        embedding = self.generate_embedding(self._embedding_text(article))
+        return self._build_vector(article, summary, embedding)
+
+    def prepare_article_vectors(self, articles: List[Dict], batch_size: int = 32,
+                                summary_batch_size: int = 8) -> List[Dict]:
+        """
+        Prepare many articles at once with batched summarization and embedding.
+        Vector values are left as NumPy rows; they are converted to lists only
+        when upserted.
+        """
+        if not articles:
+            return []
+        summaries = self.generate_summaries([article['content'] for article in articles],
+                                            batch_size=summary_batch_size)
+        embeddings = self.embed_articles(articles, batch_size=batch_size)
+        return self.build_vectors(articles, summaries, embeddings)
+
+    def embed_articles(self, articles: List[Dict], batch_size: int = 32) -> np.ndarray:
+        """Embed the heading and first paragraphs of each article in batches"""
+        return self.generate_embeddings([self._embedding_text(article) for article in articles],
+                                        batch_size=batch_size)
+
+    def build_vectors(self, articles: List[Dict], summaries: List[str], embeddings) -> List[Dict]:
+        """Assemble index vectors from articles and their summaries and embeddings"""
+        return [self._build_vector(article, summary, embedding)
+                for article, summary, embedding in zip(articles, summaries, embeddings)]
+
+    def select_changed_articles(self, articles: List[Dict], index: IndexBackend,
+                                existing: Dict[str, Dict] = None) -> List[Dict]:
+        """
+        Return the articles that are not in the index yet or whose content has
+        changed; existing may hold the index's vectors for these articles, already fetched
+        """
+        ids = [article_id(article['url']) for article in articles]
+        if existing is None:
+            existing = index.fetch(ids)
+        changed = []
+        for article, vector_id in zip(articles, ids):
+            stored = existing.get(vector_id)
+            if stored is None or stored['metadata'].get('content_hash') != content_hash(article):
+                changed.append(article)
+        return changed
+
+    def filter_near_duplicates(self, articles: List[Dict], known: List[Dict] = None) -> List[Dict]:
+        """
+        Drop articles that are near-duplicates of stored ones, linking them to
+        their canonical article in the near-duplicate index. known are articles
+        already in the vector index; they are added to the near-duplicate index
+        if it does not have them yet, so older stories are matched too.
+        """
+        if self.near_duplicates is None:
+            return articles
+        if known:
+            self.near_duplicates.add_articles(known)
+        originals = []
+        for article, match in zip(articles, self.near_duplicates.check_articles(articles)):
+            if match is None:
+                originals.append(article)
+            else:
+                logger.info("Skipping near-duplicate of %s (%.2f similar)", match[0], match[1],
+                            extra={'url': article['url']})
+        return originals
+
+    def update_lexical_index(self, articles: List[Dict], vectors: List[Dict], existing: Dict[str, Dict],
+                             save: bool = True) -> None:
+        """
+        Add freshly prepared vectors' articles to the lexical index, along with
+        stored articles it does not have yet, so both indexes cover the same
+        articles; with save=False the caller saves the lexical index later
+        """
+        prepared = {vector['id']: vector['metadata'] for vector in vectors}
+        for article in articles:
+            vector_id = article_id(article['url'])
+            metadata = prepared.get(vector_id)
+            if metadata is None:
+                if vector_id in self.lexical_index or vector_id not in existing:
+                    continue
+                metadata = existing[vector_id]['metadata']
+            fields = {key: metadata.get(key)
+                      for key in ('url', 'heading', 'summary', 'source', 'scraped_at', 'scraped_ts')}
+            self.lexical_index.add(vector_id, article['heading'], article['content'], fields)
+        if save:
+            self.lexical_index.save()
+
+    def upsert_vectors(self, index: IndexBackend, vectors: List[Dict], batch_size: int = 100,
+                       checkpoint: UpsertCheckpoint = None, flush: bool = True) -> int:
+        """
+        Upsert vectors in size-limited batches of at most batch_size, several at
+        a time and retrying failures, then flush the index unless flush is
+        False; acknowledged vectors are marked in checkpoint, if given. Returns
+        how many were stored.
+        """
+        upserter = ParallelUpserter(index, max_in_flight=self.upsert_workers, batch_size=batch_size,
+                                    checkpoint=checkpoint)
+        return upserter.upsert(vectors, flush=flush)
+
+    def store_articles(self, articles_file: str, batch_size: int = 32, summary_batch_size: int = 8,
+                       chunk_size: int = 256, article_store: ArticleStore = None,
+                       checkpoint: UpsertCheckpoint = None) -> None:
+        """
+        Store articles from a JSON or JSON Lines file in vector database. The file
+        is streamed chunk_size articles at a time so memory stays flat; with an
+        article_store, ingestion resumes after the last record recorded in its
+        manifest and progress is saved after every chunk. With a checkpoint,
+        prepared vectors are saved before they are upserted, so after a failed
+        upsert the next run sends them again without redoing the model work.
+        """
+        logger.info("Loading articles from: %s", articles_file)
+        logger.info("Storing articles in index: %s", self.index_name)
         index = self.get_index(self.index_name)
         
         # Get existing articles to check for duplicates
         existing_count = 0
         try:
             stats = index.describe_index_stats()
-            existing_count = stats.total_vector_count
+            existing_count = stats['total_vector_count']
         except Exception as e:
-            print(f"Could not get index stats: {str(e)}")
+            logger.warning("Could not get index stats: %s", e)
         
-        print(f"Found {existing_count} existing articles in the index")
+        logger.info("Found %d existing articles in the index", existing_count)
         
-        # Prepare vectors for all articles
-        vectors = []
+        start = article_store.position(articles_file) if article_store else None
+        records = iter_articles(articles_file, start)
         urls_seen = set()
         skipped = 0
+        unchanged = 0
+        near_duplicates = 0
+        stored = 0
+        position = start
         
-        for article in articles:
-            if article['url'] in urls_seen:
-                skipped += 1
-                continue
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            position = chunk[-1][1]
+            
+            unique_articles = []
+            for article, _ in chunk:
+                if article['url'] in urls_seen:
+                    skipped += 1
+                    continue
+                
+                urls_seen.add(article['url'])
+                unique_articles.append(article)
+            
+            # Only new or changed articles go through summarization and embedding
+            existing = index.fetch([article_id(article['url']) for article in unique_articles])
+            changed_articles = self.select_changed_articles(unique_articles, index, existing)
+            unchanged += len(unique_articles) - len(changed_articles)
+            
+            # Vectors prepared by an earlier run that failed to store them are reused
+            resumed = []
+            if checkpoint is not None and changed_articles:
+                saved = checkpoint.load([article_id(article['url']) for article in changed_articles])
+                fresh_articles = []
+                for article in changed_articles:
+                    vector, acked = saved.get(article_id(article['url']), (None, False))
+                    if vector is not None and vector['metadata'].get('content_hash') == content_hash(article):
+                        resumed.append((vector, acked))
+                    else:
+                        fresh_articles.append(article)
+                if resumed:
+                    logger.info("Resuming %d prepared articles from the checkpoint", len(resumed))
+                changed_articles = fresh_articles
+            
+            # Republished copies of stored stories are skipped before any model work
+            changed_urls = {article['url'] for article in changed_articles}
+            original_articles = self.filter_near_duplicates(
+                changed_articles, [article for article in unique_articles if article['url'] not in changed_urls])
+            near_duplicates += len(changed_articles) - len(original_articles)
+            changed_articles = original_articles
+            vectors = self.prepare_article_vectors(changed_articles,
+                                                   batch_size=batch_size,
+                                                   summary_batch_size=summary_batch_size)
+            if checkpoint is not None:
+                checkpoint.save(vectors)
+            
+            # Store vectors in batches, skipping resumed ones the index already acknowledged
+            pending = vectors + [vector for vector, acked in resumed if not acked]
+            stored += self.upsert_vectors(index, pending, checkpoint=checkpoint)
+            vectors += [vector for vector, _ in resumed]
+            
+            # Keep the lexical index in step with the vector index
+            if self.lexical_index is not None:
+                self.update_lexical_index(unique_articles, vectors, existing)
             
-            urls_seen.add(article['url'])
-            vector = self.prepare_article_vector(article)
-            vectors.append(vector)
+            if article_store is not None:
+                article_store.mark_processed(articles_file, position)
+            if checkpoint is not None:
+                checkpoint.discard([article_id(article['url']) for article in unique_articles])
         
-        print(f"Skipped {skipped} duplicate articles")
+        if article_store is not None and position is not None:
+            article_store.mark_processed(articles_file, position, complete=True)
         
-        # Store vectors in batches
-        if vectors:
-            batch_size = 100
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                try:
-                    index.upsert(vectors=batch)
-                    print(f"Stored batch of {len(batch)} articles")
-                except Exception as e:
-                    print(f"Error storing batch: {str(e)}")
-                    raise
-        else:
-            print("No new articles to store")
+        metrics.increment('ingest_skipped', skipped, reason='duplicate')
+        metrics.increment('ingest_skipped', unchanged, reason='unchanged')
+        metrics.increment('ingest_skipped', near_duplicates, reason='near_duplicate')
+        logger.info("Skipped %d duplicate articles", skipped)
+        logger.info("Skipped %d unchanged articles already in the index", unchanged)
+        if self.near_duplicates is not None:
+            logger.info("Skipped %d near-duplicates of stored articles", near_duplicates)
+        if not stored:
+            logger.info("No new articles to store")
         
-        print("Articles stored successfully!")
-        print("You can now query these articles using vector similarity search!")
+        logger.info("Stored %d articles from %s", stored, articles_file)
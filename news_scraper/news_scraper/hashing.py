@@ -0,0 +1,16 @@
+"""
+Stable hashing helpers for articles
+"""
+import hashlib
+
+
+def content_hash(article):
+    """Return a stable hex digest of an article's heading and content"""
+    heading = article.get('heading') or article.get('title') or ''
+    text = f"{heading}\n{article.get('content') or ''}"
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+
+def article_id(url):
+    """Return the vector id for an article URL, identical across processes and runs"""
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()[:24]
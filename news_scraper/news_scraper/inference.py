@@ -0,0 +1,224 @@
+"""
+Multi-process model inference: summarize and embed jobs spread across worker
+processes, each with its own models and thread settings
+"""
+import contextlib
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from news_scraper.metrics import metrics
+from news_scraper.models import ModelRegistry
+from news_scraper.summarizers import Summarizer, summarizer_from_env
+
+logger = logging.getLogger(__name__)
+
+# Thread pools sized from the environment when NumPy's BLAS, torch and the tokenizers load
+_THREAD_VARIABLES = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS')
+
+# Models and summarizer of the current worker process, set by _init_worker
+_worker = {}
+
+
+@contextlib.contextmanager
+def _worker_environment(num_threads: int):
+    """
+    Set the thread pool sizes in this process's environment while workers are
+    spawned. BLAS reads them when NumPy is first imported, which in a worker
+    happens while unpickling the initializer, before any of its code runs.
+    """
+    settings = {variable: str(num_threads) for variable in _THREAD_VARIABLES}
+    # Each worker already is one of many processes; nested tokenizer threads only contend
+    settings['TOKENIZERS_PARALLELISM'] = 'false'
+    saved = {variable: os.environ.get(variable) for variable in settings}
+    os.environ.update(settings)
+    try:
+        yield
+    finally:
+        for variable, value in saved.items():
+            if value is None:
+                os.environ.pop(variable, None)
+            else:
+                os.environ[variable] = value
+
+
+def _init_worker(models_factory: Callable, summarizer_factory: Callable, num_threads: int, preload: bool,
+                 ready):
+    """Load the worker's models once, before any job runs"""
+    models = models_factory()
+    if isinstance(models, ModelRegistry):
+        models.configure(num_threads=num_threads)
+    _worker['models'] = models
+    _worker['summarizer'] = summarizer_factory(models)
+    _worker['ready'] = ready
+    if preload:
+        models.embedding_model()
+        _worker['summarizer'].summarize(["Warm up. Load the model."], max_length=20, batch_size=1)
+
+
+def _wait_for_all_workers() -> int:
+    """Block until every worker has loaded its models, so each start-up job lands on its own worker"""
+    _worker['ready'].wait()
+    return _embedding_dimension()
+
+
+def _summarize_shard(texts: List[str], max_length: int, batch_size: int) -> List[str]:
+    return _worker['summarizer'].summarize(texts, max_length=max_length, batch_size=batch_size)
+
+
+def _embed_shard(texts: List[str], rows: List[int], buffer_name: str, shape: tuple, batch_size: int) -> None:
+    """Embed texts straight into the given rows of the caller's shared memory buffer"""
+    embeddings = _worker['models'].embedding_model().encode(texts, batch_size=batch_size,
+                                                            convert_to_numpy=True,
+                                                            show_progress_bar=False)
+    buffer = shared_memory.SharedMemory(name=buffer_name)
+    try:
+        out = np.ndarray(shape, dtype=np.float32, buffer=buffer.buf)
+        out[rows] = embeddings
+        del out
+    finally:
+        buffer.close()
+
+
+def _embedding_dimension() -> int:
+    return int(np.asarray(_worker['models'].embedding_model().encode(["dimension"])).shape[-1])
+
+
+def shard_by_length(texts: List[str], shards: int) -> List[List[int]]:
+    """
+    Split the positions of texts into up to shards groups of similar length,
+    longest group first. Batches within a shard then need little padding, and
+    handing out the long shards first keeps every worker busy to the end.
+    """
+    if not texts:
+        return []
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+    size = -(-len(order) // max(1, shards))
+    return [order[start:start + size] for start in range(0, len(order), size)]
+
+
+class InferencePool:
+    """
+    Runs summarization and embedding in a pool of worker processes, so model
+    inference uses every core instead of one interpreter. Each worker builds
+    its own models with models_factory (a ModelRegistry by default) and its
+    summarizer with summarizer_factory (the one named by NEWS_SUMMARIZER),
+    loads them once when it starts, and runs num_threads inference threads;
+    by default the cores are split evenly between workers. Workers are
+    started, with their thread settings in the environment they inherit, by
+    start() or the first job, which return once every worker is ready.
+
+    A job's texts are sorted by length and cut into shards_per_worker shards
+    per worker. Workers write embeddings directly into a shared memory buffer
+    owned by the caller, so the vectors are never pickled on the way back.
+    Both factories must be picklable, e.g. module-level classes or functions.
+    """
+
+    def __init__(self, workers: Optional[int] = None, num_threads: Optional[int] = None,
+                 models_factory: Callable = ModelRegistry,
+                 summarizer_factory: Callable[..., Summarizer] = summarizer_from_env,
+                 shards_per_worker: int = 2, preload: bool = True, start_method: str = 'spawn'):
+        cores = os.cpu_count() or 1
+        self.workers = max(1, workers or cores)
+        self.num_threads = max(1, num_threads or cores // self.workers)
+        self.shards_per_worker = max(1, shards_per_worker)
+        # Parent-side summarizer; only its name is used, to key the summary cache
+        self.summarizer = summarizer_factory(models_factory())
+        self._dimension = None
+        self._started = False
+        self._start_lock = threading.Lock()
+        # spawn, so workers never inherit a forked copy of loaded models or torch thread pools
+        context = multiprocessing.get_context(start_method)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(models_factory, summarizer_factory, self.num_threads, preload, context.Barrier(self.workers)))
+
+    def start(self) -> None:
+        """Start every worker and wait until each has loaded its models"""
+        with self._start_lock:
+            if self._started:
+                return
+            # Workers are spawned by submit(), so they inherit the environment as it is here
+            with _worker_environment(self.num_threads):
+                futures = [self._executor.submit(_wait_for_all_workers) for _ in range(self.workers)]
+            for future in futures:
+                self._dimension = future.result()
+            self._started = True
+
+    def dimension(self) -> int:
+        """Length of the embedding vectors the workers produce"""
+        self.start()
+        return self._dimension
+
+    def _shards(self, texts: List[str]) -> List[List[int]]:
+        return shard_by_length(texts, self.workers * self.shards_per_worker)
+
+    def summarize(self, texts: List[str], max_length: int = 150, batch_size: int = 8) -> List[str]:
+        """Summarize texts across the workers; one summary per text, in order"""
+        self.start()
+        summaries = [None] * len(texts)
+        shards = self._shards(texts)
+        with metrics.timer('inference', job='summarize'):
+            futures = [self._executor.submit(_summarize_shard, [texts[i] for i in shard], max_length, batch_size)
+                       for shard in shards]
+            for shard, future in zip(shards, futures):
+                for i, summary in zip(shard, future.result()):
+                    summaries[i] = summary
+        metrics.increment('inference_shards', len(shards), job='summarize')
+        return summaries
+
+    def embed(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Embed texts across the workers; one float32 row per text, in order"""
+        shape = (len(texts), self.dimension())
+        if not texts:
+            return np.zeros(shape, dtype=np.float32)
+        shards = self._shards(texts)
+        buffer = shared_memory.SharedMemory(create=True, size=shape[0] * shape[1] * 4)
+        try:
+            with metrics.timer('inference', job='embed'):
+                futures = [self._executor.submit(_embed_shard, [texts[i] for i in shard], shard, buffer.name,
+                                                 shape, batch_size)
+                           for shard in shards]
+                for future in futures:
+                    future.result()
+            # One copy out of the buffer, so it can be released right away
+            embeddings = np.ndarray(shape, dtype=np.float32, buffer=buffer.buf).copy()
+        finally:
+            buffer.close()
+            buffer.unlink()
+        metrics.increment('inference_shards', len(shards), job='embed')
+        return embeddings
+
+    def close(self) -> None:
+        """Stop the worker processes"""
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def inference_pool_from_env(workers: Optional[int] = None) -> Optional[InferencePool]:
+    """
+    InferencePool with workers processes, or NEWS_INFERENCE_WORKERS of them
+    (with NEWS_MODEL_THREADS threads each) when workers is None; None when
+    neither asks for one, so inference stays in process
+    """
+    workers = workers or int(os.getenv('NEWS_INFERENCE_WORKERS') or 0)
+    if workers <= 0:
+        return None
+    threads = os.getenv('NEWS_MODEL_THREADS')
+    pool = InferencePool(workers=workers, num_threads=int(threads) if threads else None)
+    pool.start()
+    logger.info("Started %d inference workers with %d threads each", pool.workers, pool.num_threads)
+    return pool
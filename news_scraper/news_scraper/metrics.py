@@ -0,0 +1,246 @@
+"""
+Stage timers, counters and structured logging for the scrape, ingest and search paths
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# Upper bounds, in seconds, of the latency histogram buckets
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Recent observations kept per timer for the quantiles in JSON snapshots
+RECENT_SAMPLES = 2048
+
+
+class _Timing:
+    """Latency histogram of one timer, plus its most recent samples"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.recent.append(seconds)
+
+    def snapshot(self) -> Dict:
+        p50, p95, p99 = np.percentile(self.recent, [50, 95, 99]) if self.recent else (0.0, 0.0, 0.0)
+        return {
+            'count': self.count,
+            'sum_seconds': round(self.sum, 6),
+            'mean_ms': round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(float(p50) * 1000, 3),
+            'p95_ms': round(float(p95) * 1000, 3),
+            'p99_ms': round(float(p99) * 1000, 3),
+        }
+
+
+class _Timer:
+    """Context manager recording the time spent in its block"""
+
+    __slots__ = ('metrics', 'name', 'labels', 'start')
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        if exc_type is not None:
+            self.metrics.increment(f'{self.name}_errors', **self.labels)
+
+
+class _NullTimer:
+    """Shared do-nothing timer handed out while metrics are disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def _label_key(labels: Dict) -> tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Metrics:
+    """
+    Process-wide timers and counters, optionally labelled (e.g. mode='hybrid').
+    Disabled unless NEWS_METRICS or NEWS_METRICS_FILE is set or enable() is
+    called; while disabled, timer() returns a shared no-op and increment()
+    returns at once. Hooks added with add_hook() are called with
+    (name, seconds, labels) for every timed block, e.g. to feed a tracer.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, buckets=DEFAULT_BUCKETS, prefix: str = 'news'):
+        if enabled is None:
+            enabled = bool(os.getenv('NEWS_METRICS') or os.getenv('NEWS_METRICS_FILE'))
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self._timings: Dict[str, Dict[tuple, _Timing]] = {}
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        self._hooks: List[Callable] = []
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def add_hook(self, hook: Callable) -> None:
+        """Call hook(name, seconds, labels) for every timed block"""
+        self._hooks.append(hook)
+
+    def timer(self, name: str, **labels):
+        """Context manager timing its block as name"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        """Record a duration for name"""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._timings.setdefault(name, {})
+            timing = series.get(key)
+            if timing is None:
+                timing = series[key] = _Timing(self.buckets)
+            timing.observe(seconds)
+        for hook in self._hooks:
+            hook(name, seconds, labels)
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        """Add value to the counter name"""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> Dict:
+        """Counters and timer statistics (count, mean and p50/p95/p99 in ms) as a dict"""
+        def series_name(name, key):
+            if not key:
+                return name
+            return name + '{' + ','.join(f'{label}={value}' for label, value in key) + '}'
+
+        with self._lock:
+            return {
+                'timers': {series_name(name, key): timing.snapshot()
+                           for name, series in sorted(self._timings.items())
+                           for key, timing in sorted(series.items())},
+                'counters': {series_name(name, key): value
+                             for name, series in sorted(self._counters.items())
+                             for key, value in sorted(series.items())},
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Counters and timer histograms in the Prometheus text exposition format"""
+        def labels_text(key, extra=()):
+            pairs = list(key) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{label}="{value}"' for label, value in pairs) + '}'
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                metric = f'{self.prefix}_{name}_total'
+                lines.append(f'# TYPE {metric} counter')
+                for key, value in sorted(series.items()):
+                    lines.append(f'{metric}{labels_text(key)} {value}')
+            for name, series in sorted(self._timings.items()):
+                metric = f'{self.prefix}_{name}_seconds'
+                lines.append(f'# TYPE {metric} histogram')
+                for key, timing in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(self.buckets + ('+Inf',), timing.counts):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{labels_text(key, [("le", bound)])} {cumulative}')
+                    lines.append(f'{metric}_sum{labels_text(key)} {timing.sum}')
+                    lines.append(f'{metric}_count{labels_text(key)} {timing.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str) -> None:
+        """Write a snapshot to path: Prometheus text for .prom files, JSON otherwise"""
+        text = self.to_prometheus() if path.endswith('.prom') else self.to_json()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+# Metrics shared by the scraper, storage and search modules
+metrics = Metrics()
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats log records as one JSON object per line, including any extra= fields"""
+
+    _STANDARD = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in self._STANDARD})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level: Optional[str] = None, json_format: Optional[bool] = None) -> None:
+    """
+    Log to stderr for the command-line scripts. level defaults to NEWS_LOG_LEVEL
+    (INFO); json_format defaults to NEWS_LOG_FORMAT=json.
+    """
+    level = level or os.getenv('NEWS_LOG_LEVEL', 'INFO')
+    if json_format is None:
+        json_format = os.getenv('NEWS_LOG_FORMAT', '').lower() == 'json'
+    handler = logging.StreamHandler()
+    handler.setFormatter(JSONFormatter() if json_format else logging.Formatter('%(message)s'))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level.upper())
+
+
+def write_metrics_file() -> None:
+    """Write a snapshot of the shared metrics to NEWS_METRICS_FILE, if it is set"""
+    path = os.getenv('NEWS_METRICS_FILE')
+    if path:
+        metrics.write(path)
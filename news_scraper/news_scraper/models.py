@@ -0,0 +1,75 @@
+"""
+Lazily loaded models shared by the storage and search modules
+"""
+import os
+import threading
+
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+SUMMARIZATION_MODEL_NAME = 'facebook/bart-large-cnn'
+
+
+class ModelRegistry:
+    """
+    Loads each model the first time it is requested and hands out the same
+    instance afterwards. device and num_threads apply to models loaded after
+    they are set; they default to the NEWS_MODEL_DEVICE and NEWS_MODEL_THREADS
+    environment variables.
+    """
+
+    def __init__(self, device=None, num_threads=None):
+        self.device = device or os.getenv('NEWS_MODEL_DEVICE') or None
+        threads = num_threads or os.getenv('NEWS_MODEL_THREADS')
+        self.num_threads = int(threads) if threads else None
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def configure(self, device=None, num_threads=None):
+        """Pin the device and torch thread count used for models loaded from now on"""
+        if device is not None:
+            self.device = device
+        if num_threads is not None:
+            self.num_threads = num_threads
+
+    def _apply_thread_settings(self):
+        if self.num_threads:
+            import torch
+            torch.set_num_threads(self.num_threads)
+
+    def _get(self, key, loader):
+        model = self._models.get(key)
+        if model is None:
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    self._apply_thread_settings()
+                    model = loader()
+                    self._models[key] = model
+        return model
+
+    def embedding_model(self, name=EMBEDDING_MODEL_NAME):
+        """Return the shared SentenceTransformer called name"""
+        def load():
+            from sentence_transformers import SentenceTransformer
+            return SentenceTransformer(name, device=self.device)
+        return self._get(('embedding', name), load)
+
+    def summarizer(self, name=SUMMARIZATION_MODEL_NAME):
+        """Return the shared summarization pipeline for model name"""
+        def load():
+            from transformers import pipeline
+            kwargs = {'device': self.device} if self.device else {}
+            return pipeline("summarization", model=name, max_length=150, **kwargs)
+        return self._get(('summarization', name), load)
+
+    def loaded(self):
+        """Return the (kind, name) keys of the models loaded so far"""
+        return list(self._models)
+
+    def clear(self):
+        """Drop every loaded model so the memory can be reclaimed"""
+        with self._lock:
+            self._models.clear()
+
+
+# Registry shared by VectorDBStorage and NewsSearch unless they are given their own
+registry = ModelRegistry()
@@ -0,0 +1,221 @@
+"""
+Near-duplicate article detection with MinHash signatures and locality-sensitive hashing
+"""
+import hashlib
+import re
+import sqlite3
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from news_scraper.hashing import article_id
+from news_scraper.metrics import metrics
+
+_WORD = re.compile(r'\w+')
+
+# Permutations are (a * x + b) mod a Mersenne prime over 32-bit shingle hashes. With a, b and x
+# all below 2**32, a * x + b stays below 2**64, so the uint64 arithmetic never wraps before the
+# reduction.
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_CHUNK = 500
+
+
+def shingles(text: str, size: int = 3) -> np.ndarray:
+    """32-bit hashes of the distinct runs of size consecutive words in text"""
+    words = _WORD.findall(text.lower())
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    if len(words) < size:
+        size = len(words)
+    hashes = {zlib.crc32(' '.join(words[i:i + size]).encode('utf-8')) for i in range(len(words) - size + 1)}
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+
+class NearDuplicateIndex:
+    """
+    Persistent MinHash LSH index of stored articles' content. An article whose
+    estimated Jaccard similarity to an indexed one (over word shingles) reaches
+    threshold is a near-duplicate: a republished story or a live page under a
+    new URL. Those are linked to the canonical article and kept out of the
+    vector index, so they cost no summary, embedding or upsert.
+
+    Signatures of num_perm MinHash values are split into bands; articles that
+    agree on every value of some band become candidates, which are then
+    confirmed on the full signature. With the defaults (32 bands of 4)
+    articles above ~0.6 similarity are almost always found as candidates.
+    """
+
+    def __init__(self, path: str, threshold: float = 0.7, num_perm: int = 128, bands: int = 32,
+                 shingle_size: int = 3, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS signatures (
+                id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                signature BLOB NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS buckets (
+                bucket INTEGER NOT NULL,
+                id TEXT NOT NULL,
+                PRIMARY KEY (bucket, id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS duplicates (
+                url TEXT PRIMARY KEY,
+                canonical_url TEXT NOT NULL,
+                similarity REAL NOT NULL
+            ) WITHOUT ROWID;
+        """)
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature of text as num_perm uint32 values, or None for text without words"""
+        hashes = shingles(text, self.shingle_size)
+        if not len(hashes):
+            return None
+        permuted = (np.outer(hashes & _MAX_HASH, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _buckets(self, signature: np.ndarray) -> List[int]:
+        """One LSH bucket key per band, with the band number mixed in"""
+        keys = []
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            digest = hashlib.blake2b(chunk, digest_size=8, person=band.to_bytes(2, 'little')).digest()
+            keys.append(int.from_bytes(digest, 'little', signed=True))
+        return keys
+
+    def _candidates(self, buckets: List[int]) -> Dict[str, Tuple[str, np.ndarray]]:
+        placeholders = ','.join('?' * len(buckets))
+        rows = self._conn.execute(f"""
+            SELECT id, url, signature FROM signatures WHERE id IN (
+                SELECT DISTINCT id FROM buckets WHERE bucket IN ({placeholders}))
+        """, buckets)
+        return {row[0]: (row[1], np.frombuffer(row[2], dtype=np.uint32)) for row in rows}
+
+    def _store(self, vector_id: str, url: str, signature: np.ndarray, buckets: List[int]) -> None:
+        self._conn.execute("DELETE FROM buckets WHERE id = ?", (vector_id,))
+        self._conn.execute("INSERT OR REPLACE INTO signatures VALUES (?, ?, ?)",
+                           (vector_id, url, signature.tobytes()))
+        self._conn.executemany("INSERT OR IGNORE INTO buckets VALUES (?, ?)",
+                               [(bucket, vector_id) for bucket in buckets])
+        self._conn.execute("DELETE FROM duplicates WHERE url = ?", (url,))
+
+    def check_articles(self, articles: List[Dict]) -> List[Optional[Tuple[str, float]]]:
+        """
+        Return, for each article, (canonical URL, similarity) if it is a
+        near-duplicate of an indexed article or of an earlier one in the list,
+        else None. Articles that are not duplicates are indexed straight away;
+        an article is never a duplicate of its own URL, so changed content
+        simply replaces its signature.
+        """
+        results = []
+        with metrics.timer('near_duplicates'), self._lock:
+            for article in articles:
+                signature = self.signature(f"{article.get('heading', '')}\n{article.get('content') or ''}")
+                if signature is None:
+                    results.append(None)
+                    continue
+                vector_id = article_id(article['url'])
+                buckets = self._buckets(signature)
+                best = None
+                for candidate_id, (url, stored) in self._candidates(buckets).items():
+                    if candidate_id == vector_id:
+                        continue
+                    similarity = float(np.mean(stored == signature))
+                    if similarity >= self.threshold and (best is None or similarity > best[1]):
+                        best = (url, similarity)
+                if best is None:
+                    self._store(vector_id, article['url'], signature, buckets)
+                else:
+                    self._conn.execute("INSERT OR REPLACE INTO duplicates VALUES (?, ?, ?)",
+                                       (article['url'], best[0], best[1]))
+                results.append(best)
+            self._conn.commit()
+        found = sum(1 for result in results if result is not None)
+        metrics.increment('near_duplicates', found)
+        return results
+
+    def add_articles(self, articles: List[Dict]) -> int:
+        """
+        Index articles known not to be duplicates, e.g. ones stored before this
+        index existed, skipping any already indexed; returns how many were added
+        """
+        added = 0
+        with self._lock:
+            ids = [article_id(article['url']) for article in articles]
+            indexed = set()
+            for i in range(0, len(ids), _QUERY_CHUNK):
+                chunk = ids[i:i + _QUERY_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT id FROM signatures WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+                indexed.update(row[0] for row in rows)
+            for article, vector_id in zip(articles, ids):
+                if vector_id in indexed:
+                    continue
+                signature = self.signature(f"{article.get('heading', '')}\n{article.get('content') or ''}")
+                if signature is not None:
+                    self._store(vector_id, article['url'], signature, self._buckets(signature))
+                    indexed.add(vector_id)
+                    added += 1
+            self._conn.commit()
+        return added
+
+    def remove(self, ids: List[str]) -> int:
+        """
+        Forget the articles with ids (vector ids), e.g. once retention has
+        dropped them, along with the duplicate links pointing at them, so later
+        copies of those stories are stored again; returns how many were removed
+        """
+        removed = 0
+        with self._lock:
+            for i in range(0, len(ids), _QUERY_CHUNK):
+                chunk = ids[i:i + _QUERY_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                urls = [row[0] for row in self._conn.execute(
+                    f"SELECT url FROM signatures WHERE id IN ({placeholders})", chunk)]
+                self._conn.execute(f"DELETE FROM buckets WHERE id IN ({placeholders})", chunk)
+                removed += self._conn.execute(f"DELETE FROM signatures WHERE id IN ({placeholders})", chunk).rowcount
+                if urls:
+                    self._conn.execute(
+                        f"DELETE FROM duplicates WHERE canonical_url IN ({','.join('?' * len(urls))})", urls)
+            self._conn.commit()
+        return removed
+
+    def canonical(self, url: str) -> Optional[str]:
+        """URL of the article that url was found to duplicate, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT canonical_url FROM duplicates WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'articles': self._conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0],
+                'duplicates': self._conn.execute("SELECT COUNT(*) FROM duplicates").fetchone()[0],
+            }
+
+    def close(self) -> None:
+        """Close the underlying database"""
+        with self._lock:
+            self._conn.close()
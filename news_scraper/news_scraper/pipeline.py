@@ -0,0 +1,297 @@
+"""
+Streaming ingest pipeline: fetch, extract, dedupe, summarize, embed and upsert
+articles concurrently through bounded queues
+"""
+import logging
+import queue
+import threading
+import time
+from functools import partial
+from typing import Dict, List, Optional
+
+from news_scraper.db.article_store import ArticleWriter
+from news_scraper.db.backends import IndexBackend
+from news_scraper.db.vector_store import VectorDBStorage
+from news_scraper.metrics import metrics
+from news_scraper.scrapers.bbc_scraper import NewsScraper
+
+logger = logging.getLogger(__name__)
+
+# Queue sentinel telling a stage worker that no more items will arrive
+_DONE = object()
+
+
+class _Stage:
+    """
+    A pool of worker threads taking items from inbox and putting the handler's
+    results on outbox. Workers gather up to batch_size items, waiting at most
+    max_wait seconds for a batch to fill. Putting on a full outbox blocks, which
+    is what applies backpressure to the stages upstream.
+    """
+
+    def __init__(self, name: str, handler, inbox: queue.Queue, outbox: Optional[queue.Queue],
+                 workers: int = 1, batch_size: int = 1, max_wait: float = 0.5):
+        self.name = name
+        self.handler = handler
+        self.inbox = inbox
+        self.outbox = outbox
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        # Number of workers of the next stage, each of which needs a sentinel
+        self.downstream_workers = 0
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self._running = self.workers
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def join(self) -> None:
+        for thread in self._threads:
+            thread.join()
+
+    def _next_batch(self):
+        """Block for one item, then gather more until the batch is full or max_wait passes"""
+        item = self.inbox.get()
+        if item is _DONE:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.inbox.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        done = False
+        while not done:
+            batch, done = self._next_batch()
+            if batch:
+                self._process(batch)
+        with self._lock:
+            self._running -= 1
+            last = self._running == 0
+        if last and self.outbox is not None:
+            for _ in range(self.downstream_workers):
+                self.outbox.put(_DONE)
+
+    def _process(self, batch: List) -> None:
+        start = time.perf_counter()
+        try:
+            results = self.handler(batch)
+        except Exception as e:
+            logger.warning("%s stage failed on %d items: %s", self.name, len(batch), e)
+            metrics.increment('pipeline_errors', len(batch), stage=self.name)
+            with self._lock:
+                self.errors += len(batch)
+            return
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.observe('pipeline_batch', elapsed, stage=self.name)
+            with self._lock:
+                self.busy_seconds += elapsed
+        with self._lock:
+            self.processed += len(batch)
+        if self.outbox is not None:
+            for result in results:
+                self.outbox.put(result)
+
+    def stats(self) -> Dict:
+        return {
+            'workers': self.workers,
+            'processed': self.processed,
+            'errors': self.errors,
+            'busy_seconds': round(self.busy_seconds, 3),
+        }
+
+
+class IngestPipeline:
+    """
+    Runs scraping and storage as overlapping stages connected by bounded queues:
+    fetch -> extract -> dedupe -> summarize -> embed -> upsert. While later
+    articles are still downloading, earlier ones are already being summarized,
+    embedded and made searchable. Each stage has its own worker count, and
+    queue_size bounds how far any stage can run ahead of the next one.
+
+    Upserted vectors and lexical index entries are saved to disk every
+    persist_seconds or persist_rows stored articles, whichever comes first,
+    and once more when the run ends, rather than after every upsert batch,
+    since each save rewrites the whole index. URLs are recorded in the
+    scraper's url_index only once their articles are saved (or are left out
+    as unchanged or near-duplicates), so articles that fail in a later stage
+    or are lost to a crash before a save are fetched again on the next run.
+    """
+
+    def __init__(self, scraper: NewsScraper, storage: VectorDBStorage, writer: ArticleWriter = None,
+                 fetch_workers: int = 8, extract_workers: int = 2, summarize_workers: int = 1,
+                 embed_workers: int = 1, dedupe_batch_size: int = 32, summary_batch_size: int = 8,
+                 embed_batch_size: int = 32, upsert_batch_size: int = 100, queue_size: int = 64,
+                 max_batch_wait: float = 0.5, persist_seconds: float = 30.0, persist_rows: int = 1000):
+        self.scraper = scraper
+        self.storage = storage
+        self.writer = writer
+        self.fetch_workers = fetch_workers
+        self.extract_workers = extract_workers
+        self.summarize_workers = summarize_workers
+        self.embed_workers = embed_workers
+        self.dedupe_batch_size = dedupe_batch_size
+        self.summary_batch_size = summary_batch_size
+        self.embed_batch_size = embed_batch_size
+        self.upsert_batch_size = upsert_batch_size
+        self.queue_size = queue_size
+        self.max_batch_wait = max_batch_wait
+        self.persist_seconds = persist_seconds
+        self.persist_rows = persist_rows
+        # Articles upserted since the indexes were last saved; only the upsert stage and run() touch it
+        self._unsaved: List[Dict] = []
+        self._saved_at = 0.0
+        # URLs already taken by the dedupe stage during the current run
+        self._urls_seen = set()
+
+    def discover(self) -> List[str]:
+        """Article links on the scraper's listing page that have not been scraped before"""
+        soup = self.scraper.get_soup(self.scraper.base_url)
+        urls = self.scraper.find_article_links(soup)
+        if self.scraper.url_index is not None:
+            urls = self.scraper.url_index.filter_unseen(urls)
+        return urls
+
+    def _fetch(self, urls: List[str]) -> List:
+        pages = []
+        for url in urls:
+            try:
+                pages.append((url, self.scraper.fetch_html(url)))
+            except Exception as e:
+                logger.warning("Error fetching article %s: %s", url, e, extra={'url': url})
+        return pages
+
+    def _extract(self, pages: List) -> List[Dict]:
+        articles = []
+        for url, html in pages:
+            try:
+                article = self.scraper.parse_article(url, html)
+            except Exception as e:
+                logger.warning("Error scraping article %s: %s", url, e, extra={'url': url})
+                continue
+            if self.writer is not None:
+                self.writer.write(article)
+            articles.append(article)
+        return articles
+
+    def _mark_seen(self, articles: List[Dict]) -> None:
+        if self.scraper.url_index is not None and articles:
+            self.scraper.url_index.add_articles(articles)
+
+    def _dedupe(self, index: IndexBackend, articles: List[Dict]) -> List[Dict]:
+        unique_articles = []
+        for article in articles:
+            if article['url'] not in self._urls_seen:
+                self._urls_seen.add(article['url'])
+                unique_articles.append(article)
+        changed = self.storage.select_changed_articles(unique_articles, index)
+        # Near-duplicates are dropped here, before the summarize and embed stages
+        changed_urls = {article['url'] for article in changed}
+        originals = self.storage.filter_near_duplicates(
+            changed, [article for article in unique_articles if article['url'] not in changed_urls])
+        # Nothing more will be stored for the articles dropped here
+        kept_urls = {article['url'] for article in originals}
+        self._mark_seen([article for article in unique_articles if article['url'] not in kept_urls])
+        return originals
+
+    def _summarize(self, articles: List[Dict]) -> List:
+        summaries = self.storage.generate_summaries([article['content'] for article in articles],
+                                                    batch_size=len(articles))
+        return list(zip(articles, summaries))
+
+    def _embed(self, items: List) -> List:
+        articles = [article for article, _ in items]
+        summaries = [summary for _, summary in items]
+        embeddings = self.storage.embed_articles(articles, batch_size=len(articles))
+        return list(zip(articles, self.storage.build_vectors(articles, summaries, embeddings)))
+
+    def _upsert(self, index: IndexBackend, items: List) -> List:
+        articles = [article for article, _ in items]
+        vectors = [vector for _, vector in items]
+        self.storage.upsert_vectors(index, vectors, batch_size=self.upsert_batch_size, flush=False)
+        if self.storage.lexical_index is not None:
+            self.storage.update_lexical_index(articles, vectors, {}, save=False)
+        self._unsaved.extend(articles)
+        if (len(self._unsaved) >= self.persist_rows
+                or time.monotonic() - self._saved_at >= self.persist_seconds):
+            self._persist(index)
+        return []
+
+    def _persist(self, index: IndexBackend) -> None:
+        """Save the vector and lexical indexes, then record the articles they now hold as seen"""
+        with metrics.timer('pipeline_persist'):
+            index.flush()
+            if self.storage.lexical_index is not None:
+                self.storage.lexical_index.save()
+        self._mark_seen(self._unsaved)
+        self._unsaved = []
+        self._saved_at = time.monotonic()
+
+    def run(self, urls: Optional[List[str]] = None, limit: Optional[int] = None) -> Dict:
+        """
+        Ingest urls (by default the new links on the scraper's listing page, at
+        most limit of them) and return per-stage statistics once all are stored
+        """
+        started = time.perf_counter()
+        self._urls_seen = set()
+        self._unsaved = []
+        self._saved_at = time.monotonic()
+        index = self.storage.get_index(self.storage.index_name)
+        if urls is None:
+            urls = self.discover()
+        if limit is not None:
+            urls = urls[:limit]
+
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(6)]
+        wait = self.max_batch_wait
+        stages = [
+            _Stage('fetch', self._fetch, queues[0], queues[1], self.fetch_workers),
+            _Stage('extract', self._extract, queues[1], queues[2], self.extract_workers),
+            _Stage('dedupe', partial(self._dedupe, index), queues[2], queues[3], 1,
+                   self.dedupe_batch_size, wait),
+            _Stage('summarize', self._summarize, queues[3], queues[4], self.summarize_workers,
+                   self.summary_batch_size, wait),
+            _Stage('embed', self._embed, queues[4], queues[5], self.embed_workers,
+                   self.embed_batch_size, wait),
+            _Stage('upsert', partial(self._upsert, index), queues[5], None, 1,
+                   self.upsert_batch_size, wait),
+        ]
+        for stage, downstream in zip(stages, stages[1:]):
+            stage.downstream_workers = downstream.workers
+        for stage in stages:
+            stage.start()
+
+        # Feeding blocks whenever the fetch queue is full
+        for url in urls:
+            queues[0].put(url)
+        for _ in range(stages[0].workers):
+            queues[0].put(_DONE)
+        for stage in stages:
+            stage.join()
+        self._persist(index)
+
+        return {
+            'urls': len(urls),
+            'stored': stages[-1].processed,
+            'seconds': round(time.perf_counter() - started, 3),
+            'stages': {stage.name: stage.stats() for stage in stages},
+        }
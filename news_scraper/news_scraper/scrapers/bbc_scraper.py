@@ -1,6 +1,7 @@
 """
 BBC News scraper module
 """
+import logging
 import os
 import requests
 from bs4 import BeautifulSoup
@@ -8,124 +9,212 @@ from datetime import datetime
 import json
 from urllib.parse import urljoin
 import re
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-from nltk.tag import pos_tag
+from concurrent.futures import ThreadPoolExecutor
 from collections import Counter
 from string import punctuation
+from news_scraper.metrics import metrics
+from news_scraper.scrapers.extraction import parse_article_html
+from news_scraper.scrapers.fetcher import HostRateLimiter, create_session, fetch_with_retry
 
-# Download required NLTK data
-try:
-    nltk.download('punkt')
-    nltk.download('averaged_perceptron_tagger')
-    nltk.download('stopwords')
-    nltk.download('tagsets')
-except Exception as e:
-    print(f"Warning: Could not download NLTK data: {str(e)}")
+logger = logging.getLogger(__name__)
+
+EXTRA_STOP_WORDS = ['said', 'says', 'would', 'could', 'also', 'like', 'one', 'two', 'first', 'last', 'year', 'years']
+
+def load_stop_words(download=True):
+    """
+    Load English stopwords from NLTK, downloading the corpus only if it is
+    missing; with download=False a missing corpus raises LookupError
+    """
+    from nltk.corpus import stopwords
+    try:
+        words = stopwords.words('english')
+    except LookupError:
+        if not download:
+            raise
+        import nltk
+        nltk.download('stopwords', quiet=True)
+        words = stopwords.words('english')
+    return set(words) | set(EXTRA_STOP_WORDS)
 
 class NewsScraperError(Exception):
     """Custom exception for news scraper errors"""
     pass
 
 class NewsScraper:
-    def __init__(self, base_url, delay=1):
+    def __init__(self, base_url, delay=1, max_workers=8, max_retries=3, backoff=0.5,
+                 cache=None, url_index=None):
+        """
+        delay is the minimum number of seconds between requests to the same host,
+        max_workers the number of articles fetched concurrently, cache an
+        optional HTTPCache used to revalidate previously downloaded pages and
+        url_index an optional SeenURLIndex of articles scraped on earlier runs
+        """
+        self.cache = cache
+        self.url_index = url_index
         self.base_url = base_url
         self.delay = delay
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.backoff = backoff
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
-        try:
-            self.stop_words = set(stopwords.words('english'))
-            self.stop_words.update(['said', 'says', 'would', 'could', 'also', 'like', 'one', 'two', 'first', 'last', 'year', 'years'])
-        except Exception as e:
-            print(f"Warning: Could not load stopwords: {str(e)}")
-            self.stop_words = set()
+        self.session = create_session(self.headers, pool_size=self.max_workers)
+        self.rate_limiter = HostRateLimiter(delay)
+        self._stop_words = None
+
+    @property
+    def stop_words(self):
+        """English stopwords, loaded from NLTK the first time keywords are extracted"""
+        if self._stop_words is None:
+            try:
+                self._stop_words = load_stop_words()
+            except Exception as e:
+                logger.warning("Could not load stopwords: %s", e)
+                self._stop_words = set()
+        return self._stop_words
+
+    def close(self):
+        """Close pooled HTTP connections, the response cache and the URL index"""
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+        if self.url_index is not None:
+            self.url_index.close()
+
+    def fetch_html(self, url):
+        """Fetch url and return its body, serving unchanged pages from the cache"""
+        entry = None
+        headers = None
+        if self.cache is not None:
+            entry = self.cache.get(url)
+            if entry is not None and self.cache.is_fresh(entry):
+                self.cache.record_hit(url)
+                metrics.increment('fetch_cache', outcome='hit')
+                return entry['body']
+            headers = self.cache.conditional_headers(entry)
+
+        response = fetch_with_retry(self.session, url,
+                                    rate_limiter=self.rate_limiter,
+                                    max_retries=self.max_retries,
+                                    backoff=self.backoff,
+                                    headers=headers)
+        if entry is not None and response.status_code == 304:
+            self.cache.record_hit(url, revalidated=True)
+            metrics.increment('fetch_cache', outcome='revalidated')
+            return entry['body']
+        if self.cache is not None:
+            metrics.increment('fetch_cache', outcome='miss')
+
+        response.raise_for_status()
+        if self.cache is not None:
+            self.cache.store(url, response)
+        return response.text
 
     def get_soup(self, url):
         """Make request and return BeautifulSoup object"""
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            return BeautifulSoup(response.text, 'html.parser')
+            return BeautifulSoup(self.fetch_html(url), 'html.parser')
         except requests.RequestException as e:
             raise NewsScraperError(f"Failed to fetch URL: {url}. Error: {str(e)}")
 
     def extract_keywords_simple(self, text, title):
         """Extract keywords using a simpler approach"""
         try:
-            full_text = f"{title} {text}"
-            words = re.findall(r'\b\w+\b', full_text.lower())
-            words = [word for word in words 
-                    if word not in self.stop_words 
-                    and len(word) > 3]
-            word_freq = Counter(words)
-            top_keywords = [word for word, _ in word_freq.most_common(8)]
+            with metrics.timer('keywords'):
+                full_text = f"{title} {text}"
+                words = re.findall(r'\b\w+\b', full_text.lower())
+                words = [word for word in words 
+                        if word not in self.stop_words 
+                        and len(word) > 3]
+                word_freq = Counter(words)
+                top_keywords = [word for word, _ in word_freq.most_common(8)]
             return top_keywords
         except Exception as e:
-            print(f"Warning: Could not extract keywords: {str(e)}")
+            logger.warning("Could not extract keywords: %s", e)
             return []
 
+    def parse_article(self, url, html, source='BBC News', extract=parse_article_html):
+        """
+        Build an article record from a downloaded article page; extract returns
+        (heading, content) for the page and defaults to the generic extractor
+        """
+        with metrics.timer('parse'):
+            heading, content = extract(html)
+        keywords = self.extract_keywords_simple(content, heading)
+
+        return {
+            'url': url,
+            'heading': heading,
+            'content': content,
+            'keywords': keywords,
+            'source': source,
+            'timestamp': datetime.now().strftime('%Y%m%d_%H%M%S')
+        }
+
     def extract_article(self, url):
         """Extract article content from URL"""
         try:
-            soup = self.get_soup(url)
-            
-            title_elem = soup.find('h1')
-            heading = title_elem.get_text().strip() if title_elem else "No heading found"
-
-            article_body = soup.find('article') or soup.find('main')
-            content = ""
-            
-            if article_body:
-                text_blocks = article_body.find_all(['div', 'p'])
-                content = ' '.join(block.get_text().strip() for block in text_blocks if block.get_text().strip())
-            else:
-                paragraphs = soup.find_all('p')
-                content = ' '.join(p.get_text().strip() for p in paragraphs if p.get_text().strip())
-
-            keywords = self.extract_keywords_simple(content, heading)
-
-            article = {
-                'url': url,
-                'heading': heading,
-                'content': content,
-                'keywords': keywords,
-                'source': 'BBC News',
-                'timestamp': datetime.now().strftime('%Y%m%d_%H%M%S')
-            }
-
-            print(f"Scraped: {heading} from BBC News")
+            article = self.parse_article(url, self.fetch_html(url))
+            logger.info("Scraped: %s from BBC News", article['heading'], extra={'url': url})
+            metrics.increment('articles_scraped')
             return article
 
         except Exception as e:
-            print(f"Error scraping article {url}: {str(e)}")
+            logger.warning("Error scraping article %s: %s", url, e, extra={'url': url})
+            metrics.increment('articles_failed')
             return None
 
-    def scrape_latest_news(self, limit=10):
-        """Scrape latest news articles from BBC News"""
-        try:
-            articles = []
-            seen_urls = set()
-            soup = self.get_soup(self.base_url)
-            
-            for link in soup.find_all('a', href=True):
-                if len(articles) >= limit:
-                    break
-                    
-                href = link.get('href', '')
-                if '/news/articles/' in href:
-                    full_url = urljoin(self.base_url, href)
-                    
-                    if full_url in seen_urls:
-                        continue
-                        
+    def find_article_links(self, soup):
+        """Return unique article URLs linked from a listing page, in document order"""
+        urls = []
+        seen_urls = set()
+        for link in soup.find_all('a', href=True):
+            href = link.get('href', '')
+            if '/news/articles/' in href:
+                full_url = urljoin(self.base_url, href)
+                if full_url not in seen_urls:
                     seen_urls.add(full_url)
-                    article = self.extract_article(full_url)
+                    urls.append(full_url)
+        return urls
+
+    def extract_articles(self, urls, limit=None, writer=None):
+        """
+        Extract articles from urls concurrently, returning up to limit articles in
+        url order. Each article is appended to writer, if given, as soon as it is ready.
+        """
+        articles = []
+        limit = len(urls) if limit is None else limit
+        position = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Fetch in waves sized to the number of articles still needed, so failed
+            # pages are replaced by later links without over-fetching
+            while len(articles) < limit and position < len(urls):
+                wave = urls[position:position + limit - len(articles)]
+                position += len(wave)
+                extracted = []
+                for article in executor.map(self.extract_article, wave):
                     if article:
-                        articles.append(article)
+                        if writer is not None:
+                            writer.write(article)
+                        extracted.append(article)
+                if self.url_index is not None:
+                    self.url_index.add_articles(extracted)
+                articles.extend(extracted)
+        return articles
 
-            return articles
+    def scrape_latest_news(self, limit=10, skip_seen=True, writer=None):
+        """
+        Scrape latest news articles from BBC News. With a url_index, articles
+        scraped on earlier runs are skipped before being downloaded unless
+        skip_seen is False. Articles are appended to writer as they are scraped.
+        """
+        try:
+            soup = self.get_soup(self.base_url)
+            urls = self.find_article_links(soup)
+            if skip_seen and self.url_index is not None:
+                urls = self.url_index.filter_unseen(urls)
+            return self.extract_articles(urls, limit, writer=writer)
 
         except Exception as e:
             raise NewsScraperError(f"Failed to scrape latest news. Error: {str(e)}")
@@ -0,0 +1,251 @@
+"""
+Multi-site crawler scheduling frontier URLs under per-host politeness limits
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+from news_scraper.db.article_store import ArticleWriter
+from news_scraper.metrics import metrics
+from news_scraper.scrapers.bbc_scraper import NewsScraper
+from news_scraper.scrapers.frontier import CrawlFrontier
+from news_scraper.scrapers.sites import SiteRules, rules_by_host
+
+logger = logging.getLogger(__name__)
+
+
+def parse_crawl_delay(lines: List[str], user_agent: str) -> Optional[float]:
+    """
+    Crawl-delay robots.txt asks of user_agent, in seconds. urllib.robotparser
+    only reads whole numbers and drops values such as 0.5, so the groups are
+    read again here, matching agents the way it does: the first group naming
+    the agent applies, else the * group.
+    """
+    groups = []
+    agents, delay, in_rules = [], None, False
+    for line in lines:
+        line = line.split('#', 1)[0].strip()
+        field, _, value = line.partition(':')
+        field, value = field.strip().lower(), value.strip()
+        if field == 'user-agent':
+            if in_rules:
+                groups.append((agents, delay))
+                agents, delay, in_rules = [], None, False
+            agents.append(value.lower())
+        elif field and agents:
+            in_rules = True
+            if field == 'crawl-delay':
+                try:
+                    delay = float(value)
+                except ValueError:
+                    pass
+    if agents:
+        groups.append((agents, delay))
+
+    name = user_agent.split('/')[0].lower()
+    for agents, delay in groups:
+        if any(agent != '*' and agent in name for agent in agents):
+            return delay
+    for agents, delay in groups:
+        if '*' in agents:
+            return delay
+    return None
+
+
+class RobotsCache:
+    """robots.txt rules for each host, fetched the first time the host is crawled"""
+
+    def __init__(self, session, user_agent: str, timeout: float = 10):
+        self.session = session
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self._parsers: Dict[str, RobotFileParser] = {}
+        self._delays: Dict[str, Optional[float]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _parser(self, url: str) -> RobotFileParser:
+        parts = urlparse(url)
+        with self._lock:
+            host_lock = self._locks.setdefault(parts.netloc, threading.Lock())
+        with host_lock:
+            parser = self._parsers.get(parts.netloc)
+            if parser is None:
+                parser = RobotFileParser(f"{parts.scheme}://{parts.netloc}/robots.txt")
+                try:
+                    response = self.session.get(parser.url, timeout=self.timeout)
+                    if response.status_code in (401, 403):
+                        parser.disallow_all = True
+                    elif response.status_code >= 400:
+                        parser.allow_all = True
+                    else:
+                        lines = response.text.splitlines()
+                        parser.parse(lines)
+                        self._delays[parts.netloc] = parse_crawl_delay(lines, self.user_agent)
+                except Exception as e:
+                    logger.warning("Could not fetch %s, crawling without it: %s", parser.url, e)
+                    parser.allow_all = True
+                self._parsers[parts.netloc] = parser
+        return parser
+
+    def allowed(self, url: str) -> bool:
+        return self._parser(url).can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, url: str) -> Optional[float]:
+        self._parser(url)
+        return self._delays.get(urlparse(url).netloc)
+
+
+class _HostState:
+    """Politeness bookkeeping for one host, only touched by the scheduling thread"""
+
+    def __init__(self, site: SiteRules):
+        self.site = site
+        self.delay = site.delay
+        self.in_flight = 0
+        self.next_slot = 0.0
+
+    def ready(self, now: float) -> bool:
+        return self.in_flight < self.site.max_concurrency and self.next_slot <= now
+
+
+class Crawler:
+    """
+    Crawls many sites from a CrawlFrontier. Listing pages of every site are
+    queued at the start of each run; the article links they yield are queued
+    by freshness and site weight. A URL is only started when its host has a
+    free concurrency slot and its delay (the larger of the site's and the
+    robots.txt crawl-delay) has passed, so adding sites adds throughput
+    without any single host seeing more traffic. Each host's robots.txt is
+    fetched when a run starts, before any of its URLs is leased.
+
+    The scraper is used for fetching (with its cache) and keyword extraction;
+    give it delay=0 since the crawler does the per-host spacing itself.
+    """
+
+    def __init__(self, scraper: NewsScraper, frontier: CrawlFrontier, sites: List[SiteRules],
+                 writer: ArticleWriter = None, max_workers: int = 16, respect_robots: bool = True):
+        self.scraper = scraper
+        self.frontier = frontier
+        self.rules = rules_by_host(sites)
+        self.writer = writer
+        self.max_workers = max(1, max_workers)
+        self.robots = RobotsCache(scraper.session, scraper.headers['User-Agent']) if respect_robots else None
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+        self._hosts = {host: _HostState(site) for host, site in self.rules.items()}
+
+    def seed(self) -> None:
+        """Queue every site's listing pages, including ones polled on earlier runs"""
+        for site in self.rules.values():
+            self.frontier.add(site.listing_urls, weight=site.weight, kind='listing', requeue=True)
+
+    def _apply_crawl_delays(self, executor: ThreadPoolExecutor) -> None:
+        """Fetch every host's robots.txt and raise its delay to the Crawl-delay asked for"""
+        hosts = list(self._hosts)
+        urls = [self.rules[host].listing_urls[0] for host in hosts]
+        for host, crawl_delay in zip(hosts, executor.map(self.robots.crawl_delay, urls)):
+            state = self._hosts[host]
+            if crawl_delay is not None and crawl_delay > state.delay:
+                state.delay = crawl_delay
+
+    def _crawl(self, url: str, host: str, kind: str) -> str:
+        """Fetch and process one leased URL, returning what came of it"""
+        site = self.rules[host]
+        if self.robots is not None and not self.robots.allowed(url):
+            self.frontier.complete(url, state='blocked')
+            return 'blocked'
+
+        html = self.scraper.fetch_html(url)
+        if kind == 'listing':
+            links = site.find_article_links(html, url)
+            if self.scraper.url_index is not None:
+                links = self.scraper.url_index.filter_unseen(links)
+            queued = self.frontier.add(links, weight=site.weight)
+            with self._stats_lock:
+                self.stats['links_queued'] += queued
+            result = 'listing'
+        else:
+            article = self.scraper.parse_article(url, html, source=site.source, extract=site.extract)
+            if self.writer is not None:
+                self.writer.write(article)
+            if self.scraper.url_index is not None:
+                self.scraper.url_index.add(article)
+            logger.info("Scraped: %s from %s", article['heading'], site.source, extra={'url': url})
+            result = 'article'
+        self.frontier.complete(url)
+        return result
+
+    def _task(self, url: str, host: str, kind: str) -> str:
+        try:
+            with metrics.timer('crawl', kind=kind):
+                return self._crawl(url, host, kind)
+        except Exception as e:
+            retried = self.frontier.fail(url)
+            logger.warning("Error crawling %s (%s): %s", url, 'will retry' if retried else 'giving up', e,
+                           extra={'url': url})
+            return 'failed'
+
+    def _next_wakeup(self, now: float) -> float:
+        """Seconds until some host with a free slot may be contacted again"""
+        waits = [state.next_slot - now for state in self._hosts.values()
+                 if state.in_flight < state.site.max_concurrency]
+        return min(max(min(waits, default=1.0), 0.01), 1.0)
+
+    def run(self, limit: Optional[int] = None, max_seconds: Optional[float] = None) -> Dict:
+        """
+        Crawl until limit articles have been scraped, max_seconds have passed or
+        the frontier has nothing left to fetch, and return counts of what happened
+        """
+        self.seed()
+        started = time.monotonic()
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            if self.robots is not None:
+                # The first lease for a host must already be spaced by its Crawl-delay
+                self._apply_crawl_delays(executor)
+            while True:
+                now = time.monotonic()
+                stopping = ((limit is not None and self.stats['article'] >= limit)
+                            or (max_seconds is not None and now - started >= max_seconds))
+                while not stopping and len(in_flight) < self.max_workers:
+                    now = time.monotonic()
+                    hosts = [host for host, state in self._hosts.items() if state.ready(now)]
+                    leased = self.frontier.lease(hosts)
+                    if leased is None:
+                        break
+                    url, host, kind = leased
+                    state = self._hosts[host]
+                    state.in_flight += 1
+                    state.next_slot = now + state.delay
+                    in_flight[executor.submit(self._task, url, host, kind)] = host
+
+                if not in_flight:
+                    if stopping:
+                        break
+                    due = self.frontier.next_due(list(self._hosts))
+                    if due is None:
+                        break
+                    # Only URLs waiting for a retry or a host slot are left
+                    time.sleep(min(max(due - time.time(), self._next_wakeup(time.monotonic())), 1.0))
+                    continue
+
+                done, _ = wait(in_flight, timeout=self._next_wakeup(time.monotonic()),
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    host = in_flight.pop(future)
+                    self._hosts[host].in_flight -= 1
+                    result = future.result()
+                    with self._stats_lock:
+                        self.stats[result] += 1
+                    metrics.increment('crawled', result=result, host=host)
+
+        stats = dict(self.stats)
+        stats['seconds'] = round(time.monotonic() - started, 3)
+        stats['frontier'] = self.frontier.stats()
+        return stats
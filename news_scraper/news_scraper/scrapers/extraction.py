@@ -0,0 +1,97 @@
+"""
+Targeted article extraction: parses only the article subtree and keeps paragraph boundaries
+"""
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.element import NavigableString, PreformattedString, Tag
+
+try:
+    import lxml  # noqa: F401
+    DEFAULT_PARSER = 'lxml'
+except ImportError:
+    DEFAULT_PARSER = 'html.parser'
+
+# Elements whose edges end a paragraph; text between two edges is one paragraph,
+# whether it sits in a leaf block or directly in a container around other blocks
+BLOCK_TAGS = {'p', 'div', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'blockquote', 'pre', 'td', 'th', 'tr', 'table',
+              'ul', 'ol', 'dl', 'dt', 'dd', 'section', 'article', 'main', 'header', 'footer', 'aside'}
+
+# Subtrees that never contribute article text
+SKIP_TAGS = {'h1', 'script', 'style', 'noscript', 'figure', 'svg', 'button', 'nav', 'form', 'iframe'}
+
+# Page chrome that survives as its own text block
+NOISE_TEXTS = {'Share', 'Save', 'ShareSave'}
+
+PARAGRAPH_SEPARATOR = '\n\n'
+
+
+def _normalize(text):
+    return ' '.join(text.split())
+
+
+def _collect_text(node, pieces):
+    """Append the strings under node to pieces, with None at the start and end of every block element"""
+    for child in node.children:
+        if isinstance(child, Tag):
+            if child.name in SKIP_TAGS:
+                continue
+            block = child.name in BLOCK_TAGS
+            if block:
+                pieces.append(None)
+            _collect_text(child, pieces)
+            if block:
+                pieces.append(None)
+        elif isinstance(child, NavigableString) and not isinstance(child, PreformattedString):
+            # Comments, CDATA and doctypes are PreformattedStrings
+            pieces.append(child)
+
+
+def extract_paragraphs(root):
+    """
+    Return the distinct paragraphs under root in document order: the text of
+    each leaf block, and text and inline runs placed directly in a container
+    next to its child blocks
+    """
+    pieces = []
+    _collect_text(root, pieces)
+    pieces.append(None)
+    paragraphs = []
+    seen = set()
+    run = []
+    for piece in pieces:
+        if piece is not None:
+            run.append(piece)
+            continue
+        text = _normalize(''.join(run))
+        run = []
+        if not text or text in NOISE_TEXTS or text in seen:
+            continue
+        seen.add(text)
+        paragraphs.append(text)
+    return paragraphs
+
+
+def parse_article_html(html, parser=DEFAULT_PARSER):
+    """
+    Return (heading, content) for an article page. Only the <article> (or <main>)
+    subtree is parsed; content is its paragraphs joined by blank lines.
+    Pages with neither element fall back to every <p> on the page.
+    """
+    for container in ('article', 'main'):
+        soup = BeautifulSoup(html, parser, parse_only=SoupStrainer(container))
+        root = soup.find(container)
+        if root is not None:
+            title_elem = root.find('h1')
+            if title_elem is None:
+                title_elem = BeautifulSoup(html, parser, parse_only=SoupStrainer('h1')).find('h1')
+            heading = _normalize(title_elem.get_text()) if title_elem else "No heading found"
+            return heading, PARAGRAPH_SEPARATOR.join(extract_paragraphs(root))
+
+    soup = BeautifulSoup(html, parser)
+    title_elem = soup.find('h1')
+    heading = _normalize(title_elem.get_text()) if title_elem else "No heading found"
+    paragraphs = []
+    for p in soup.find_all('p'):
+        text = _normalize(p.get_text())
+        if text:
+            paragraphs.append(text)
+    return heading, PARAGRAPH_SEPARATOR.join(paragraphs)
@@ -0,0 +1,87 @@
+"""
+HTTP fetching helpers: pooled sessions, per-host rate limiting and retries
+"""
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from news_scraper.metrics import metrics
+
+# Status codes worth retrying; anything else is returned to the caller as-is
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class HostRateLimiter:
+    """Enforce a minimum delay between request starts to the same host"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, url):
+        """Block until the host of url may be contacted again"""
+        if not self.delay or self.delay <= 0:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            # Reserve the slot before sleeping so concurrent callers queue up behind it
+            self._next_slot[host] = slot + self.delay
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def create_session(headers, pool_size=10):
+    """Create a requests session with a keep-alive connection pool of pool_size"""
+    session = requests.Session()
+    session.headers.update(headers)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _retry_after(response):
+    """Return the Retry-After delay in seconds, if the server sent a numeric one"""
+    value = response.headers.get('Retry-After')
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def fetch_with_retry(session, url, rate_limiter=None, max_retries=3, backoff=0.5,
+                     timeout=10, headers=None, max_backoff=30.0):
+    """
+    GET url, retrying connection errors and retryable statuses with exponential
+    backoff capped at max_backoff seconds. A Retry-After longer than max_backoff
+    ends the retries and the response is returned. Each request is timed as
+    'fetch', excluding rate-limiter and backoff waits.
+    """
+    attempt = 0
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.wait(url)
+        try:
+            with metrics.timer('fetch'):
+                response = session.get(url, timeout=timeout, headers=headers)
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+                return response
+            wait = _retry_after(response)
+            if wait is not None and wait > max_backoff:
+                return response
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= max_retries:
+                raise
+            wait = None
+
+        if wait is None:
+            wait = min(max_backoff, backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+        time.sleep(wait)
+        attempt += 1
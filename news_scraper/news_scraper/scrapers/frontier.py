@@ -0,0 +1,143 @@
+"""
+Persistent crawl frontier: a priority queue of URLs to fetch that survives restarts
+"""
+import math
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+# URLs are ranked by weight * 2 ** -(age / half_life), age being the time since
+# discovery. Its log2, log2(weight) + discovered_at / half_life minus a term
+# common to every URL, ranks them the same and never needs rewriting.
+DEFAULT_HALF_LIFE = 6 * 3600
+
+# Listing pages jump ahead of every article so new links are found first
+LISTING_BOOST = 1000.0
+
+class CrawlFrontier:
+    """
+    SQLite-backed queue of listing and article URLs ordered by freshness and
+    source weight. URLs being fetched are leased; leases left over by a crashed
+    run are returned to the queue when the frontier is opened again. Failed
+    URLs are retried with exponential backoff up to max_attempts times.
+    """
+
+    def __init__(self, path: str, half_life: float = DEFAULT_HALF_LIFE, max_attempts: int = 3,
+                 retry_delay: float = 60.0):
+        self.path = path
+        self.half_life = half_life
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                url TEXT PRIMARY KEY,
+                host TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                priority REAL NOT NULL,
+                not_before REAL NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                state TEXT NOT NULL DEFAULT 'queued'
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS frontier_queue ON frontier (state, host, priority);
+        """)
+        # Resume: anything leased when the last run stopped is fetched again
+        self._conn.execute("UPDATE frontier SET state = 'queued' WHERE state = 'leased'")
+        self._conn.commit()
+
+    def priority(self, weight: float = 1.0, discovered_at: Optional[float] = None, kind: str = 'article') -> float:
+        discovered_at = time.time() if discovered_at is None else discovered_at
+        priority = math.log2(max(weight, 1e-6)) + discovered_at / self.half_life
+        return priority + LISTING_BOOST if kind == 'listing' else priority
+
+    def add(self, urls: Iterable[str], weight: float = 1.0, kind: str = 'article',
+            discovered_at: Optional[float] = None, requeue: bool = False) -> int:
+        """
+        Queue urls that are not known yet, earlier ones ranked slightly higher;
+        with requeue, finished URLs (e.g. listing pages to poll again) are queued
+        again too. Returns how many URLs were queued.
+        """
+        base = self.priority(weight, discovered_at, kind)
+        # Links near the top of a listing page are usually the freshest
+        rows = [(url, urlparse(url).netloc, kind, base - rank * 1e-4) for rank, url in enumerate(urls)]
+        with self._lock:
+            before = self._conn.total_changes
+            if requeue:
+                self._conn.executemany("""
+                    INSERT INTO frontier (url, host, kind, priority) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(url) DO UPDATE SET state = 'queued', priority = excluded.priority,
+                        not_before = 0, attempts = 0
+                    WHERE state != 'leased'
+                """, rows)
+            else:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO frontier (url, host, kind, priority) VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    def lease(self, hosts: List[str], now: Optional[float] = None) -> Optional[Tuple[str, str, str]]:
+        """Lease the best due URL on one of hosts, returning (url, host, kind), or None"""
+        if not hosts:
+            return None
+        now = time.time() if now is None else now
+        with self._lock:
+            best = None
+            # One index seek per host is cheaper than sorting every queued URL
+            for host in hosts:
+                row = self._conn.execute("""
+                    SELECT url, host, kind, priority FROM frontier
+                    WHERE state = 'queued' AND host = ? AND not_before <= ?
+                    ORDER BY priority DESC LIMIT 1
+                """, (host, now)).fetchone()
+                if row is not None and (best is None or row[3] > best[3]):
+                    best = row
+            if best is None:
+                return None
+            self._conn.execute("UPDATE frontier SET state = 'leased' WHERE url = ?", (best[0],))
+            self._conn.commit()
+        return best[0], best[1], best[2]
+
+    def complete(self, url: str, state: str = 'done') -> None:
+        """Finish a leased URL; state is 'done' or, for URLs robots.txt disallows, 'blocked'"""
+        with self._lock:
+            self._conn.execute("UPDATE frontier SET state = ? WHERE url = ?", (state, url))
+            self._conn.commit()
+
+    def fail(self, url: str) -> bool:
+        """Return a leased URL to the queue with backoff, or give up on it; returns whether it will be retried"""
+        with self._lock:
+            attempts = self._conn.execute("SELECT attempts FROM frontier WHERE url = ?", (url,)).fetchone()[0] + 1
+            if attempts >= self.max_attempts:
+                self._conn.execute("UPDATE frontier SET state = 'failed', attempts = ? WHERE url = ?",
+                                   (attempts, url))
+            else:
+                not_before = time.time() + self.retry_delay * 2 ** (attempts - 1)
+                self._conn.execute("UPDATE frontier SET state = 'queued', attempts = ?, not_before = ? "
+                                   "WHERE url = ?", (attempts, not_before, url))
+            self._conn.commit()
+        return attempts < self.max_attempts
+
+    def next_due(self, hosts: Optional[List[str]] = None) -> Optional[float]:
+        """When the earliest queued URL (on one of hosts) becomes due, or None if nothing is queued"""
+        query = "SELECT MIN(not_before) FROM frontier WHERE state = 'queued'"
+        params: List[str] = []
+        if hosts is not None:
+            query += f" AND host IN ({','.join('?' * len(hosts))})"
+            params = list(hosts)
+        with self._lock:
+            row = self._conn.execute(query, params).fetchone()
+        return row[0]
+
+    def stats(self) -> Dict[str, int]:
+        """Number of URLs in each state"""
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state").fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        """Close the underlying database"""
+        with self._lock:
+            self._conn.close()
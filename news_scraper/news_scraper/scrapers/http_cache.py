@@ -0,0 +1,137 @@
+"""
+Persistent HTTP response cache with conditional revalidation
+"""
+import sqlite3
+import threading
+import time
+
+
+class HTTPCache:
+    """
+    SQLite-backed cache of response bodies and their validators (ETag, Last-Modified).
+    Entries are evicted least-recently-used first once the stored bodies exceed max_bytes.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, max_age=0):
+        """max_age is how many seconds an entry is served without revalidating"""
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._conn.commit()
+
+    def get(self, url):
+        """Return the cached entry for url as a dict, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?",
+                (url,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'body': row[0].decode('utf-8'),
+            'etag': row[1],
+            'last_modified': row[2],
+            'fetched_at': row[3],
+        }
+
+    def is_fresh(self, entry):
+        """Whether entry can be served without contacting the server"""
+        return self.max_age > 0 and time.time() - entry['fetched_at'] < self.max_age
+
+    def conditional_headers(self, entry):
+        """Request headers that revalidate entry, or None when there is nothing to revalidate"""
+        if entry is None:
+            return None
+        headers = {}
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers or None
+
+    def record_hit(self, url, revalidated=False):
+        """Mark the entry for url as used; revalidated means the server answered 304"""
+        now = time.time()
+        with self._lock:
+            self.hits += 1
+            if revalidated:
+                self.revalidations += 1
+                self._conn.execute(
+                    "UPDATE responses SET accessed_at = ?, fetched_at = ? WHERE url = ?",
+                    (now, now, url))
+            else:
+                self._conn.execute(
+                    "UPDATE responses SET accessed_at = ? WHERE url = ?", (now, url))
+            self._conn.commit()
+
+    def store(self, url, response):
+        """Store a full response for url, counting it as a cache miss"""
+        body = response.text.encode('utf-8')
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        now = time.time()
+        with self._lock:
+            self.misses += 1
+            if not etag and not last_modified and self.max_age <= 0:
+                # Without validators or a freshness window the entry could never be reused
+                return
+            if len(body) > self.max_bytes:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, body, etag, last_modified, len(body), now, now))
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT url, size FROM responses ORDER BY accessed_at").fetchall()
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+            self.evictions += 1
+
+    def stats(self):
+        """Return hit/miss counters and current cache size"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidations': self.revalidations,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries,
+            'bytes': size,
+        }
+
+    def close(self):
+        """Close the underlying database"""
+        with self._lock:
+            self._conn.close()
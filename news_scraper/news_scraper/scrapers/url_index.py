@@ -0,0 +1,91 @@
+"""
+Persistent index of already scraped article URLs
+"""
+import sqlite3
+import threading
+from datetime import datetime
+
+from news_scraper.db.article_store import iter_articles
+from news_scraper.hashing import content_hash
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_CHUNK = 500
+
+
+class SeenURLIndex:
+    """SQLite-backed set of scraped URLs with their scrape time and content hash"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS seen_urls (
+                url TEXT PRIMARY KEY,
+                scraped_at TEXT NOT NULL,
+                content_hash TEXT
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen_urls").fetchone()[0]
+
+    def __contains__(self, url):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM seen_urls WHERE url = ?", (url,)).fetchone()
+        return row is not None
+
+    def get(self, url):
+        """Return (scraped_at, content_hash) for url, or None if it was never scraped"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT scraped_at, content_hash FROM seen_urls WHERE url = ?", (url,)).fetchone()
+
+    def filter_unseen(self, urls):
+        """Return the urls not yet in the index, preserving order"""
+        seen = set()
+        with self._lock:
+            for i in range(0, len(urls), _QUERY_CHUNK):
+                chunk = urls[i:i + _QUERY_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT url FROM seen_urls WHERE url IN ({placeholders})", chunk)
+                seen.update(row[0] for row in rows)
+        return [url for url in urls if url not in seen]
+
+    def add_articles(self, articles):
+        """Record scraped articles, replacing earlier entries for the same URL"""
+        rows = [
+            (article['url'],
+             article.get('timestamp') or article.get('scraped_at') or datetime.now().strftime('%Y%m%d_%H%M%S'),
+             content_hash(article))
+            for article in articles
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO seen_urls VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def add(self, article):
+        """Record a single scraped article"""
+        self.add_articles([article])
+
+    def import_articles_file(self, path, batch_size=1000):
+        """Record every article in a saved articles file, returning how many were read"""
+        count = 0
+        batch = []
+        for article, _ in iter_articles(path):
+            if article.get('url'):
+                batch.append(article)
+            if len(batch) >= batch_size:
+                self.add_articles(batch)
+                count += len(batch)
+                batch = []
+        self.add_articles(batch)
+        return count + len(batch)
+
+    def close(self):
+        """Close the underlying database"""
+        with self._lock:
+            self._conn.close()
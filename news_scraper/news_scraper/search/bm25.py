@@ -0,0 +1,206 @@
+"""
+Incremental BM25 inverted index over article headings and content
+"""
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from news_scraper.db.backends import file_version
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+STOP_WORDS = {
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with',
+    'is', 'are', 'was', 'were', 'be', 'been', 'it', 'its', 'as', 'by', 'from', 'that',
+    'this', 'has', 'have', 'had', 'he', 'she', 'they', 'we', 'you', 'his', 'her', 'their',
+    'not', 'will', 'said', 'says',
+}
+
+# Heading terms count this many times towards a document's term frequencies
+HEADING_WEIGHT = 3
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of text without stop words"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+class BM25Index:
+    """
+    Inverted index scoring documents with Okapi BM25. Documents can be added or
+    replaced one at a time; each keeps a small dict of display fields so lexical
+    results can be shown without a vector store lookup. The index is saved as
+    gzip-compressed JSON with documents referenced by integer position;
+    refresh() reloads it once another process has saved over it.
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._doc_ids: List[Optional[str]] = []
+        self._positions: Dict[str, int] = {}
+        self._lengths: List[int] = []
+        self._fields: List[Dict] = []
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._doc_terms: Dict[int, List[str]] = {}
+        self._total_length = 0
+        self._dirty = False
+        self._writes = 0
+        self._loaded_version = None
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self._load()
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, doc_id: str):
+        return doc_id in self._positions
+
+    @property
+    def version(self):
+        """Documents added and reloads so far; every change to the documents served bumps it"""
+        return self._writes
+
+    def refresh(self) -> None:
+        """Reload the saved index if another process has saved over it, unless this one has unsaved documents"""
+        if not self.path:
+            return
+        current = file_version(self.path)
+        if current is None or current == self._loaded_version:
+            return
+        with self._lock:
+            if current == self._loaded_version or self._dirty:
+                return
+            self._load()
+            self._writes += 1
+
+    def _load(self):
+        loaded_version = file_version(self.path)
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        postings_by_term: Dict[str, Dict[int, int]] = defaultdict(dict)
+        doc_terms: Dict[int, List[str]] = {}
+        for term, flat in data['postings'].items():
+            # Postings are stored flat as [position, tf, position, tf, ...]
+            postings = dict(zip(flat[0::2], flat[1::2]))
+            postings_by_term[term] = postings
+            for position in postings:
+                doc_terms.setdefault(position, []).append(term)
+        self.k1, self.b = data['k1'], data['b']
+        self._doc_ids = data['doc_ids']
+        self._lengths = data['lengths']
+        self._fields = data['fields']
+        self._positions = {doc_id: i for i, doc_id in enumerate(self._doc_ids) if doc_id is not None}
+        self._total_length = sum(self._lengths)
+        self._postings = postings_by_term
+        self._doc_terms = doc_terms
+        self._loaded_version = loaded_version
+
+    def _remove(self, position: int):
+        for term in self._doc_terms.pop(position, []):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(position, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths[position]
+        self._lengths[position] = 0
+        self._fields[position] = {}
+        self._doc_ids[position] = None
+
+    def add(self, doc_id: str, heading: str, content: str, fields: Optional[Dict] = None) -> None:
+        """Index a document, replacing any earlier version with the same id"""
+        counts = Counter(tokenize(content))
+        for token in tokenize(heading):
+            counts[token] += HEADING_WEIGHT
+        with self._lock:
+            if doc_id in self._positions:
+                self._remove(self._positions.pop(doc_id))
+            position = len(self._doc_ids)
+            self._doc_ids.append(doc_id)
+            self._positions[doc_id] = position
+            length = sum(counts.values())
+            self._lengths.append(length)
+            self._fields.append(fields or {})
+            self._total_length += length
+            for term, tf in counts.items():
+                self._postings[term][position] = tf
+            self._doc_terms[position] = list(counts)
+            self._dirty = True
+            self._writes += 1
+
+    def remove(self, doc_ids: List[str]) -> int:
+        """Remove the documents with doc_ids, ignoring unknown ones; returns how many were removed"""
+        removed = 0
+        with self._lock:
+            for doc_id in doc_ids:
+                position = self._positions.pop(doc_id, None)
+                if position is not None:
+                    self._remove(position)
+                    removed += 1
+            if removed:
+                self._dirty = True
+                self._writes += 1
+        return removed
+
+    def fields(self, doc_id: str) -> Optional[Dict]:
+        """Display fields stored with doc_id"""
+        position = self._positions.get(doc_id)
+        return self._fields[position] if position is not None else None
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """Return up to top_k (doc_id, score) pairs for query, best first"""
+        terms = set(tokenize(query))
+        with self._lock:
+            doc_count = len(self._positions)
+            if not doc_count or not terms:
+                return []
+            avg_length = self._total_length / doc_count
+            scores: Dict[int, float] = defaultdict(float)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                for position, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[position] / avg_length)
+                    scores[position] += idf * tf * (self.k1 + 1) / (tf + norm)
+            best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+            return [(self._doc_ids[position], score) for position, score in best]
+
+    def save(self) -> None:
+        """Write the index to path if it changed, compacting removed documents away"""
+        if not self.path or not self._dirty:
+            return
+        with self._lock:
+            live = [i for i, doc_id in enumerate(self._doc_ids) if doc_id is not None]
+            remap = {old: new for new, old in enumerate(live)}
+            postings = {}
+            for term, entries in self._postings.items():
+                flat = []
+                for position, tf in entries.items():
+                    flat.extend((remap[position], tf))
+                postings[term] = flat
+            data = {
+                'k1': self.k1,
+                'b': self.b,
+                'doc_ids': [self._doc_ids[i] for i in live],
+                'lengths': [self._lengths[i] for i in live],
+                'fields': [self._fields[i] for i in live],
+                'postings': postings,
+            }
+            tmp_path = self.path + '.tmp'
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+            self._loaded_version = file_version(self.path)
+            self._dirty = False
@@ -1,25 +1,104 @@
 """
 Search module for finding relevant news articles
 """
+import logging
 import os
-from pinecone import Pinecone
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+from news_scraper.db.backends import IndexBackend, PineconeBackend
+from news_scraper.db.filters import build_filter, filter_key, matches_filter
+from news_scraper.db.segments import vector_time
+from news_scraper.metrics import metrics
+from news_scraper.models import ModelRegistry, registry
+from news_scraper.search.bm25 import BM25Index
+from news_scraper.search.cache import LRUCache
+
+logger = logging.getLogger(__name__)
 
 class NewsSearch:
-    def __init__(self, api_key: str, index_name: str = "news-articles-index"):
-        """Initialize the search engine with Pinecone and BERT model"""
-        if not api_key:
-            raise ValueError("Pinecone API key is required")
-        
-        # Initialize Pinecone
-        self.pc = Pinecone(api_key=api_key)
+    def __init__(self, api_key: str = None, index_name: str = "news-articles-index", models: ModelRegistry = None,
+                 backend: IndexBackend = None, embedding_cache_size: int = 1024, result_cache_size: int = 256,
+                 result_cache_ttl: float = 300, lexical_index: BM25Index = None, rrf_k: int = 60):
+        """
+        Initialize the search engine with Pinecone, or with backend when one is
+        given; the embedding model is loaded on first search.
+        Query embeddings are kept in an LRU cache of embedding_cache_size entries.
+        Results are cached for result_cache_ttl seconds (0 disables the result
+        cache) and keyed on the versions of the backend and lexical index. Each
+        search first refreshes both, so indexes saved by another process are
+        reloaded and results from before the change are not served. Backends
+        that cannot report a version, such as Pinecone, rely on the TTL alone.
+        With a lexical_index, searches fuse BM25 keyword matches with vector
+        matches using reciprocal rank fusion with constant rrf_k.
+        """
         self.index_name = index_name
-        self.index = self.pc.Index(self.index_name)
+        self.pc = None
+        if backend is None:
+            if not api_key:
+                raise ValueError("Pinecone API key is required")
+            
+            # Initialize Pinecone
+            from pinecone import Pinecone
+            self.pc = Pinecone(api_key=api_key)
+            backend = PineconeBackend(self.pc.Index(self.index_name))
+        self.index = backend
+        self.lexical_index = lexical_index
+        self.rrf_k = rrf_k
+        
+        # Embedding model shared with VectorDBStorage through the registry
+        self.models = models or registry
         
-        # Initialize the embedding model
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.embedding_cache = LRUCache(maxsize=embedding_cache_size)
+        self.result_cache = LRUCache(maxsize=result_cache_size if result_cache_ttl else 0,
+                                     ttl=result_cache_ttl)
+
+    @property
+    def model(self):
+        """The sentence embedding model, loaded on first use"""
+        return self.models.embedding_model()
     
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Canonical form of a query used as cache key"""
+        return ' '.join(query.lower().split())
+
+    def embed_query(self, query: str):
+        """Return the embedding of query, encoding it only on a cache miss"""
+        key = self.normalize_query(query)
+        embedding = self.embedding_cache.get(key)
+        if embedding is None:
+            with metrics.timer('embed', kind='query'):
+                embedding = self.model.encode(key)
+            embedding.setflags(write=False)
+            self.embedding_cache.put(key, embedding)
+        return embedding
+
+    def embed_queries(self, queries: List[str], batch_size: int = 64) -> List:
+        """Return embeddings for queries, encoding every cache miss together in batched forward passes"""
+        keys = [self.normalize_query(query) for query in queries]
+        embeddings = [self.embedding_cache.get(key) for key in keys]
+        missing = list(dict.fromkeys(key for key, embedding in zip(keys, embeddings) if embedding is None))
+        if missing:
+            with metrics.timer('embed', kind='query_batch'):
+                encoded = dict(zip(missing, self.model.encode(missing, batch_size=batch_size,
+                                                              show_progress_bar=False)))
+            for key, embedding in encoded.items():
+                embedding.setflags(write=False)
+                self.embedding_cache.put(key, embedding)
+            embeddings = [encoded.get(key) if embedding is None else embedding
+                          for key, embedding in zip(keys, embeddings)]
+        return embeddings
+
+    def invalidate_results(self) -> None:
+        """Drop cached search results, e.g. after storing articles through another process"""
+        self.result_cache.clear()
+
+    def cache_stats(self) -> Dict:
+        """Hit/miss statistics of the embedding and result caches"""
+        return {'embeddings': self.embedding_cache.stats(), 'results': self.result_cache.stats()}
+
     def preprocess_query(self, query: str) -> List[str]:
         """Preprocess the query into relevant terms"""
         terms = query.lower().split()
@@ -27,32 +106,129 @@ class NewsSearch:
         terms = [term for term in terms if term not in stop_words]
         return terms
 
-    def search(self, query: str, top_k: int = 5, min_score: float = 0.15) -> List[Dict]:
+    def search(self, query: str, top_k: int = 5, min_score: float = 0.15, mode: str = None,
+               since=None, until=None, sources: Optional[List[str]] = None) -> List[Dict]:
         """
-        Search for articles similar to the query
+        Search for articles similar to the query.
+        mode is 'vector' (embedding similarity plus a keyword boost), 'lexical'
+        (BM25 only, without the model or the vector store; min_score is ignored)
+        or 'hybrid' (vector and BM25 candidates fused by reciprocal rank). It
+        defaults to 'hybrid' when a lexical index is configured, else 'vector'.
+        since and until (datetimes or epoch seconds) limit results to articles
+        scraped in that range, and sources to articles from those sources; a
+        SegmentedIndex skips the segments outside them entirely.
         """
-        # Preprocess query
-        search_terms = self.preprocess_query(query)
+        return self._search(query, top_k, min_score, self._resolve_mode(mode),
+                            filter=build_filter(since, until, sources))
+
+    def search_many(self, queries: Iterable[str], top_k: int = 5, min_score: float = 0.15, mode: str = None,
+                    batch_size: int = 64, max_workers: int = 8, since=None, until=None,
+                    sources: Optional[List[str]] = None) -> List[List[Dict]]:
+        """Run search for every query, returning the result lists in query order"""
+        return list(self.iter_search_many(queries, top_k=top_k, min_score=min_score, mode=mode,
+                                          batch_size=batch_size, max_workers=max_workers,
+                                          since=since, until=until, sources=sources))
+
+    def iter_search_many(self, queries: Iterable[str], top_k: int = 5, min_score: float = 0.15, mode: str = None,
+                         batch_size: int = 64, max_workers: int = 8, since=None, until=None,
+                         sources: Optional[List[str]] = None) -> Iterator[List[Dict]]:
+        """
+        Yield search results for each query in order. Queries are read batch_size
+        at a time; each batch is encoded in one batched forward pass and its index
+        lookups run on max_workers threads, so any number of queries can be streamed.
+        """
+        mode = self._resolve_mode(mode)
+        filter = build_filter(since, until, sources)
+        queries = iter(queries)
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            while True:
+                batch = list(islice(queries, batch_size))
+                if not batch:
+                    break
+                if mode == 'lexical':
+                    embeddings = [None] * len(batch)
+                else:
+                    embeddings = self.embed_queries(batch, batch_size=batch_size)
+                yield from executor.map(
+                    lambda query, embedding: self._search(query, top_k, min_score, mode, embedding, filter),
+                    batch, embeddings)
+
+    def _resolve_mode(self, mode: str = None) -> str:
+        mode = mode or ('hybrid' if self.lexical_index is not None else 'vector')
+        if mode not in ('vector', 'lexical', 'hybrid'):
+            raise ValueError(f"Unknown search mode: {mode}")
+        if mode != 'vector' and self.lexical_index is None:
+            raise ValueError(f"Search mode '{mode}' requires a lexical index")
+        return mode
+
+    def _search(self, query: str, top_k: int, min_score: float, mode: str, embedding=None,
+                filter: Optional[Dict] = None) -> List[Dict]:
+        with metrics.timer('query', mode=mode):
+            # Repeated queries are answered from the result cache while the indexes are unchanged
+            self.index.refresh()
+            lexical_version = None
+            if self.lexical_index is not None:
+                self.lexical_index.refresh()
+                lexical_version = self.lexical_index.version
+            cache_key = (self.normalize_query(query), top_k, min_score, mode, filter_key(filter),
+                         self.index.version, lexical_version)
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                metrics.increment('query_cache', outcome='hit')
+                return [dict(article) for article in cached]
+            metrics.increment('query_cache', outcome='miss')
+        
+            if mode == 'vector':
+                articles = self._vector_search(query, top_k, min_score, embedding, filter)
+            elif mode == 'lexical':
+                articles = self._lexical_search(query, top_k, filter)
+            else:
+                articles = self._hybrid_search(query, top_k, min_score, embedding, filter)
         
+            self.result_cache.put(cache_key, [dict(article) for article in articles])
+            return articles
+
+    @staticmethod
+    def _format_article(metadata: Dict, score: float) -> Dict:
+        return {
+            'score': score,
+            'url': metadata['url'],
+            'heading': metadata['heading'],
+            'summary': metadata.get('summary') or 'No summary available',
+            'source': metadata['source']
+        }
+
+    def _query_vectors(self, query: str, top_k: int, embedding=None, filter: Optional[Dict] = None) -> List[Dict]:
+        """Return the top_k vector matches for query, or for its precomputed embedding, that match filter"""
         # Generate embedding for the query
-        query_embedding = self.model.encode(query)
+        query_embedding = self.embed_query(query) if embedding is None else embedding
         
-        # Debug: Print raw results
-        print("\nDebug - Raw results:")
-        results = self.index.query(
-            vector=query_embedding.tolist(),
-            top_k=top_k * 3,  # Get more results for filtering
-            include_metadata=True
-        )
+        with metrics.timer('index_query'):
+            results = self.index.query(
+                vector=query_embedding,
+                top_k=top_k,
+                include_metadata=True,
+                filter=filter
+            )
         
-        for match in results['matches']:
-            print(f"Score: {match['score']:.3f}, Title: {match['metadata']['heading']}")
+        if logger.isEnabledFor(logging.DEBUG):
+            for match in results['matches']:
+                logger.debug("Raw match: score %.3f, title %s", match['score'], match['metadata']['heading'])
+        return results['matches']
+
+    def _vector_search(self, query: str, top_k: int, min_score: float, embedding=None,
+                       filter: Optional[Dict] = None) -> List[Dict]:
+        # Preprocess query
+        search_terms = self.preprocess_query(query)
+        
+        # Get more results for filtering
+        matches = self._query_vectors(query, top_k * 3, embedding, filter)
         
         # Format results with additional relevance scoring
         seen_urls = set()
         articles = []
         
-        for match in results['matches']:
+        for match in matches:
             url = match['metadata']['url']
             
             if url in seen_urls:
@@ -70,14 +246,7 @@ class NewsSearch:
                 continue
                 
             seen_urls.add(url)
-            article = {
-                'score': combined_score,
-                'url': url,
-                'heading': match['metadata']['heading'],
-                'summary': match['metadata'].get('summary', 'No summary available'),
-                'source': match['metadata']['source']
-            }
-            articles.append(article)
+            articles.append(self._format_article(match['metadata'], combined_score))
             
             if len(articles) >= top_k:
                 break
@@ -86,6 +255,66 @@ class NewsSearch:
         articles.sort(key=lambda x: x['score'], reverse=True)
         return articles
 
+    def _lexical_matches(self, query: str, top_k: int, filter: Optional[Dict] = None) -> List:
+        """Top BM25 (doc_id, score) pairs for query among documents matching filter"""
+        if not filter:
+            return self.lexical_index.search(query, top_k)
+        # Filtering happens after scoring, so rank every matching document first
+        matches = []
+        for doc_id, score in self.lexical_index.search(query, len(self.lexical_index)):
+            fields = self.lexical_index.fields(doc_id)
+            if matches_filter(dict(fields, scraped_ts=vector_time(fields)), filter):
+                matches.append((doc_id, score))
+                if len(matches) >= top_k:
+                    break
+        return matches
+
+    def _lexical_search(self, query: str, top_k: int, filter: Optional[Dict] = None) -> List[Dict]:
+        seen_urls = set()
+        articles = []
+        for doc_id, score in self._lexical_matches(query, top_k * 3, filter):
+            fields = self.lexical_index.fields(doc_id)
+            if fields['url'] in seen_urls:
+                continue
+            seen_urls.add(fields['url'])
+            articles.append(self._format_article(fields, score))
+            if len(articles) >= top_k:
+                break
+        return articles
+
+    def _hybrid_search(self, query: str, top_k: int, min_score: float, embedding=None,
+                       filter: Optional[Dict] = None) -> List[Dict]:
+        """
+        Fuse vector and BM25 candidates with reciprocal rank fusion: each list
+        contributes 1 / (rrf_k + rank) for every article it ranks. Vector matches
+        below min_score do not contribute.
+        """
+        candidates = top_k * 3
+        fused = defaultdict(float)
+        metadata = {}
+        
+        for rank, match in enumerate(self._query_vectors(query, candidates, embedding, filter), 1):
+            metadata[match['id']] = match['metadata']
+            if match['score'] >= min_score:
+                fused[match['id']] += 1.0 / (self.rrf_k + rank)
+        
+        for rank, (doc_id, _) in enumerate(self._lexical_matches(query, candidates, filter), 1):
+            fused[doc_id] += 1.0 / (self.rrf_k + rank)
+            if doc_id not in metadata:
+                metadata[doc_id] = self.lexical_index.fields(doc_id)
+        
+        seen_urls = set()
+        articles = []
+        for doc_id, score in sorted(fused.items(), key=lambda item: item[1], reverse=True):
+            url = metadata[doc_id]['url']
+            if url in seen_urls:
+                continue
+            seen_urls.add(url)
+            articles.append(self._format_article(metadata[doc_id], score))
+            if len(articles) >= top_k:
+                break
+        return articles
+
     def print_results(self, results: List[Dict]):
         """Pretty print search results"""
         # Remove duplicates based on URL while preserving order
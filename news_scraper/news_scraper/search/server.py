@@ -0,0 +1,317 @@
+"""
+Long-running HTTP/JSON search service with request micro-batching and load shedding
+"""
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from news_scraper.metrics import metrics
+from news_scraper.search.news_search import NewsSearch
+
+logger = logging.getLogger(__name__)
+
+REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable',
+    504: 'Gateway Timeout',
+}
+
+
+class HTTPError(Exception):
+    """Error answered with status and a JSON body holding message"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class _Pending:
+    """A queued search request waiting for its micro-batch"""
+
+    __slots__ = ('query', 'options', 'future', 'enqueued')
+
+    def __init__(self, query: str, options: Tuple, future: asyncio.Future):
+        self.query = query
+        self.options = options
+        self.future = future
+        self.enqueued = time.monotonic()
+
+
+class SearchServer:
+    """
+    Serves NewsSearch over HTTP with the models loaded once and kept warm.
+
+    Concurrent requests are gathered for up to batch_window seconds (or until
+    max_batch_size arrive) and answered with one search_many call, so their
+    queries share a single batched encode. At most max_queue requests may wait;
+    beyond that the server answers 503 straight away instead of letting
+    latency grow, and requests not answered within request_timeout get 504.
+
+    Endpoints: GET /search?q=...&top_k=5&mode=hybrid&min_score=0.15, POST
+    /search with the same fields as a JSON object ('query' for q), GET /health,
+    GET /stats and GET /metrics (Prometheus text). Searches can be limited with
+    since and until (epoch seconds or ISO 8601 times) and source (repeated or
+    comma-separated; a 'sources' list in JSON).
+    """
+
+    def __init__(self, search: NewsSearch, host: str = '127.0.0.1', port: int = 8000,
+                 batch_window: float = 0.005, max_batch_size: int = 64, max_queue: int = 256,
+                 request_timeout: float = 10.0, max_body_bytes: int = 65536, max_top_k: int = 50):
+        self.search = search
+        self.host = host
+        self.port = port
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.max_queue = max_queue
+        self.request_timeout = request_timeout
+        self.max_body_bytes = max_body_bytes
+        self.max_top_k = max_top_k
+        self.requests = 0
+        self.shed = 0
+        self.batches = 0
+        self.batched_queries = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._server = None
+        self._batcher = None
+        # Searches run off the event loop, one batch at a time; requests arriving
+        # meanwhile queue up and make the next batch larger
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='search-batch')
+
+    async def start(self) -> None:
+        """Warm the models, then start accepting connections"""
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        await loop.run_in_executor(self._executor, self.search.embed_query, 'warm up')
+        self._batcher = asyncio.create_task(self._run_batches())
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("Search server listening on http://%s:%d", self.host, self.port)
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._batcher is not None:
+            self._batcher.cancel()
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> Dict:
+        return {
+            'requests': self.requests,
+            'shed': self.shed,
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'batches': self.batches,
+            'mean_batch_size': round(self.batched_queries / self.batches, 2) if self.batches else 0.0,
+            'caches': self.search.cache_stats(),
+        }
+
+    # Micro-batching
+
+    async def submit(self, query: str, top_k: int = 5, min_score: float = 0.15, mode: str = None,
+                     since: Optional[float] = None, until: Optional[float] = None,
+                     sources: Tuple[str, ...] = ()) -> List[Dict]:
+        """Queue a search for the next micro-batch and wait for its results"""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait(_Pending(query, (top_k, min_score, mode, since, until, sources), future))
+        except asyncio.QueueFull:
+            self.shed += 1
+            metrics.increment('server_shed', reason='queue_full')
+            raise HTTPError(503, 'Server overloaded, retry later')
+        try:
+            return await asyncio.wait_for(future, self.request_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPError(504, 'Search timed out')
+
+    async def _next_batch(self) -> List[_Pending]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run_batches(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            now = time.monotonic()
+            groups: Dict[Tuple, List[_Pending]] = {}
+            for pending in batch:
+                # Requests that timed out while queued have already been answered
+                if pending.future.done():
+                    continue
+                metrics.observe('server_queue_wait', now - pending.enqueued)
+                groups.setdefault(pending.options, []).append(pending)
+
+            for (top_k, min_score, mode, since, until, sources), pendings in groups.items():
+                queries = [pending.query for pending in pendings]
+                self.batches += 1
+                self.batched_queries += len(queries)
+                metrics.increment('server_batches')
+                metrics.increment('server_batched_queries', len(queries))
+                try:
+                    results = await loop.run_in_executor(
+                        self._executor,
+                        lambda: self.search.search_many(queries, top_k=top_k, min_score=min_score, mode=mode,
+                                                        batch_size=len(queries), since=since, until=until,
+                                                        sources=list(sources)))
+                except Exception as e:
+                    logger.exception("Search batch of %d queries failed", len(queries))
+                    for pending in pendings:
+                        if not pending.future.done():
+                            pending.future.set_exception(e)
+                    continue
+                for pending, result in zip(pendings, results):
+                    if not pending.future.done():
+                        pending.future.set_result(result)
+
+    # HTTP
+
+    @staticmethod
+    def _time_param(params: Dict, name: str) -> Optional[float]:
+        value = params.get(name)
+        if value in (None, ''):
+            return None
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            pass
+        try:
+            return datetime.fromisoformat(str(value)).timestamp()
+        except ValueError:
+            raise HTTPError(400, f'{name} must be epoch seconds or an ISO 8601 time')
+
+    def _search_params(self, method: str, query_string: str, body: bytes) -> Tuple:
+        if method == 'GET':
+            values = parse_qs(query_string)
+            params = {key: value[-1] for key, value in values.items()}
+            query = params.get('q', '')
+            sources = [source for value in values.get('source', []) for source in value.split(',')]
+        elif method == 'POST':
+            try:
+                params = json.loads(body or b'{}')
+            except ValueError:
+                raise HTTPError(400, 'Body must be a JSON object')
+            if not isinstance(params, dict):
+                raise HTTPError(400, 'Body must be a JSON object')
+            query = params.get('query', '')
+            sources = params.get('sources') or ([params['source']] if params.get('source') else [])
+            if not isinstance(sources, list) or not all(isinstance(source, str) for source in sources):
+                raise HTTPError(400, 'sources must be a list of strings')
+        else:
+            raise HTTPError(405, 'Use GET or POST')
+        if not isinstance(query, str) or not query.strip():
+            raise HTTPError(400, 'A non-empty query is required')
+        try:
+            top_k = int(params.get('top_k', 5))
+            min_score = float(params.get('min_score', 0.15))
+        except (TypeError, ValueError):
+            raise HTTPError(400, 'top_k must be an integer and min_score a number')
+        if not 1 <= top_k <= self.max_top_k:
+            raise HTTPError(400, f'top_k must be between 1 and {self.max_top_k}')
+        try:
+            mode = self.search._resolve_mode(params.get('mode') or None)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        since = self._time_param(params, 'since')
+        until = self._time_param(params, 'until')
+        sources = tuple(sorted({source.strip() for source in sources if source.strip()}))
+        return query, top_k, min_score, mode, since, until, sources
+
+    async def _route(self, method: str, target: str, body: bytes) -> Tuple[int, str, bytes]:
+        """Return (status, content type, body) for a request"""
+        url = urlsplit(target)
+        if url.path == '/search':
+            query, top_k, min_score, mode, since, until, sources = self._search_params(method, url.query, body)
+            results = await self.submit(query, top_k, min_score, mode, since, until, sources)
+            payload = {'query': query, 'mode': mode, 'results': results}
+        elif url.path == '/health':
+            payload = {'status': 'ok'}
+        elif url.path == '/stats':
+            payload = self.stats()
+        elif url.path == '/metrics':
+            return 200, 'text/plain; version=0.0.4', metrics.to_prometheus().encode('utf-8')
+        else:
+            raise HTTPError(404, f'No such endpoint: {url.path}')
+        return 200, 'application/json', json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        """Return (method, target, headers, body), or None when the client closed the connection"""
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        try:
+            method, target, _ = request_line.decode('latin-1').split()
+        except ValueError:
+            raise HTTPError(400, 'Malformed request line')
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        # The body cannot be delimited without a valid length, so these errors also close the connection
+        declared = headers.get('content-length') or '0'
+        if not (declared.isascii() and declared.isdigit()):
+            raise HTTPError(400, 'Content-Length must be a non-negative integer')
+        length = int(declared)
+        if length > self.max_body_bytes:
+            raise HTTPError(413, 'Request body too large')
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target, headers, body
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                keep_alive = False
+                start = time.perf_counter()
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+                    self.requests += 1
+                    status, content_type, payload = await self._route(method, target, body)
+                except HTTPError as e:
+                    status, content_type = e.status, 'application/json'
+                    payload = json.dumps({'error': str(e)}).encode('utf-8')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:
+                    logger.exception("Error handling request")
+                    status, content_type = 500, 'application/json'
+                    payload = json.dumps({'error': str(e)}).encode('utf-8')
+                metrics.observe('server_request', time.perf_counter() - start, status=status)
+
+                head = [f'HTTP/1.1 {status} {REASONS.get(status, "")}',
+                        f'Content-Type: {content_type}',
+                        f'Content-Length: {len(payload)}',
+                        f'Connection: {"keep-alive" if keep_alive else "close"}']
+                if status == 503:
+                    head.append('Retry-After: 1')
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,248 @@
+"""
+Article summarizers: fast extractive TextRank and the abstractive BART model,
+plus a persistent cache of summaries keyed by content hash
+"""
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, List
+
+import numpy as np
+
+from news_scraper.models import ModelRegistry, SUMMARIZATION_MODEL_NAME, registry
+from news_scraper.search.bm25 import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Sentence ends followed by whitespace, or run straight into the next sentence
+# as in text scraped from separate paragraph tags
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+|(?<=[a-z][.!?])(?=[A-Z])')
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_CHUNK = 500
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split article text into sentences, keeping paragraph breaks as boundaries"""
+    sentences = []
+    for paragraph in text.split('\n\n'):
+        sentences.extend(s.strip() for s in _SENTENCE_END.split(paragraph) if s and s.strip())
+    return sentences
+
+
+def _first_paragraph(text: str) -> str:
+    return text.split('\n\n')[0] if text else ""
+
+
+class Summarizer:
+    """Interface for summarizers used by VectorDBStorage"""
+
+    # Identifies the summarizer and its settings in the summary cache
+    name = None
+
+    def summarize(self, texts: List[str], max_length: int = 150, batch_size: int = 8) -> List[str]:
+        """Return one summary per text, in order"""
+        raise NotImplementedError
+
+
+class ExtractiveSummarizer(Summarizer):
+    """
+    TextRank: sentences are ranked by PageRank over their pairwise cosine
+    similarity, and the best ones are returned in article order. Similarity
+    uses log-scaled term counts by default; with use_embeddings=True it uses
+    sentence embeddings from the shared MiniLM model instead. Only the first
+    max_sentences sentences of an article are considered.
+    """
+
+    def __init__(self, num_sentences: int = 3, use_embeddings: bool = False, models: ModelRegistry = None,
+                 damping: float = 0.85, iterations: int = 50, max_sentences: int = 80):
+        self.num_sentences = num_sentences
+        self.use_embeddings = use_embeddings
+        self.models = models or registry
+        self.damping = damping
+        self.iterations = iterations
+        self.max_sentences = max_sentences
+        self.name = f"textrank{'-minilm' if use_embeddings else ''}:{num_sentences}"
+
+    @staticmethod
+    def _term_vectors(sentences: List[str]) -> np.ndarray:
+        vocabulary: Dict[str, int] = {}
+        rows, cols = [], []
+        for row, sentence in enumerate(sentences):
+            for token in tokenize(sentence):
+                rows.append(row)
+                cols.append(vocabulary.setdefault(token, len(vocabulary)))
+        counts = np.zeros((len(sentences), max(len(vocabulary), 1)), dtype=np.float32)
+        np.add.at(counts, (rows, cols), 1)
+        return np.log1p(counts)
+
+    def _rank(self, vectors: np.ndarray) -> np.ndarray:
+        """PageRank scores of the sentences over their cosine similarity graph"""
+        n = len(vectors)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        unit = vectors / np.maximum(norms, 1e-12)
+        similarity = np.clip(unit @ unit.T, 0, None)
+        np.fill_diagonal(similarity, 0)
+        totals = similarity.sum(axis=1, keepdims=True)
+        # Sentences sharing nothing with the rest link to every sentence equally
+        transition = np.where(totals > 0, similarity / np.maximum(totals, 1e-12), 1.0 / n)
+        scores = np.full(n, 1.0 / n, dtype=np.float32)
+        for _ in range(self.iterations):
+            updated = (1 - self.damping) / n + self.damping * (transition.T @ scores)
+            if np.abs(updated - scores).sum() < 1e-6:
+                return updated
+            scores = updated
+        return scores
+
+    def _select(self, sentences: List[str], scores: np.ndarray, max_length: int) -> str:
+        """Best sentences up to num_sentences and about max_length words, in article order"""
+        chosen, words = [], 0
+        for i in np.argsort(-scores, kind='stable'):
+            length = len(sentences[i].split())
+            if chosen and words + length > max_length:
+                continue
+            chosen.append(i)
+            words += length
+            if len(chosen) == self.num_sentences:
+                break
+        return ' '.join(sentences[i] for i in sorted(chosen))
+
+    def summarize(self, texts: List[str], max_length: int = 150, batch_size: int = 8) -> List[str]:
+        documents = [split_sentences(text)[:self.max_sentences] for text in texts]
+        if self.use_embeddings:
+            # One encode call for the sentences of every text in the batch
+            flat = [sentence for sentences in documents for sentence in sentences]
+            embeddings = np.asarray(self.models.embedding_model().encode(
+                flat, batch_size=64, convert_to_numpy=True, show_progress_bar=False), dtype=np.float32)
+            offsets = np.cumsum([0] + [len(sentences) for sentences in documents])
+        summaries = []
+        for i, sentences in enumerate(documents):
+            if len(sentences) <= 1:
+                summaries.append(sentences[0] if sentences else "")
+                continue
+            if self.use_embeddings:
+                vectors = embeddings[offsets[i]:offsets[i + 1]]
+            else:
+                vectors = self._term_vectors(sentences)
+            summaries.append(self._select(sentences, self._rank(vectors), max_length))
+        return summaries
+
+
+class AbstractiveSummarizer(Summarizer):
+    """
+    Summaries written by a transformers summarization model (BART by default).
+    Inputs are sorted by length first so each batch holds texts of similar
+    length and little time is spent on padding.
+    """
+
+    def __init__(self, model_name: str = SUMMARIZATION_MODEL_NAME, models: ModelRegistry = None):
+        self.model_name = model_name
+        self.models = models or registry
+        self.name = f"abstractive:{model_name}"
+
+    @staticmethod
+    def _summary_input(text: str) -> str:
+        """Truncate article text to the first paragraphs the summarizer sees"""
+        paragraphs = text.split('\n\n')[:3]
+        words = ' '.join(paragraphs).split()[:1000]
+        return ' '.join(words)
+
+    def summarize(self, texts: List[str], max_length: int = 150, batch_size: int = 8) -> List[str]:
+        inputs = [self._summary_input(text) for text in texts]
+        order = sorted(range(len(inputs)), key=lambda i: len(inputs[i]))
+        summaries = [None] * len(inputs)
+
+        for start in range(0, len(order), batch_size):
+            bucket = order[start:start + batch_size]
+            try:
+                summarizer = self.models.summarizer(self.model_name)
+                outputs = summarizer([inputs[i] for i in bucket],
+                                     max_length=max_length,
+                                     min_length=30,
+                                     do_sample=False,
+                                     truncation=True,
+                                     batch_size=len(bucket))
+                for i, output in zip(bucket, outputs):
+                    summaries[i] = output['summary_text'].strip()
+            except Exception as e:
+                logger.warning("Could not generate summaries: %s", e)
+                for i in bucket:
+                    summaries[i] = _first_paragraph(texts[i])
+        return summaries
+
+
+def summarizer_from_env(models: ModelRegistry = None) -> Summarizer:
+    """
+    Return the summarizer chosen by NEWS_SUMMARIZER: 'extractive' (the default),
+    'extractive-minilm' or 'abstractive'
+    """
+    mode = os.getenv('NEWS_SUMMARIZER', 'extractive').lower()
+    if mode == 'abstractive':
+        return AbstractiveSummarizer(models=models)
+    if mode == 'extractive-minilm':
+        return ExtractiveSummarizer(use_embeddings=True, models=models)
+    if mode != 'extractive':
+        raise ValueError(f"Unknown summarizer: {mode}")
+    return ExtractiveSummarizer(models=models)
+
+
+class SummaryCache:
+    """
+    SQLite-backed summaries keyed by a hash of the summarizer, its length
+    limit and the article text, so unchanged articles are never summarized twice
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS summaries (
+                key TEXT PRIMARY KEY,
+                summary TEXT NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+
+    @staticmethod
+    def key(summarizer: Summarizer, text: str, max_length: int) -> str:
+        """Cache key of the summary of text by summarizer"""
+        digest = hashlib.sha256(f"{summarizer.name}\n{max_length}\n{text}".encode('utf-8'))
+        return digest.hexdigest()[:32]
+
+    def get_many(self, keys: List[str]) -> Dict[str, str]:
+        """Return the cached summaries for the keys that have one"""
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), _QUERY_CHUNK):
+                chunk = keys[i:i + _QUERY_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, summary FROM summaries WHERE key IN ({placeholders})", chunk)
+                found.update(rows)
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, summaries: Dict[str, str]) -> None:
+        """Store summaries by key"""
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO summaries VALUES (?, ?)", summaries.items())
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def close(self) -> None:
+        """Close the underlying database"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Script to crawl several news sites from a persistent frontier
+"""
+import argparse
+import os
+from news_scraper.db.article_store import ArticleStore
+from news_scraper.metrics import configure_logging, write_metrics_file
+from news_scraper.scrapers.bbc_scraper import NewsScraper
+from news_scraper.scrapers.crawler import Crawler
+from news_scraper.scrapers.frontier import CrawlFrontier
+from news_scraper.scrapers.http_cache import HTTPCache
+from news_scraper.scrapers.sites import DEFAULT_SITES, load_site_rules
+from news_scraper.scrapers.url_index import SeenURLIndex
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sites', default=None, help='JSON file of site rules (default: BBC News)')
+    parser.add_argument('--limit', type=int, default=None, help='stop after this many articles')
+    parser.add_argument('--max-seconds', type=float, default=None, help='stop after this many seconds')
+    parser.add_argument('--workers', type=int, default=16, help='fetches in flight across all sites')
+    parser.add_argument('--ignore-robots', action='store_true', help='do not fetch or obey robots.txt')
+    args = parser.parse_args()
+
+    data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+    os.makedirs(data_dir, exist_ok=True)
+
+    sites = load_site_rules(args.sites) if args.sites else DEFAULT_SITES
+
+    # The frontier keeps queued URLs between runs, so an interrupted crawl
+    # picks up where it stopped
+    frontier = CrawlFrontier(os.path.join(data_dir, 'crawl_frontier.sqlite'))
+    cache = HTTPCache(os.path.join(data_dir, 'http_cache.sqlite'))
+
+    # Articles already saved on earlier runs are not queued again
+    article_store = ArticleStore(data_dir)
+    url_index = SeenURLIndex(os.path.join(data_dir, 'seen_urls.sqlite'))
+    if len(url_index) == 0:
+        for path in article_store.article_files():
+            url_index.import_articles_file(path)
+
+    # Per-host delays are applied by the crawler, not the scraper
+    scraper = NewsScraper(sites[0].listing_urls[0], delay=0, max_workers=args.workers,
+                          cache=cache, url_index=url_index)
+    writer = article_store.new_writer(compression=os.getenv('NEWS_ARTICLES_COMPRESSION') or None)
+    crawler = Crawler(scraper, frontier, sites, writer=writer, max_workers=args.workers,
+                      respect_robots=not args.ignore_robots)
+
+    try:
+        print(f"Crawling {len(sites)} site(s)...")
+        stats = crawler.run(limit=args.limit, max_seconds=args.max_seconds)
+
+        print(f"\nScraped {stats.get('article', 0)} articles from {stats.get('listing', 0)} listing pages "
+              f"in {stats['seconds']:.1f}s ({stats.get('failed', 0)} failed, "
+              f"{stats.get('blocked', 0)} blocked by robots.txt)")
+        if writer.count:
+            print(f"Articles saved to {writer.path}")
+        print("Frontier: " + ', '.join(f"{count} {state}" for state, count in sorted(stats['frontier'].items())))
+    finally:
+        writer.close()
+        if writer.count == 0:
+            os.remove(writer.path)
+        scraper.close()
+        frontier.close()
+
+if __name__ == "__main__":
+    configure_logging()
+    try:
+        main()
+    finally:
+        write_metrics_file()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Script to inspect, compact and expire the segments of the local segmented index
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+from news_scraper.db.segments import SegmentedIndex
+from news_scraper.metrics import configure_logging, write_metrics_file
+from news_scraper.near_duplicates import NearDuplicateIndex
+from news_scraper.search.bm25 import BM25Index
+
+def format_time(seconds):
+    return datetime.fromtimestamp(seconds).strftime('%Y-%m-%d %H:%M') if seconds is not None else '-'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('stats', help='list every segment')
+    compact = commands.add_parser('compact', help='merge old daily segments into monthly ones')
+    compact.add_argument('--older-than-days', type=float, default=30)
+    drop = commands.add_parser('drop', help='delete segments older than the retention period')
+    drop.add_argument('--older-than-days', type=float, required=True)
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    # Same location backend_from_env uses for NEWS_INDEX_BACKEND=segmented
+    data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+    index = SegmentedIndex(os.getenv('NEWS_INDEX_PATH', os.path.join(data_dir, 'index')))
+
+    if args.command == 'compact':
+        merged = index.compact(time.time() - args.older_than_days * 86400)
+        print(f"Merged {merged} daily segments")
+    elif args.command == 'drop':
+        dropped = index.drop(time.time() - args.older_than_days * 86400)
+        print(f"Removed {len(dropped)} vectors")
+        # Dropped articles must not stay searchable by keyword or block their own republished copies
+        lexical_path = os.path.join(data_dir, 'lexical_index.json.gz')
+        if dropped and os.path.exists(lexical_path):
+            lexical_index = BM25Index(lexical_path)
+            print(f"Removed {lexical_index.remove(dropped)} lexical index documents")
+            lexical_index.save()
+        near_duplicates_path = os.path.join(data_dir, 'near_duplicates.sqlite')
+        if dropped and os.path.exists(near_duplicates_path):
+            near_duplicates = NearDuplicateIndex(near_duplicates_path)
+            print(f"Removed {near_duplicates.remove(dropped)} near-duplicate signatures")
+            near_duplicates.close()
+
+    segments = index.segment_stats()
+    print(f"{len(segments)} segments, {len(index)} vectors")
+    for segment in segments:
+        sources = ', '.join(f"{source} {count}" for source, count in sorted(segment['sources'].items(), key=str))
+        print(f"  {segment['name']:<9} {segment['count']:>7}  {format_time(segment['min_ts'])} .. "
+              f"{format_time(segment['max_ts'])}  {sources}")
+
+if __name__ == "__main__":
+    configure_logging()
+    try:
+        main()
+    finally:
+        write_metrics_file()
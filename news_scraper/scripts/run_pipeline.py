@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Script to scrape, summarize, embed and store new articles in one streaming pass
+"""
+import argparse
+import os
+import time
+from dotenv import load_dotenv
+from news_scraper.db.article_store import ArticleStore
+from news_scraper.db.backends import backend_from_env
+from news_scraper.db.vector_store import VectorDBStorage
+from news_scraper.inference import inference_pool_from_env
+from news_scraper.metrics import configure_logging, write_metrics_file
+from news_scraper.near_duplicates import NearDuplicateIndex
+from news_scraper.pipeline import IngestPipeline
+from news_scraper.scrapers.bbc_scraper import NewsScraper
+from news_scraper.scrapers.http_cache import HTTPCache
+from news_scraper.scrapers.url_index import SeenURLIndex
+from news_scraper.search.bm25 import BM25Index
+from news_scraper.summarizers import SummaryCache
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--limit', type=int, default=None, help='maximum number of articles per run')
+    parser.add_argument('--fetch-workers', type=int, default=8)
+    parser.add_argument('--summarize-workers', type=int, default=1)
+    parser.add_argument('--embed-workers', type=int, default=1)
+    parser.add_argument('--upsert-workers', type=int, default=4, help='upsert batches in flight at once')
+    parser.add_argument('--inference-workers', type=int, default=None,
+                        help='processes to summarize and embed in (default: NEWS_INFERENCE_WORKERS, else none)')
+    parser.add_argument('--watch', type=float, default=None, metavar='SECONDS',
+                        help='keep polling for new articles every SECONDS')
+    args = parser.parse_args()
+
+    # Load environment variables
+    load_dotenv()
+    
+    data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    
+    # Use a local index when NEWS_INDEX_BACKEND=local, otherwise Pinecone
+    backend = backend_from_env(os.path.join(data_dir, 'index'))
+    api_key = os.getenv("PINECONE_API_KEY")
+    if backend is None and not api_key:
+        raise ValueError("PINECONE_API_KEY not found in environment variables")
+    
+    lexical_index = BM25Index(os.path.join(data_dir, 'lexical_index.json.gz'))
+    summary_cache = SummaryCache(os.path.join(data_dir, 'summary_cache.sqlite'))
+    near_duplicates = NearDuplicateIndex(os.path.join(data_dir, 'near_duplicates.sqlite'))
+    inference = inference_pool_from_env(args.inference_workers)
+    storage = VectorDBStorage(api_key, backend=backend, lexical_index=lexical_index,
+                              summary_cache=summary_cache, near_duplicates=near_duplicates,
+                              upsert_workers=args.upsert_workers, inference=inference)
+    
+    # Same cache, seen-URL index and article files as scrape_news.py
+    article_store = ArticleStore(data_dir)
+    cache = HTTPCache(os.path.join(data_dir, 'http_cache.sqlite'))
+    url_index = SeenURLIndex(os.path.join(data_dir, 'seen_urls.sqlite'))
+    if len(url_index) == 0:
+        for path in article_store.article_files():
+            url_index.import_articles_file(path)
+    scraper = NewsScraper('https://www.bbc.com/news', delay=0.2, max_workers=args.fetch_workers,
+                          cache=cache, url_index=url_index)
+    
+    writer = article_store.new_writer(compression=os.getenv('NEWS_ARTICLES_COMPRESSION') or None)
+    pipeline = IngestPipeline(scraper, storage, writer=writer, fetch_workers=args.fetch_workers,
+                              summarize_workers=args.summarize_workers, embed_workers=args.embed_workers)
+    
+    try:
+        while True:
+            stats = pipeline.run(limit=args.limit)
+            print(f"Stored {stats['stored']} of {stats['urls']} new articles in {stats['seconds']}s")
+            for name, stage in stats['stages'].items():
+                print(f"  {name}: {stage['processed']} processed, {stage['errors']} failed, "
+                      f"{stage['busy_seconds']}s busy across {stage['workers']} workers")
+            lexical_index.save()
+            if args.watch is None:
+                break
+            time.sleep(args.watch)
+    except KeyboardInterrupt:
+        print("Stopping.")
+    finally:
+        writer.close()
+        if writer.count == 0:
+            os.remove(writer.path)
+        scraper.close()
+        if inference is not None:
+            inference.close()
+
+if __name__ == "__main__":
+    configure_logging()
+    try:
+        main()
+    finally:
+        write_metrics_file()
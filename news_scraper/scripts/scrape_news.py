@@ -4,27 +4,47 @@ Script to scrape latest news articles
 """
 import os
 from dotenv import load_dotenv
-from news_scraper.scrapers.bbc_scraper import NewsScraper, save_articles
+from news_scraper.db.article_store import ArticleStore
+from news_scraper.metrics import configure_logging, write_metrics_file
+from news_scraper.scrapers.bbc_scraper import NewsScraper
+from news_scraper.scrapers.http_cache import HTTPCache
+from news_scraper.scrapers.url_index import SeenURLIndex
 
 def main():
     # Create data directory if it doesn't exist
     data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
     os.makedirs(data_dir, exist_ok=True)
     
-    # Initialize scraper with BBC News URL
-    scraper = NewsScraper('https://www.bbc.com/news')
+    # Initialize scraper with BBC News URL, fetching articles concurrently
+    # while keeping requests to the site at most 5 per second. Pages seen on
+    # earlier runs are revalidated against the on-disk cache.
+    cache = HTTPCache(os.path.join(data_dir, 'http_cache.sqlite'))
+
+    # Articles already saved on earlier runs are not fetched again
+    article_store = ArticleStore(data_dir)
+    url_index = SeenURLIndex(os.path.join(data_dir, 'seen_urls.sqlite'))
+    if len(url_index) == 0:
+        for path in article_store.article_files():
+            url_index.import_articles_file(path)
+
+    scraper = NewsScraper('https://www.bbc.com/news', delay=0.2, max_workers=8,
+                          cache=cache, url_index=url_index)
+    
+    # Articles are appended to a JSON Lines file as soon as each one is scraped;
+    # set NEWS_ARTICLES_COMPRESSION to gzip or zstd to compress it
+    writer = article_store.new_writer(compression=os.getenv('NEWS_ARTICLES_COMPRESSION') or None)
     
     try:
         print("Fetching latest news articles...")
         
         # Scrape latest articles
-        articles = scraper.scrape_latest_news(limit=10)
-        
-        # Save articles to JSON file
-        output_file = save_articles(articles, data_dir)
-        
-        print(f"\nArticles saved to {output_file} \n")
-        print(f"Scraped {len(articles)} articles:\n")
+        articles = scraper.scrape_latest_news(limit=10, writer=writer)
+        if not articles:
+            print("No new articles since the last run.")
+            return
+
+        print(f"\nArticles saved to {writer.path} \n")
+        print(f"Scraped {len(articles)} new articles:\n")
         
         # Print article details
         for article in articles:
@@ -34,10 +54,21 @@ def main():
             print(f"URL: {article['url']}")
             print("-" * 50 + "\n")
             
+        stats = cache.stats()
+        print(f"HTTP cache: {stats['hits']} hits, {stats['misses']} misses")
         print("Scraping completed.")
             
     except Exception as e:
         print(f"Error: {str(e)}")
+    finally:
+        writer.close()
+        if writer.count == 0:
+            os.remove(writer.path)
+        scraper.close()
 
 if __name__ == "__main__":
-    main()
+    configure_logging()
+    try:
+        main()
+    finally:
+        write_metrics_file()
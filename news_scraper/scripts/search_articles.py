@@ -2,21 +2,56 @@
 """
 Script to search articles in vector database
 """
+import argparse
 import os
+import time
 from dotenv import load_dotenv
+from news_scraper.db.backends import backend_from_env
+from news_scraper.metrics import configure_logging, write_metrics_file
+from news_scraper.search.bm25 import BM25Index
 from news_scraper.search.news_search import NewsSearch
 
+def run_queries_file(search_engine, queries_file, **filters):
+    """Search every non-empty line of queries_file in batches and print the results"""
+    with open(queries_file, 'r', encoding='utf-8') as f:
+        queries = [line.strip() for line in f if line.strip()]
+    
+    for query, results in zip(queries, search_engine.iter_search_many(queries, **filters)):
+        print(f"\nQuery: {query}")
+        search_engine.print_results(results)
+
 def main():
+    parser = argparse.ArgumentParser(description="Search articles in the vector database")
+    parser.add_argument('--queries-file', help="file with one query per line to run in batches instead of prompting")
+    parser.add_argument('--days', type=float, help="only search articles scraped in the last DAYS days")
+    parser.add_argument('--source', action='append', help="only search articles from this source (repeatable)")
+    args = parser.parse_args()
+    filters = {
+        'since': time.time() - args.days * 86400 if args.days else None,
+        'sources': args.source,
+    }
+    
     # Load environment variables
     load_dotenv()
     
+    # Use a local index when NEWS_INDEX_BACKEND=local or segmented, otherwise Pinecone
+    data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+    backend = backend_from_env(os.path.join(data_dir, 'index'))
+    
     # Get Pinecone API key
     api_key = os.getenv("PINECONE_API_KEY")
-    if not api_key:
+    if backend is None and not api_key:
         raise ValueError("PINECONE_API_KEY not found in environment variables")
     
-    # Initialize search engine
-    search_engine = NewsSearch(api_key)
+    # Initialize search engine, combining vector and keyword search when
+    # store_articles.py has built the keyword index
+    lexical_path = os.path.join(data_dir, 'lexical_index.json.gz')
+    lexical_index = BM25Index(lexical_path) if os.path.exists(lexical_path) else None
+    search_engine = NewsSearch(api_key, backend=backend, lexical_index=lexical_index)
+    
+    if args.queries_file:
+        run_queries_file(search_engine, args.queries_file, **filters)
+        return
     
     while True:
         # Get search query
@@ -31,7 +66,7 @@ def main():
         
         try:
             # Perform search
-            results = search_engine.search(query)
+            results = search_engine.search(query, **filters)
             
             # Print results
             search_engine.print_results(results)
@@ -40,4 +75,8 @@ def main():
             print(f"Error during search: {str(e)}")
 
 if __name__ == "__main__":
-    main()
+    configure_logging()
+    try:
+        main()
+    finally:
+        write_metrics_file()
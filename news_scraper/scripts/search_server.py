@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Script to serve article search over HTTP with warm models
+"""
+import argparse
+import asyncio
+import os
+from dotenv import load_dotenv
+from news_scraper.db.backends import backend_from_env
+from news_scraper.metrics import configure_logging, metrics, write_metrics_file
+from news_scraper.search.bm25 import BM25Index
+from news_scraper.search.news_search import NewsSearch
+from news_scraper.search.server import SearchServer
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve article search over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--batch-window-ms', type=float, default=5, help="how long to gather requests into one batch")
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-queue', type=int, default=256, help="queued requests beyond which new ones get 503")
+    parser.add_argument('--request-timeout', type=float, default=10.0)
+    args = parser.parse_args()
+    
+    # Load environment variables
+    load_dotenv()
+    
+    # Use a local index when NEWS_INDEX_BACKEND=local, otherwise Pinecone
+    data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+    backend = backend_from_env(os.path.join(data_dir, 'index'))
+    
+    # Get Pinecone API key
+    api_key = os.getenv("PINECONE_API_KEY")
+    if backend is None and not api_key:
+        raise ValueError("PINECONE_API_KEY not found in environment variables")
+    
+    lexical_path = os.path.join(data_dir, 'lexical_index.json.gz')
+    lexical_index = BM25Index(lexical_path) if os.path.exists(lexical_path) else None
+    search_engine = NewsSearch(api_key, backend=backend, lexical_index=lexical_index)
+    
+    # /metrics is served from the shared metrics, so always collect them here
+    metrics.enable()
+    server = SearchServer(search_engine, host=args.host, port=args.port,
+                          batch_window=args.batch_window_ms / 1000,
+                          max_batch_size=args.max_batch_size,
+                          max_queue=args.max_queue,
+                          request_timeout=args.request_timeout)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("Stopping.")
+
+if __name__ == "__main__":
+    configure_logging()
+    try:
+        main()
+    finally:
+        write_metrics_file()
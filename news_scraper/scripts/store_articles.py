@@ -4,34 +4,71 @@ Script to store articles in vector database
 """
 import os
 from dotenv import load_dotenv
+from news_scraper.db.article_store import ArticleStore
+from news_scraper.db.backends import backend_from_env
+from news_scraper.db.upsert import UpsertCheckpoint
 from news_scraper.db.vector_store import VectorDBStorage
+from news_scraper.inference import inference_pool_from_env
+from news_scraper.metrics import configure_logging, write_metrics_file
+from news_scraper.near_duplicates import NearDuplicateIndex
+from news_scraper.search.bm25 import BM25Index
+from news_scraper.summarizers import SummaryCache
 
 def main():
     # Load environment variables
     load_dotenv()
     
+    # Use a local index when NEWS_INDEX_BACKEND=local, otherwise Pinecone
+    data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
+    backend = backend_from_env(os.path.join(data_dir, 'index'))
+    
     # Get Pinecone API key
     api_key = os.getenv("PINECONE_API_KEY")
-    if not api_key:
+    if backend is None and not api_key:
         raise ValueError("PINECONE_API_KEY not found in environment variables")
     
-    # Initialize vector store
-    store = VectorDBStorage(api_key)
+    # Initialize vector store, keeping the keyword index in data/ up to date too,
+    # caching summaries so re-ingested articles are not summarized again and
+    # skipping republished copies of stories that are already stored
+    lexical_index = BM25Index(os.path.join(data_dir, 'lexical_index.json.gz'))
+    summary_cache = SummaryCache(os.path.join(data_dir, 'summary_cache.sqlite'))
+    near_duplicates = NearDuplicateIndex(os.path.join(data_dir, 'near_duplicates.sqlite'))
+    # Summarize and embed in NEWS_INFERENCE_WORKERS processes, if set
+    inference = inference_pool_from_env()
+    store = VectorDBStorage(api_key, backend=backend, lexical_index=lexical_index,
+                            summary_cache=summary_cache, near_duplicates=near_duplicates,
+                            inference=inference)
     
-    # Find the latest articles file
-    data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
-    articles_files = [f for f in os.listdir(data_dir) if f.startswith('news_articles_') and f.endswith('.json')]
+    # Find every articles file with records that have not been stored yet
+    article_store = ArticleStore(data_dir)
+    articles_files = article_store.pending_files()
+    
+    # A new keyword index is filled from every file; articles already in the
+    # vector index are only added to it, without any model work
+    rebuild_lexical = len(lexical_index) == 0
+    if rebuild_lexical:
+        articles_files = article_store.article_files()
     
     if not articles_files:
-        print("No article files found in data directory")
+        print("No new article files found in data directory")
         return
     
-    # Get the most recent file
-    latest_file = sorted(articles_files)[-1]
-    articles_file = os.path.join(data_dir, latest_file)
-    
-    # Store articles in vector database
-    store.store_articles(articles_file)
+    # Store articles in vector database, resuming where earlier runs stopped;
+    # vectors prepared by a run whose upserts failed are reused from the checkpoint
+    checkpoint = UpsertCheckpoint(os.path.join(data_dir, 'upsert_checkpoint.sqlite'))
+    try:
+        for articles_file in articles_files:
+            if rebuild_lexical and article_store.is_up_to_date(articles_file):
+                store.store_articles(articles_file, checkpoint=checkpoint)
+            else:
+                store.store_articles(articles_file, article_store=article_store, checkpoint=checkpoint)
+    finally:
+        if inference is not None:
+            inference.close()
 
 if __name__ == "__main__":
-    main()
+    configure_logging()
+    try:
+        main()
+    finally:
+        write_metrics_file()
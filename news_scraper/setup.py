@@ -11,6 +11,7 @@ setup(
         'sentence-transformers',
         'transformers[torch]',
         'nltk',
+        'numpy',
         'python-dotenv'
     ],
     python_requires='>=3.8',
@@ -0,0 +1,119 @@
+"""
+Shared fixtures: stand-in models and a local HTTP server, so tests run offline
+"""
+import hashlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+
+class HashEmbedder:
+    """Deterministic stand-in for the sentence embedding model"""
+
+    dimension = 384
+
+    def _embed(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little')
+        return np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, show_progress_bar=False, **kwargs):
+        if isinstance(texts, str):
+            return self._embed(texts)
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.stack([self._embed(text) for text in texts])
+
+
+class StubModels:
+    """Model registry handing out the stand-in embedder"""
+
+    def __init__(self):
+        self.embedder = HashEmbedder()
+
+    def embedding_model(self, name=None):
+        return self.embedder
+
+
+class RecordingStubModels(StubModels):
+    """
+    StubModels that take load_seconds to load and then append the process id
+    and the OMP_NUM_THREADS the process was started with to $NEWS_TEST_LOAD_LOG
+    """
+
+    load_seconds = 0.5
+
+    def __init__(self):
+        super().__init__()
+        time.sleep(self.load_seconds)
+        with open('/proc/self/environ', 'rb') as f:
+            environment = dict(entry.split(b'=', 1) for entry in f.read().split(b'\0') if b'=' in entry)
+        with open(os.environ['NEWS_TEST_LOAD_LOG'], 'a', encoding='utf-8') as f:
+            f.write(f"{os.getpid()} {environment.get(b'OMP_NUM_THREADS', b'-').decode()}\n")
+
+
+@pytest.fixture
+def models():
+    return StubModels()
+
+
+class LocalServer:
+    """
+    HTTP server on a free local port answering with handler(request), which
+    returns (status, headers, body); every request is recorded with its arrival time
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server.requests.append((time.monotonic(), self.path, dict(self.headers)))
+                status, headers, body = server.handler(self)
+                data = body.encode('utf-8') if isinstance(body, str) else body
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self._httpd.server_address[1]}'
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def paths(self):
+        return [path for _, path, _ in self.requests]
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def local_server():
+    """Factory starting a LocalServer for a handler; servers are stopped after the test"""
+    servers = []
+
+    def start(handler):
+        server = LocalServer(handler).__enter__()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.__exit__()
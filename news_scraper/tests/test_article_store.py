@@ -0,0 +1,74 @@
+import gzip
+import json
+
+from news_scraper.db.article_store import ArticleStore, iter_articles
+
+
+def article(i):
+    return {'url': f'https://example.com/{i}', 'heading': f'Story {i}', 'content': 'Text.',
+            'keywords': [], 'source': 'BBC News', 'timestamp': '20250901_120000'}
+
+
+def write_lines(path, articles, mode='a'):
+    opener = gzip.open if str(path).endswith('.gz') else open
+    with opener(path, mode + 't', encoding='utf-8') as f:
+        for item in articles:
+            f.write(json.dumps(item) + '\n')
+
+
+def ingest(store, path):
+    """Read what is pending like VectorDBStorage.store_articles and mark the file complete"""
+    position = store.position(path)
+    urls = []
+    for item, position in iter_articles(path, position):
+        urls.append(item['url'])
+    store.mark_processed(path, position, complete=True)
+    return urls
+
+
+def test_resumes_after_the_last_processed_record(tmp_path):
+    path = str(tmp_path / 'news_articles_20250901_120000.jsonl')
+    write_lines(path, [article(0), article(1)])
+    store = ArticleStore(str(tmp_path))
+    assert len(ingest(store, path)) == 2
+    assert store.pending_files() == []
+
+    write_lines(path, [article(2)])
+    assert store.pending_files() == [path]
+    assert ingest(ArticleStore(str(tmp_path)), path) == ['https://example.com/2']
+
+
+def test_line_appended_before_marking_complete_is_ingested_later(tmp_path):
+    path = str(tmp_path / 'news_articles_20250901_120000.jsonl')
+    write_lines(path, [article(0)])
+    store = ArticleStore(str(tmp_path))
+    records = list(iter_articles(path))
+    # The scraper appends while the ingest is finishing up
+    write_lines(path, [article(1)])
+    store.mark_processed(path, records[-1][1], complete=True)
+
+    assert not store.is_up_to_date(path)
+    assert ingest(store, path) == ['https://example.com/1']
+
+
+def test_partial_trailing_line_keeps_the_file_pending(tmp_path):
+    path = str(tmp_path / 'news_articles_20250901_120000.jsonl')
+    write_lines(path, [article(0)])
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"url": "https://example.com/1"')
+    store = ArticleStore(str(tmp_path))
+    assert len(ingest(store, path)) == 1
+    assert store.pending_files() == [path]
+
+
+def test_compressed_file_appended_during_ingest_stays_pending(tmp_path):
+    path = str(tmp_path / 'news_articles_20250901_120000.jsonl.gz')
+    write_lines(path, [article(0)])
+    store = ArticleStore(str(tmp_path))
+    records = list(iter_articles(path))
+    write_lines(path, [article(1)])
+    store.mark_processed(path, records[-1][1], complete=True)
+
+    assert store.pending_files() == [path]
+    assert ingest(store, path) == ['https://example.com/1']
+    assert store.pending_files() == []
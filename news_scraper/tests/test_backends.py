@@ -0,0 +1,109 @@
+import threading
+
+import numpy as np
+import pytest
+
+from news_scraper.db.backends import LocalIndex
+
+
+def unit(seed, dimension=8):
+    values = np.random.default_rng(seed).standard_normal(dimension).astype(np.float32)
+    return values / np.linalg.norm(values)
+
+
+def vector(vector_id, values, **metadata):
+    return {'id': vector_id, 'values': values, 'metadata': dict({'tag': vector_id}, **metadata)}
+
+
+def test_query_returns_best_matches_first(tmp_path):
+    index = LocalIndex(str(tmp_path), dimension=8)
+    index.upsert([vector(f'v{i}', unit(i)) for i in range(20)])
+    matches = index.query(unit(3), top_k=3)['matches']
+    assert matches[0]['id'] == 'v3'
+    assert matches[0]['score'] == pytest.approx(1.0, abs=1e-5)
+    assert [m['score'] for m in matches] == sorted((m['score'] for m in matches), reverse=True)
+
+
+def test_filtered_query_only_returns_matching_metadata(tmp_path):
+    index = LocalIndex(str(tmp_path), dimension=8)
+    index.upsert([vector(f'v{i}', unit(i), source='A' if i % 2 else 'B') for i in range(20)])
+    matches = index.query(unit(3), top_k=5, filter={'source': {'$in': ['B']}})['matches']
+    assert len(matches) == 5
+    assert all(m['metadata']['source'] == 'B' for m in matches)
+
+
+def test_flush_and_reload_round_trip(tmp_path):
+    index = LocalIndex(str(tmp_path), dimension=8)
+    index.upsert([vector(f'v{i}', unit(i)) for i in range(5)])
+    index.delete(['v2'])
+    index.flush()
+    reloaded = LocalIndex(str(tmp_path))
+    assert sorted(reloaded.ids()) == ['v0', 'v1', 'v3', 'v4']
+    assert reloaded.query(unit(4), top_k=1)['matches'][0]['id'] == 'v4'
+
+
+class WriteOnRead(dict):
+    """Metadata that runs a write on the index the first time a filter reads it"""
+
+    def __init__(self, write, **fields):
+        super().__init__(**fields)
+        self.write = write
+
+    def get(self, key, default=None):
+        write, self.write = self.write, None
+        if write is not None:
+            write()
+        return super().get(key, default)
+
+
+@pytest.mark.parametrize('write', ['delete', 'update'])
+def test_query_scores_a_snapshot_when_written_to_midway(tmp_path, write):
+    index = LocalIndex(str(tmp_path), dimension=8)
+    index.upsert([vector(f'v{i}', unit(i)) for i in range(10)])
+    if write == 'delete':
+        change = lambda: index.delete(['v0', 'v1'])
+    else:
+        change = lambda: index.upsert([vector('v4', unit(99), tag='v4-new')])
+    index.upsert([{'id': 'v3', 'values': unit(3), 'metadata': WriteOnRead(change, tag='v3')}])
+
+    matches = index.query(unit(3), top_k=10, filter={'tag': {'$ne': 'none'}})['matches']
+
+    assert [m['metadata']['tag'] for m in matches] == [m['id'] for m in matches]
+    assert matches[0]['id'] == 'v3'
+
+
+def test_queries_stay_consistent_during_concurrent_writes(tmp_path):
+    """Every match's metadata must belong to the vector that was scored for it"""
+    index = LocalIndex(str(tmp_path), dimension=8)
+    index.upsert([vector(f'v{i}', unit(i)) for i in range(50)])
+    stop = threading.Event()
+    errors = []
+
+    def write():
+        seed = 1000
+        while not stop.is_set():
+            seed += 1
+            # Appends that grow the matrix, in-place updates and deletes
+            index.upsert([vector(f'n{seed}', unit(seed)), vector(f'v{seed % 50}', unit(seed % 50))])
+            if seed % 7 == 0:
+                index.delete([f'n{seed - 3}'])
+
+    def read():
+        for i in range(300):
+            for match in index.query(unit(i % 50), top_k=5)['matches']:
+                if match['metadata']['tag'] != match['id']:
+                    errors.append(match)
+            top = index.query(unit(i % 50), top_k=1)['matches'][0]
+            if top['id'] != f'v{i % 50}' or top['score'] < 0.999:
+                errors.append(top)
+
+    writer = threading.Thread(target=write)
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    writer.start()
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+    stop.set()
+    writer.join()
+    assert errors == []
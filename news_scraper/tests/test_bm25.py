@@ -0,0 +1,84 @@
+import math
+
+import pytest
+
+from news_scraper.db.backends import IndexBackend
+from news_scraper.search.bm25 import BM25Index, tokenize
+from news_scraper.search.news_search import NewsSearch
+
+
+def fields(doc_id):
+    return {'url': f'https://example.com/{doc_id}', 'heading': doc_id, 'source': 'BBC News'}
+
+
+@pytest.fixture
+def index():
+    index = BM25Index(k1=1.5, b=0.75)
+    index.add('flood', 'Flood warning', 'rivers rising fast in the valley', fields('flood'))
+    index.add('rain', 'Rain expected', 'heavy rain and rivers', fields('rain'))
+    index.add('vote', 'Election day', 'voters queue at polling stations', fields('vote'))
+    return index
+
+
+def bm25(tf, df, length, avg_length, doc_count=3, k1=1.5, b=0.75):
+    idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+    return idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_length))
+
+
+def test_scores_follow_okapi_bm25_with_weighted_headings(index):
+    # Heading terms count three times; stop words are not indexed
+    assert tokenize('The rivers and the Flood') == ['rivers', 'flood']
+    lengths = {'flood': 6 + 4, 'rain': 6 + 3, 'vote': 6 + 4}
+    avg_length = sum(lengths.values()) / 3
+
+    results = dict(index.search('rivers flood'))
+    assert set(results) == {'flood', 'rain'}
+    assert results['flood'] == pytest.approx(bm25(1, 2, lengths['flood'], avg_length)
+                                             + bm25(3, 1, lengths['flood'], avg_length))
+    assert results['rain'] == pytest.approx(bm25(1, 2, lengths['rain'], avg_length))
+    assert index.search('the and') == [] and index.search('volcano') == []
+
+
+def test_replaced_and_removed_documents_leave_the_postings(index):
+    index.add('flood', 'Flood lifted', 'waters have receded', fields('flood'))
+    assert [doc_id for doc_id, _ in index.search('rivers')] == ['rain']
+    assert [doc_id for doc_id, _ in index.search('receded')] == ['flood']
+
+    assert index.remove(['rain']) == 1
+    assert index.search('rivers') == [] and len(index) == 2
+
+
+def test_saved_index_scores_the_same_after_compaction(tmp_path, index):
+    index.path = str(tmp_path / 'lexical.json.gz')
+    index.add('rain', 'Rain expected', 'heavy rain and floods', fields('rain'))
+    index.remove(['vote'])
+    before = index.search('rain floods flood')
+    index.save()
+
+    reopened = BM25Index(index.path)
+    assert len(reopened) == 2 and reopened.fields('rain') == fields('rain')
+    assert reopened.search('rain floods flood') == pytest.approx(before)
+
+
+class FixedIndex(IndexBackend):
+    """Vector index answering every query with the same ranked matches"""
+
+    def __init__(self, matches):
+        self.matches = matches
+
+    def query(self, vector, top_k=10, include_metadata=True, filter=None):
+        return {'matches': self.matches[:top_k]}
+
+
+def test_hybrid_search_fuses_ranks_with_reciprocal_rank_fusion(index, models):
+    vector_matches = [{'id': doc_id, 'score': score, 'metadata': fields(doc_id)}
+                      for doc_id, score in [('vote', 0.9), ('rain', 0.5), ('flood', 0.1)]]
+    search = NewsSearch(backend=FixedIndex(vector_matches), models=models, lexical_index=index, rrf_k=10)
+
+    # Lexically 'flood' ranks first and 'rain' second; 'flood' is below min_score as a vector match
+    results = search.search('rivers flood', top_k=3, min_score=0.2)
+    scores = {article['heading']: article['score'] for article in results}
+
+    assert [article['heading'] for article in results] == ['rain', 'vote', 'flood']
+    assert scores == pytest.approx({'rain': 1 / 12 + 1 / 12, 'vote': 1 / 11, 'flood': 1 / 11})
+    assert [a['heading'] for a in search.search('rivers flood', mode='lexical')] == ['flood', 'rain']
@@ -0,0 +1,65 @@
+from news_scraper.scrapers.bbc_scraper import NewsScraper
+from news_scraper.scrapers.crawler import Crawler, parse_crawl_delay
+from news_scraper.scrapers.frontier import CrawlFrontier
+from news_scraper.scrapers.sites import SiteRules
+
+LISTING = '<a href="/news/articles/1">One</a> <a href="/news/articles/2">Two</a>'
+ARTICLE = '<h1>Heading</h1><article><p>Body text of the article.</p></article>'
+
+
+def site_handler(robots):
+    def handler(request):
+        if request.path == '/robots.txt':
+            return 200, {'Content-Type': 'text/plain'}, robots
+        body = LISTING if request.path == '/news' else ARTICLE
+        return 200, {'Content-Type': 'text/html'}, body
+    return handler
+
+
+def crawl(tmp_path, server, delay=0.0):
+    scraper = NewsScraper(server.url, delay=0)
+    scraper._stop_words = set()
+    site = SiteRules('Local', [f'{server.url}/news'], r'/news/articles/', delay=delay, max_concurrency=1)
+    frontier = CrawlFrontier(str(tmp_path / 'frontier.sqlite'))
+    try:
+        return Crawler(scraper, frontier, [site], max_workers=4).run()
+    finally:
+        scraper.close()
+
+
+def test_crawl_delay_from_robots_spaces_the_first_requests(tmp_path, local_server):
+    server = local_server(site_handler('User-agent: *\nCrawl-delay: 0.3\n'))
+    stats = crawl(tmp_path, server)
+
+    assert stats['article'] == 2
+    assert server.paths()[0] == '/robots.txt'
+    page_times = [arrived for arrived, path, _ in server.requests if path != '/robots.txt']
+    gaps = [later - earlier for earlier, later in zip(page_times, page_times[1:])]
+    assert len(gaps) == 2 and min(gaps) >= 0.25
+
+
+def test_robots_disallow_blocks_urls(tmp_path, local_server):
+    server = local_server(site_handler('User-agent: *\nDisallow: /news/articles/2\n'))
+    stats = crawl(tmp_path, server)
+
+    assert stats['article'] == 1 and stats['blocked'] == 1
+    assert '/news/articles/2' not in server.paths()
+
+
+def test_parse_crawl_delay_reads_fractional_values():
+    lines = ['User-agent: *', 'Crawl-delay: 0.5']
+    assert parse_crawl_delay(lines, 'Mozilla/5.0') == 0.5
+
+
+def test_parse_crawl_delay_prefers_the_group_naming_the_agent():
+    lines = ['User-agent: *', 'Crawl-delay: 5', '',
+             'User-agent: otherbot', 'Disallow: /private', '',
+             'User-agent: newsbot  # this crawler', 'User-agent: feedbot', 'Crawl-delay: 1.5']
+    assert parse_crawl_delay(lines, 'NewsBot/2.0') == 1.5
+    assert parse_crawl_delay(lines, 'OtherBot/1.0') is None
+    assert parse_crawl_delay(lines, 'Mozilla/5.0') == 5.0
+
+
+def test_parse_crawl_delay_ignores_malformed_values():
+    assert parse_crawl_delay(['User-agent: *', 'Crawl-delay: soon'], 'Mozilla/5.0') is None
+    assert parse_crawl_delay([], 'Mozilla/5.0') is None
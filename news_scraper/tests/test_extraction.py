@@ -0,0 +1,48 @@
+import pytest
+
+from news_scraper.scrapers.extraction import parse_article_html
+from news_scraper.scrapers.sites import SiteRules
+
+
+def content(body):
+    return parse_article_html(f'<html><body><article><h1>Heading</h1>{body}</article></body></html>')[1].split('\n\n')
+
+
+def test_leaf_blocks_become_paragraphs_in_order():
+    assert content('<div><p>One.</p><p>Two <b>bold</b> <a href="/x">link</a>.</p></div><h2>Sub</h2>') == \
+        ['One.', 'Two bold link.', 'Sub']
+
+
+@pytest.mark.parametrize('body, expected', [
+    ('<div>Intro text<p>Para one.</p></div>', ['Intro text', 'Para one.']),
+    ('<div>Intro.<ul><li>item one</li><li>item two</li></ul>Outro.</div>', ['Intro.', 'item one', 'item two', 'Outro.']),
+    ('<section>Section text <em>with emphasis</em><p>Last para.</p></section>',
+     ['Section text with emphasis', 'Last para.']),
+    ('Loose text<p>Para.</p>', ['Loose text', 'Para.']),
+])
+def test_text_next_to_child_blocks_is_kept(body, expected):
+    assert content(body) == expected
+
+
+def test_heading_chrome_and_repeats_are_left_out():
+    body = ('<div><h1>Heading again</h1>Byline</div><!-- comment --><script>var x = 1;</script>'
+            '<div><button>Share</button></div><p>Share</p><p>Body.</p><p>Body.</p>'
+            '<figure><figcaption>Caption</figcaption></figure>')
+    assert content(body) == ['Byline', 'Body.']
+
+
+def test_heading_falls_back_to_the_page_h1():
+    html = '<h1>Page heading</h1><main><p>Body.</p></main>'
+    assert parse_article_html(html) == ('Page heading', 'Body.')
+
+
+def test_pages_without_article_or_main_use_every_paragraph():
+    html = '<h1>Heading</h1><div>Menu</div><p>First.</p><div><p>Second.</p></div>'
+    assert parse_article_html(html) == ('Heading', 'First.\n\nSecond.')
+
+
+def test_site_container_selectors_use_the_same_paragraphs():
+    site = SiteRules('Example', ['https://example.com/'], r'/story/', container='.story', heading='.title')
+    html = ('<div class="title">Story title</div><nav>Menu</nav>'
+            '<div class="story">Lead text<p>Body.</p></div>')
+    assert site.extract(html) == ('Story title', 'Lead text\n\nBody.')
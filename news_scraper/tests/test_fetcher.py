@@ -0,0 +1,125 @@
+import threading
+
+import pytest
+import requests
+
+from news_scraper.metrics import metrics
+from news_scraper.scrapers import fetcher
+from news_scraper.scrapers.fetcher import HostRateLimiter, create_session, fetch_with_retry
+
+
+def ok(request):
+    return 200, {'Content-Type': 'text/plain'}, 'ok'
+
+
+def test_rate_limiter_spaces_concurrent_requests_to_one_host(local_server):
+    server = local_server(ok)
+    limiter = HostRateLimiter(0.1)
+    session = create_session({}, pool_size=4)
+
+    threads = [threading.Thread(target=fetch_with_retry, args=(session, f'{server.url}/{i}', limiter))
+               for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    arrivals = sorted(arrived for arrived, _, _ in server.requests)
+    gaps = [later - earlier for earlier, later in zip(arrivals, arrivals[1:])]
+    assert len(arrivals) == 4 and min(gaps) >= 0.08
+
+
+def test_rate_limiter_keeps_hosts_independent(local_server):
+    first, second = local_server(ok), local_server(ok)
+    limiter = HostRateLimiter(0.5)
+    session = create_session({})
+
+    fetch_with_retry(session, f'{first.url}/a', limiter)
+    fetch_with_retry(session, f'{second.url}/a', limiter)
+
+    assert second.requests[0][0] - first.requests[0][0] < 0.25
+
+
+def test_session_reuses_pooled_connections(local_server):
+    ports = []
+
+    def handler(request):
+        ports.append(request.client_address[1])
+        return ok(request)
+
+    server = local_server(handler)
+    session = create_session({}, pool_size=2)
+    for i in range(5):
+        fetch_with_retry(session, f'{server.url}/{i}')
+
+    assert len(ports) == 5 and len(set(ports)) == 1
+
+
+def test_retryable_statuses_are_retried_honouring_retry_after(local_server):
+    statuses = iter([503, 429, 200])
+
+    def handler(request):
+        status = next(statuses)
+        return status, {'Retry-After': '0.2'} if status != 200 else {}, 'body'
+
+    server = local_server(handler)
+    response = fetch_with_retry(create_session({}), f'{server.url}/a', backoff=0.01)
+
+    assert response.status_code == 200 and len(server.requests) == 3
+    assert server.requests[1][0] - server.requests[0][0] >= 0.18
+
+
+def test_retry_after_beyond_max_backoff_returns_the_response(local_server):
+    server = local_server(lambda request: (503, {'Retry-After': '3600'}, 'busy'))
+    response = fetch_with_retry(create_session({}), f'{server.url}/a', max_backoff=5)
+
+    assert response.status_code == 503 and len(server.requests) == 1
+
+
+def test_computed_backoff_is_capped(local_server, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(fetcher.time, 'sleep', sleeps.append)
+    server = local_server(lambda request: (500, {}, 'error'))
+    fetch_with_retry(create_session({}), f'{server.url}/a', max_retries=4, backoff=1, max_backoff=2.5)
+
+    assert len(sleeps) == 4 and max(sleeps) == 2.5
+
+
+def test_fetch_timer_excludes_rate_limiter_waits(local_server):
+    server = local_server(ok)
+    limiter = HostRateLimiter(0.3)
+    session = create_session({})
+    metrics.reset()
+    metrics.enable()
+    try:
+        fetch_with_retry(session, f'{server.url}/a', limiter)
+        fetch_with_retry(session, f'{server.url}/b', limiter)
+        fetch = metrics.snapshot()['timers']['fetch']
+    finally:
+        metrics.disable()
+        metrics.reset()
+
+    assert fetch['count'] == 2 and fetch['p99_ms'] < 200
+
+
+def test_gives_up_after_max_retries_returning_the_last_response(local_server):
+    server = local_server(lambda request: (500, {}, 'error'))
+    response = fetch_with_retry(create_session({}), f'{server.url}/a', max_retries=2, backoff=0.01)
+
+    assert response.status_code == 500 and len(server.requests) == 3
+
+
+def test_other_errors_are_returned_without_retrying(local_server):
+    server = local_server(lambda request: (404, {}, 'missing'))
+    response = fetch_with_retry(create_session({}), f'{server.url}/a', backoff=0.01)
+
+    assert response.status_code == 404 and len(server.requests) == 1
+
+
+def test_connection_errors_are_raised_after_max_retries(local_server):
+    server = local_server(ok)
+    url = f'{server.url}/a'
+    server.__exit__()
+
+    with pytest.raises(requests.ConnectionError):
+        fetch_with_retry(create_session({}), url, max_retries=1, backoff=0.01, timeout=1)
@@ -0,0 +1,73 @@
+import pytest
+
+from news_scraper.metrics import metrics
+from news_scraper.scrapers.bbc_scraper import NewsScraper
+from news_scraper.scrapers.http_cache import HTTPCache
+
+PAGE = '<html><h1>Flood warning</h1></html>'
+
+
+@pytest.fixture
+def counters():
+    metrics.reset()
+    metrics.enable()
+    yield lambda: metrics.snapshot()['counters']
+    metrics.disable()
+    metrics.reset()
+
+
+def etag_handler(etag='"v1"', body=PAGE):
+    def handler(request):
+        if request.headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b''
+        return 200, {'ETag': etag, 'Content-Type': 'text/html'}, body
+    return handler
+
+
+def test_unchanged_pages_are_revalidated_with_304(tmp_path, local_server, counters):
+    server = local_server(etag_handler())
+    cache = HTTPCache(str(tmp_path / 'cache.sqlite'))
+    scraper = NewsScraper(server.url, delay=0, cache=cache)
+    url = f'{server.url}/news/1'
+
+    assert scraper.fetch_html(url) == PAGE
+    assert scraper.fetch_html(url) == PAGE
+
+    assert 'If-None-Match' not in server.requests[0][2]
+    assert server.requests[1][2]['If-None-Match'] == '"v1"'
+    assert cache.stats()['revalidations'] == 1 and cache.stats()['misses'] == 1
+    assert counters() == {'fetch_cache{outcome=miss}': 1, 'fetch_cache{outcome=revalidated}': 1}
+    scraper.close()
+
+
+def test_changed_pages_replace_the_cached_body(tmp_path, local_server):
+    server = local_server(etag_handler())
+    cache = HTTPCache(str(tmp_path / 'cache.sqlite'))
+    scraper = NewsScraper(server.url, delay=0, cache=cache)
+    url = f'{server.url}/news/1'
+    scraper.fetch_html(url)
+
+    server.handler = etag_handler('"v2"', '<html><h1>Flood warning lifted</h1></html>')
+    assert 'lifted' in scraper.fetch_html(url)
+    assert cache.get(url)['etag'] == '"v2"'
+    scraper.close()
+
+
+def test_fresh_entries_are_served_without_a_request(tmp_path, local_server):
+    server = local_server(etag_handler())
+    scraper = NewsScraper(server.url, delay=0, cache=HTTPCache(str(tmp_path / 'cache.sqlite'), max_age=60))
+    url = f'{server.url}/news/1'
+
+    scraper.fetch_html(url)
+    assert scraper.fetch_html(url) == PAGE
+    assert len(server.requests) == 1
+    scraper.close()
+
+
+def test_no_cache_metrics_without_a_cache(local_server, counters):
+    server = local_server(etag_handler())
+    scraper = NewsScraper(server.url, delay=0)
+
+    assert scraper.fetch_html(f'{server.url}/news/1') == PAGE
+    assert not any(name.startswith('fetch_cache') for name in counters())
+    scraper.close()
@@ -0,0 +1,83 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+from conftest import RecordingStubModels, StubModels
+from news_scraper.db.backends import LocalIndex
+from news_scraper.db.vector_store import VectorDBStorage
+from news_scraper.inference import InferencePool, shard_by_length
+from news_scraper.summarizers import ExtractiveSummarizer, SummaryCache
+
+
+def articles(count):
+    return [{'url': f'https://example.com/{i}', 'heading': f'Story {i}', 'keywords': [], 'source': 'BBC News',
+             'timestamp': '20250901_120000',
+             'content': ' '.join(f'Sentence {j} of story {i} about floods.' for j in range(1 + i % 7))}
+            for i in range(count)]
+
+
+@pytest.fixture(scope='module')
+def pool():
+    with InferencePool(workers=2, num_threads=1, models_factory=StubModels) as pool:
+        pool.start()
+        yield pool
+
+
+def test_shards_group_texts_by_length_longest_first():
+    texts = ['a' * n for n in (5, 1, 9, 3, 7)]
+    shards = shard_by_length(texts, 2)
+    assert shards == [[2, 4, 0], [3, 1]]
+    assert shard_by_length([], 4) == []
+
+
+def test_pool_matches_in_process_inference(tmp_path, pool):
+    batch = articles(23)
+    local = VectorDBStorage(backend=LocalIndex(str(tmp_path / 'a')), models=StubModels())
+    pooled = VectorDBStorage(backend=LocalIndex(str(tmp_path / 'b')), models=StubModels(), inference=pool)
+
+    expected = local.prepare_article_vectors(batch)
+    actual = pooled.prepare_article_vectors(batch)
+
+    assert [v['metadata'] for v in actual] == [v['metadata'] for v in expected]
+    assert all(np.array_equal(a['values'], e['values']) for a, e in zip(actual, expected))
+
+
+def test_embeddings_come_back_in_text_order(pool):
+    texts = ['short', 'a much longer text than the others', 'mid length']
+    embeddings = pool.embed(texts)
+    assert embeddings.dtype == np.float32
+    assert np.array_equal(embeddings, StubModels().embedding_model().encode(texts))
+    assert pool.embed([]).shape == (0, pool.dimension())
+
+
+def test_summary_cache_is_keyed_on_the_pool_summarizer(tmp_path, pool):
+    cache = SummaryCache(str(tmp_path / 'summaries.sqlite'))
+    storage = VectorDBStorage(backend=LocalIndex(str(tmp_path)), models=StubModels(), inference=pool,
+                              summary_cache=cache)
+    text = articles(3)[2]['content']
+    storage.generate_summaries([text])
+    assert cache.get_many([SummaryCache.key(pool.summarizer, text, 150)])
+
+
+def test_explicit_summarizer_with_a_pool_is_rejected(tmp_path, pool):
+    with pytest.raises(ValueError):
+        VectorDBStorage(backend=LocalIndex(str(tmp_path)), models=StubModels(), inference=pool,
+                        summarizer=ExtractiveSummarizer(num_sentences=1))
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='reads /proc/self/environ')
+def test_start_waits_for_every_worker_started_with_its_thread_settings(tmp_path, monkeypatch):
+    log = tmp_path / 'loads.txt'
+    monkeypatch.setenv('NEWS_TEST_LOAD_LOG', str(log))
+    monkeypatch.delenv('OMP_NUM_THREADS', raising=False)
+    with InferencePool(workers=3, num_threads=2, models_factory=RecordingStubModels) as pool:
+        pool.start()
+        # One load in the parent for the summarizer, then one per worker
+        loads = log.read_text().splitlines()
+        assert len(loads) == 1 + 3
+        worker_loads = [line.split() for line in loads if int(line.split()[0]) != os.getpid()]
+        assert len({pid for pid, _ in worker_loads}) == 3
+        assert {threads for _, threads in worker_loads} == {'2'}
+        assert 'OMP_NUM_THREADS' not in os.environ
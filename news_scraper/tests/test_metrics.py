@@ -0,0 +1,95 @@
+import json
+import logging
+
+import pytest
+
+from news_scraper import metrics as metrics_module
+from news_scraper.metrics import JSONFormatter, Metrics
+
+
+@pytest.fixture
+def recorded():
+    recorded = Metrics(enabled=True, buckets=(0.1, 1.0), prefix='test')
+    for seconds in (0.05, 0.5, 2.0):
+        recorded.observe('fetch', seconds)
+    recorded.observe('query', 0.2, mode='hybrid')
+    recorded.increment('fetch_cache', outcome='hit')
+    recorded.increment('fetch_cache', 2, outcome='hit')
+    recorded.increment('ingest_skipped', 4, reason='unchanged')
+    return recorded
+
+
+def test_disabled_metrics_record_nothing():
+    disabled = Metrics(enabled=False)
+    with disabled.timer('fetch'):
+        pass
+    disabled.increment('fetch_cache', outcome='hit')
+    assert disabled.snapshot() == {'timers': {}, 'counters': {}}
+
+
+def test_timers_count_errors_and_call_hooks():
+    timed = Metrics(enabled=True)
+    calls = []
+    timed.add_hook(lambda name, seconds, labels: calls.append((name, labels)))
+
+    with pytest.raises(ValueError):
+        with timed.timer('embed', kind='article'):
+            raise ValueError('model failed')
+
+    snapshot = timed.snapshot()
+    assert snapshot['timers']['embed{kind=article}']['count'] == 1
+    assert snapshot['counters'] == {'embed_errors{kind=article}': 1}
+    assert calls == [('embed', {'kind': 'article'})]
+
+
+def test_snapshot_reports_counts_and_quantiles(recorded):
+    snapshot = json.loads(recorded.to_json())
+
+    assert snapshot['counters'] == {'fetch_cache{outcome=hit}': 3, 'ingest_skipped{reason=unchanged}': 4}
+    assert snapshot['timers']['fetch'] == {'count': 3, 'sum_seconds': 2.55, 'mean_ms': 850.0,
+                                           'p50_ms': 500.0, 'p95_ms': 1850.0, 'p99_ms': 1970.0}
+    assert snapshot['timers']['query{mode=hybrid}']['count'] == 1
+
+
+def test_prometheus_export_has_cumulative_histograms(recorded):
+    assert recorded.to_prometheus().splitlines() == [
+        '# TYPE test_fetch_cache_total counter',
+        'test_fetch_cache_total{outcome="hit"} 3',
+        '# TYPE test_ingest_skipped_total counter',
+        'test_ingest_skipped_total{reason="unchanged"} 4',
+        '# TYPE test_fetch_seconds histogram',
+        'test_fetch_seconds_bucket{le="0.1"} 1',
+        'test_fetch_seconds_bucket{le="1.0"} 2',
+        'test_fetch_seconds_bucket{le="+Inf"} 3',
+        'test_fetch_seconds_sum 2.55',
+        'test_fetch_seconds_count 3',
+        '# TYPE test_query_seconds histogram',
+        'test_query_seconds_bucket{mode="hybrid",le="0.1"} 0',
+        'test_query_seconds_bucket{mode="hybrid",le="1.0"} 1',
+        'test_query_seconds_bucket{mode="hybrid",le="+Inf"} 1',
+        'test_query_seconds_sum{mode="hybrid"} 0.2',
+        'test_query_seconds_count{mode="hybrid"} 1',
+    ]
+
+
+def test_metrics_files_are_written_in_the_format_of_their_extension(tmp_path, recorded, monkeypatch):
+    recorded.write(str(tmp_path / 'metrics.prom'))
+    recorded.write(str(tmp_path / 'metrics.json'))
+    assert (tmp_path / 'metrics.prom').read_text(encoding='utf-8') == recorded.to_prometheus()
+    assert json.loads((tmp_path / 'metrics.json').read_text(encoding='utf-8')) == recorded.snapshot()
+
+    monkeypatch.setattr(metrics_module, 'metrics', recorded)
+    monkeypatch.setenv('NEWS_METRICS_FILE', str(tmp_path / 'run.prom'))
+    metrics_module.write_metrics_file()
+    assert (tmp_path / 'run.prom').read_text(encoding='utf-8') == recorded.to_prometheus()
+
+
+def test_json_log_lines_carry_extra_fields():
+    record = logging.LogRecord('news_scraper.scrapers', logging.WARNING, __file__, 1,
+                               'Error scraping article %s', ('https://example.com/1',), None)
+    record.url = 'https://example.com/1'
+    entry = json.loads(JSONFormatter().format(record))
+
+    assert entry['level'] == 'WARNING' and entry['logger'] == 'news_scraper.scrapers'
+    assert entry['message'] == 'Error scraping article https://example.com/1'
+    assert entry['url'] == 'https://example.com/1'
@@ -0,0 +1,68 @@
+import subprocess
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+from news_scraper.db.backends import LocalIndex
+from news_scraper.db.vector_store import VectorDBStorage
+from news_scraper.models import ModelRegistry
+from news_scraper.search.news_search import NewsSearch
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Record SentenceTransformer loads and torch thread settings instead of loading models"""
+    loads = []
+
+    class SentenceTransformer:
+        def __init__(self, name, device=None):
+            time.sleep(0.05)
+            loads.append((name, device))
+
+    monkeypatch.setitem(sys.modules, 'sentence_transformers',
+                        types.SimpleNamespace(SentenceTransformer=SentenceTransformer))
+    monkeypatch.setitem(sys.modules, 'torch', types.SimpleNamespace(set_num_threads=lambda n: loads.append(n)))
+    return loads
+
+
+def test_importing_the_entry_points_loads_no_models():
+    code = ('import sys\n'
+            'import news_scraper.db.vector_store, news_scraper.search.news_search, news_scraper.scrapers.bbc_scraper\n'
+            'print(sorted(m for m in ("torch", "transformers", "sentence_transformers", "nltk.corpus") '
+            'if m in sys.modules))')
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == '[]'
+
+
+def test_models_load_once_and_are_shared(tmp_path, loads):
+    registry = ModelRegistry(device='cpu', num_threads=2)
+    storage = VectorDBStorage(backend=LocalIndex(str(tmp_path / 'index')), models=registry)
+    search = NewsSearch(models=registry, backend=storage.backend)
+    assert loads == [] and registry.loaded() == []
+
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(registry.embedding_model())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loads == [2, ('all-MiniLM-L6-v2', 'cpu')]
+    assert all(model is search.model for model in models)
+    assert registry.loaded() == [('embedding', 'all-MiniLM-L6-v2')]
+
+
+def test_settings_apply_to_models_loaded_afterwards(loads, monkeypatch):
+    monkeypatch.setenv('NEWS_MODEL_DEVICE', 'cuda')
+    monkeypatch.setenv('NEWS_MODEL_THREADS', '3')
+    registry = ModelRegistry()
+    first = registry.embedding_model()
+
+    registry.configure(device='cpu', num_threads=1)
+    registry.embedding_model('other-model')
+    registry.clear()
+    assert registry.embedding_model() is not first
+    assert loads == [3, ('all-MiniLM-L6-v2', 'cuda'), 1, ('other-model', 'cpu'), 1, ('all-MiniLM-L6-v2', 'cpu')]
@@ -0,0 +1,24 @@
+from news_scraper.near_duplicates import NearDuplicateIndex, shingles
+
+STORY = 'Rivers across the region rose overnight and several roads were closed by the council.'
+
+
+def test_signatures_match_exact_integer_arithmetic():
+    index = NearDuplicateIndex(':memory:')
+    prime = (1 << 61) - 1
+    hashes = [int(x) for x in shingles(STORY)]
+    expected = [min((int(a) * x + int(b)) % prime & 0xFFFFFFFF for x in hashes)
+                for a, b in zip(index._a, index._b)]
+
+    assert index.signature(STORY).tolist() == expected
+    assert max(hashes) < 1 << 32 and int(index._a.max()) < 1 << 32 and int(index._b.max()) < 1 << 32
+
+
+def test_reworded_copies_are_matched_and_new_stories_are_not():
+    index = NearDuplicateIndex(':memory:')
+    index.add_articles([{'url': 'https://example.com/a', 'heading': 'Flood warning', 'content': STORY}])
+    copy = {'url': 'https://example.com/b', 'heading': 'Flood warning', 'content': STORY + ' Updated.'}
+    other = {'url': 'https://example.com/c', 'heading': 'Election', 'content': 'Voters queued at polling stations.'}
+
+    matches = index.check_articles([copy, other])
+    assert matches[0] is not None and matches[1] is None
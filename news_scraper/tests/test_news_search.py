@@ -0,0 +1,171 @@
+import threading
+import time
+
+import pytest
+
+from conftest import HashEmbedder
+from news_scraper.db.backends import LocalIndex
+from news_scraper.db.segments import SegmentedIndex
+from news_scraper.search.bm25 import BM25Index
+from news_scraper.search.news_search import NewsSearch
+
+
+def vector(models, vector_id, text, **metadata):
+    metadata = dict({'url': f'https://example.com/{vector_id}', 'heading': text, 'source': 'BBC News',
+                     'scraped_ts': 1.0e9}, **metadata)
+    return {'id': vector_id, 'values': models.embedding_model().encode(text), 'metadata': metadata}
+
+
+def urls(results):
+    return sorted(article['url'] for article in results)
+
+
+@pytest.mark.parametrize('index_class', [LocalIndex, SegmentedIndex])
+def test_indexes_saved_by_another_process_are_reloaded(tmp_path, models, index_class):
+    writer = index_class(str(tmp_path))
+    writer.upsert([vector(models, 'a', 'flood warning')])
+    writer.flush()
+    # Opened separately, as by a search server running next to an ingest
+    search = NewsSearch(backend=index_class(str(tmp_path)), models=models)
+
+    assert urls(search.search('flood warning', min_score=-1)) == ['https://example.com/a']
+    search.search('flood warning', min_score=-1)
+    assert search.cache_stats()['results']['hits'] == 1
+
+    writer.upsert([vector(models, 'b', 'flood warning issued')])
+    writer.flush()
+    assert urls(search.search('flood warning', min_score=-1)) == ['https://example.com/a', 'https://example.com/b']
+    assert search.cache_stats()['results']['hits'] == 1
+
+    writer.delete(['a'])
+    writer.flush()
+    assert urls(search.search('flood warning', min_score=-1)) == ['https://example.com/b']
+
+
+def test_lexical_index_saved_by_another_process_is_reloaded(tmp_path, models):
+    index = LocalIndex(str(tmp_path / 'index'))
+    index.upsert([vector(models, 'a', 'flood warning')])
+    path = str(tmp_path / 'lexical.json.gz')
+    writer = BM25Index(path)
+    writer.add('a', 'flood warning', 'rivers rising', vector(models, 'a', 'flood warning')['metadata'])
+    writer.save()
+    search = NewsSearch(backend=index, models=models, lexical_index=BM25Index(path))
+
+    assert urls(search.search('flood', mode='lexical')) == ['https://example.com/a']
+    writer.add('b', 'flood defences', 'new walls', vector(models, 'b', 'flood defences')['metadata'])
+    writer.save()
+    assert urls(search.search('flood', mode='lexical')) == ['https://example.com/a', 'https://example.com/b']
+    assert search.cache_stats()['results']['hits'] == 0
+
+
+def test_unsaved_writes_are_not_replaced_by_a_reload(tmp_path, models):
+    writer = LocalIndex(str(tmp_path))
+    writer.upsert([vector(models, 'a', 'flood warning')])
+    writer.flush()
+    local = LocalIndex(str(tmp_path))
+    local.upsert([vector(models, 'c', 'flood warning lifted')])
+
+    writer.upsert([vector(models, 'b', 'flood warning issued')])
+    writer.flush()
+    local.refresh()
+    assert sorted(local.ids()) == ['a', 'c']
+
+
+def test_backends_without_a_version_are_cached_until_the_ttl_expires(tmp_path, models):
+    class UnversionedIndex(LocalIndex):
+        version = None
+
+    index = UnversionedIndex(str(tmp_path))
+    index.upsert([vector(models, 'a', 'flood warning')])
+    search = NewsSearch(backend=index, models=models, result_cache_ttl=0.2)
+
+    first = search.search('flood warning', min_score=-1)
+    index.upsert([vector(models, 'b', 'flood warning')])
+    second = search.search('flood warning', min_score=-1)
+    assert second == first and search.cache_stats()['results']['hits'] == 1
+
+    time.sleep(0.25)
+    assert len(search.search('flood warning', min_score=-1)) == 2
+
+
+class SlowIndex(LocalIndex):
+    """LocalIndex whose queries take delay seconds, recording how many ran at once"""
+
+    def __init__(self, path, delay=0.1):
+        super().__init__(path)
+        self.delay = delay
+        self.running = 0
+        self.most_running = 0
+        self._count_lock = threading.Lock()
+
+    def query(self, *args, **kwargs):
+        with self._count_lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(self.delay)
+        with self._count_lock:
+            self.running -= 1
+        return super().query(*args, **kwargs)
+
+
+@pytest.fixture
+def stories(tmp_path, models):
+    index = SlowIndex(str(tmp_path / 'index'), delay=0)
+    texts = ['flood warning', 'rain expected', 'election day', 'flood defences', 'storm damage']
+    index.upsert([vector(models, f'v{i}', text) for i, text in enumerate(texts)])
+    lexical = BM25Index()
+    for i, text in enumerate(texts):
+        lexical.add(f'v{i}', text, text, vector(models, f'v{i}', text)['metadata'])
+    return index, lexical
+
+
+@pytest.mark.parametrize('mode', ['vector', 'lexical', 'hybrid'])
+def test_search_many_matches_one_search_per_query(stories, models, mode):
+    index, lexical = stories
+    queries = ['flood', 'Election  day', 'storm', 'flood', 'rain expected']
+    expected = [NewsSearch(backend=index, models=models, lexical_index=lexical, result_cache_ttl=0)
+                .search(query, min_score=-1, mode=mode) for query in queries]
+    search = NewsSearch(backend=index, models=models, lexical_index=lexical, result_cache_ttl=0)
+
+    assert search.search_many(queries, min_score=-1, mode=mode, batch_size=2, max_workers=3) == expected
+
+
+def test_each_batch_is_encoded_in_one_call(stories, models):
+    calls = []
+
+    class RecordingEmbedder(HashEmbedder):
+        def encode(self, texts, **kwargs):
+            calls.append(texts)
+            return super().encode(texts, **kwargs)
+
+    models.embedder = RecordingEmbedder()
+    search = NewsSearch(backend=stories[0], models=models)
+    search.search_many(['flood', 'Flood', 'storm', 'rain', 'flood'], batch_size=3)
+
+    assert calls == [['flood', 'storm'], ['rain']]
+
+
+def test_index_lookups_run_concurrently(stories, models):
+    index = stories[0]
+    index.delay = 0.1
+    search = NewsSearch(backend=index, models=models)
+
+    start = time.perf_counter()
+    results = search.search_many([f'flood {i}' for i in range(8)], min_score=-1, max_workers=4)
+    elapsed = time.perf_counter() - start
+
+    assert len(results) == 8 and all(results)
+    assert index.most_running == 4 and elapsed < 0.6
+
+
+def test_queries_are_read_lazily_one_batch_at_a_time(stories, models):
+    pulled = []
+
+    def queries():
+        for i in range(10):
+            pulled.append(i)
+            yield f'flood {i}'
+
+    results = NewsSearch(backend=stories[0], models=models).iter_search_many(queries(), batch_size=3)
+    next(results)
+    assert pulled == [0, 1, 2]
@@ -0,0 +1,87 @@
+import pytest
+
+from conftest import StubModels
+from news_scraper.db.backends import LocalIndex
+from news_scraper.db.vector_store import VectorDBStorage
+from news_scraper.pipeline import IngestPipeline
+from news_scraper.scrapers.bbc_scraper import NewsScraper
+from news_scraper.scrapers.url_index import SeenURLIndex
+from news_scraper.search.bm25 import BM25Index
+
+ARTICLE = '<h1>Flood warning</h1><article><p>Rivers are rising across the region.</p></article>'
+
+
+class CountingIndex(LocalIndex):
+    flushes = 0
+
+    def flush(self):
+        self.flushes += 1
+        super().flush()
+
+
+class CountingBM25Index(BM25Index):
+    saves = 0
+
+    def save(self):
+        self.saves += 1
+        super().save()
+
+
+def pipeline_for(tmp_path, server, **options):
+    scraper = NewsScraper(server.url, delay=0, url_index=SeenURLIndex(str(tmp_path / 'seen.sqlite')))
+    scraper._stop_words = set()
+    storage = VectorDBStorage(backend=CountingIndex(str(tmp_path / 'index')), models=StubModels(),
+                              lexical_index=CountingBM25Index(str(tmp_path / 'lexical.json.gz')))
+    return IngestPipeline(scraper, storage, fetch_workers=2, max_batch_wait=0.01, **options)
+
+
+def test_urls_are_marked_seen_only_once_stored(tmp_path, local_server, monkeypatch):
+    server = local_server(lambda request: (200, {'Content-Type': 'text/html'}, ARTICLE))
+    pipeline = pipeline_for(tmp_path, server)
+    url_index = pipeline.scraper.url_index
+    urls = [f'{server.url}/news/articles/1']
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('embedding failed')
+
+    with monkeypatch.context() as patched:
+        patched.setattr(pipeline.storage, 'embed_articles', fail)
+        stats = pipeline.run(urls=urls)
+    assert stats['stored'] == 0 and stats['stages']['embed']['errors'] == 1
+    assert url_index.filter_unseen(urls) == urls
+
+    # The next run retries the article, even though the same pipeline took it before
+    stats = pipeline.run(urls=url_index.filter_unseen(urls))
+    assert stats['stored'] == 1
+    assert url_index.filter_unseen(urls) == []
+    assert pipeline.storage.get_index(pipeline.storage.index_name).describe_index_stats()['total_vector_count'] == 1
+
+
+def test_unchanged_articles_are_marked_seen(tmp_path, local_server):
+    server = local_server(lambda request: (200, {'Content-Type': 'text/html'}, ARTICLE))
+    pipeline = pipeline_for(tmp_path, server)
+    urls = [f'{server.url}/news/articles/1']
+    pipeline.run(urls=urls)
+    pipeline.scraper.url_index.close()
+    pipeline.scraper.url_index = SeenURLIndex(str(tmp_path / 'fresh.sqlite'))
+
+    stats = pipeline.run(urls=urls)
+    assert stats['stored'] == 0
+    assert pipeline.scraper.url_index.filter_unseen(urls) == []
+
+
+@pytest.mark.parametrize('persist_rows, fewest, most', [(1000, 1, 1), (2, 3, 5)])
+def test_indexes_are_saved_per_threshold_not_per_batch(tmp_path, local_server, persist_rows, fewest, most):
+    server = local_server(lambda request: (200, {'Content-Type': 'text/html'}, ARTICLE))
+    pipeline = pipeline_for(tmp_path, server, upsert_batch_size=2, persist_rows=persist_rows)
+    urls = [f'{server.url}/news/articles/{i}' for i in range(8)]
+
+    stats = pipeline.run(urls=urls)
+
+    assert stats['stored'] == 8 and stats['stages']['upsert']['processed'] == 8
+    storage = pipeline.storage
+    assert storage.backend.flushes == storage.lexical_index.saves
+    # One save at the end of the run, plus one whenever persist_rows articles are waiting
+    assert fewest <= storage.backend.flushes <= most
+    assert len(LocalIndex(str(tmp_path / 'index'))) == 8 and len(BM25Index(storage.lexical_index.path)) == 8
+    assert pipeline.scraper.url_index.filter_unseen(urls) == []
@@ -0,0 +1,109 @@
+from datetime import datetime
+
+import pytest
+
+from news_scraper.db.backends import LocalIndex
+from news_scraper.db.filters import build_filter
+from news_scraper.db.segments import SegmentedIndex
+from news_scraper.hashing import article_id
+from news_scraper.metrics import metrics
+from news_scraper.near_duplicates import NearDuplicateIndex
+from news_scraper.search.bm25 import BM25Index
+
+
+def day(n):
+    return datetime(2025, 9, n, 12).timestamp()
+
+
+def vector(models, vector_id, scraped_ts, source='BBC News'):
+    return {'id': vector_id, 'values': models.embedding_model().encode(f'flood story {vector_id}'),
+            'metadata': {'url': f'https://example.com/{vector_id}', 'source': source, 'scraped_ts': scraped_ts}}
+
+
+@pytest.fixture
+def segments(tmp_path, models):
+    index = SegmentedIndex(str(tmp_path))
+    index.upsert([vector(models, f'a{n}', day(n)) for n in range(1, 6)]
+                 + [vector(models, f'g{n}', day(n), source='The Guardian') for n in range(1, 6)])
+    index.flush()
+    return index
+
+
+@pytest.fixture
+def scanned():
+    metrics.reset()
+    metrics.enable()
+
+    def counts():
+        counters = metrics.snapshot()['counters']
+        return (counters.get('index_segments{outcome=scanned}', 0),
+                counters.get('index_segments{outcome=pruned}', 0))
+
+    yield counts
+    metrics.disable()
+    metrics.reset()
+
+
+def query_ids(index, models, filter):
+    result = index.query(models.embedding_model().encode('flood story'), top_k=20, filter=filter)
+    return sorted(match['id'] for match in result['matches'])
+
+
+def test_vectors_are_split_into_daily_segments(segments):
+    stats = segments.segment_stats()
+    assert [s['name'] for s in stats] == [f'2025090{n}' for n in range(1, 6)]
+    assert stats[0]['sources'] == {'BBC News': 1, 'The Guardian': 1}
+
+
+def test_time_filters_skip_segments_outside_the_range(segments, models, scanned):
+    ids = query_ids(segments, models, build_filter(since=day(4) - 3600))
+
+    assert ids == ['a4', 'a5', 'g4', 'g5']
+    assert scanned() == (2, 3)
+
+
+def test_source_filters_skip_segments_without_the_source(segments, models, scanned):
+    assert query_ids(segments, models, build_filter(sources=['The Guardian'])) == [f'g{n}' for n in range(1, 6)]
+    assert scanned() == (5, 0)
+
+    segments.upsert([vector(models, 'r1', day(9), source='Reuters')])
+    metrics.reset()
+    assert query_ids(segments, models, build_filter(sources=['Reuters'])) == ['r1']
+    assert scanned() == (1, 5)
+
+
+def test_results_match_an_unsegmented_index(tmp_path, segments, models):
+    flat = LocalIndex(str(tmp_path / 'flat'))
+    flat.upsert(segments.fetch([f'{prefix}{n}' for prefix in 'ag' for n in range(1, 6)]).values())
+    filter = build_filter(since=day(2), until=day(4), sources=['BBC News'])
+
+    assert query_ids(segments, models, filter) == query_ids(flat, models, filter) == ['a2', 'a3']
+
+
+def test_compact_and_drop_keep_the_manifest_in_step(tmp_path, segments, models):
+    assert segments.compact(before=day(4)) == 3
+    assert [s['name'] for s in segments.segment_stats()] == ['202509', '20250904', '20250905']
+    assert query_ids(segments, models, build_filter(until=day(2) + 1)) == ['a1', 'a2', 'g1', 'g2']
+
+    assert sorted(segments.drop(before=day(5))) == ['a1', 'a2', 'a3', 'a4', 'g1', 'g2', 'g3', 'g4']
+    reopened = SegmentedIndex(str(tmp_path))
+    assert [s['name'] for s in reopened.segment_stats()] == ['20250905']
+    assert len(reopened) == 2
+
+
+def test_dropped_articles_can_be_removed_from_the_lexical_and_near_duplicate_indexes(tmp_path):
+    story = {'url': 'https://example.com/old', 'heading': 'Flood warning',
+             'content': 'Rivers across the region rose overnight and several roads were closed by the council.'}
+    copy = dict(story, url='https://example.com/copy')
+    near_duplicates = NearDuplicateIndex(str(tmp_path / 'near_duplicates.sqlite'))
+    near_duplicates.add_articles([story])
+    assert near_duplicates.check_articles([copy])[0] is not None
+    lexical = BM25Index(str(tmp_path / 'lexical.json.gz'))
+    lexical.add(article_id(story['url']), story['heading'], story['content'], {'url': story['url']})
+
+    assert near_duplicates.remove([article_id(story['url']), 'unknown']) == 1
+    assert lexical.remove([article_id(story['url']), 'unknown']) == 1
+
+    assert lexical.search('flood') == []
+    assert near_duplicates.canonical(copy['url']) is None
+    assert near_duplicates.check_articles([copy]) == [None]
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from news_scraper.search.server import SearchServer
+
+
+class FakeSearch:
+    """NewsSearch stand-in answering each query with itself; searches wait on release when given"""
+
+    def __init__(self, release=None):
+        self.release = release
+        self.batches = []
+
+    def embed_query(self, query):
+        return None
+
+    def _resolve_mode(self, mode=None):
+        return mode or 'vector'
+
+    def cache_stats(self):
+        return {}
+
+    def search_many(self, queries, **options):
+        if self.release is not None:
+            self.release.wait(5)
+        self.batches.append(list(queries))
+        return [[{'url': query}] for query in queries]
+
+
+async def request(port, raw):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(raw)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), head.decode('latin-1'), json.loads(body) if body else None
+
+
+def get(path):
+    return f'GET {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n\r\n'.encode('latin-1')
+
+
+def post(body, content_length=None):
+    content_length = len(body) if content_length is None else content_length
+    return (f'POST /search HTTP/1.1\r\nHost: test\r\nConnection: close\r\n'
+            f'Content-Length: {content_length}\r\n\r\n').encode('latin-1') + body
+
+
+def run(server, scenario):
+    async def main():
+        await server.start()
+        try:
+            return await scenario(server.port)
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+
+def test_search_over_get_and_post():
+    server = SearchServer(FakeSearch(), port=0)
+
+    async def scenario(port):
+        return (await request(port, get('/search?q=flood&top_k=3')),
+                await request(port, post(b'{"query": "storm"}')))
+
+    (get_status, _, get_body), (post_status, _, post_body) = run(server, scenario)
+    assert (get_status, get_body['results']) == (200, [{'url': 'flood'}])
+    assert (post_status, post_body['results']) == (200, [{'url': 'storm'}])
+
+
+def test_concurrent_requests_share_a_batch():
+    search = FakeSearch()
+    server = SearchServer(search, port=0, batch_window=0.05)
+
+    async def scenario(port):
+        return await asyncio.gather(*(request(port, get(f'/search?q=q{i}')) for i in range(8)))
+
+    responses = run(server, scenario)
+    assert all(status == 200 for status, _, _ in responses)
+    assert len(search.batches) < 8
+
+
+def test_requests_beyond_the_queue_are_shed_with_503():
+    release = threading.Event()
+    server = SearchServer(FakeSearch(release), port=0, batch_window=0, max_batch_size=1, max_queue=2)
+
+    async def scenario(port):
+        # One search blocks the batcher; the queue then fills and the rest are turned away
+        tasks = [asyncio.create_task(request(port, get(f'/search?q=q{i}'))) for i in range(6)]
+        await asyncio.sleep(0.3)
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    responses = run(server, scenario)
+    statuses = sorted(status for status, _, _ in responses)
+    assert 503 in statuses and 200 in statuses
+    assert all('Retry-After: 1' in head for status, head, _ in responses if status == 503)
+    assert server.shed == statuses.count(503)
+
+
+@pytest.mark.parametrize('content_length', ['abc', '-5', '1.5', '²'])
+def test_invalid_content_length_is_rejected_with_400(content_length):
+    server = SearchServer(FakeSearch(), port=0)
+
+    async def scenario(port):
+        raw = (f'POST /search HTTP/1.1\r\nHost: test\r\nContent-Length: {content_length}\r\n\r\n'
+               '{"query": "flood"}').encode('utf-8')
+        return await request(port, raw)
+
+    status, _, body = run(server, scenario)
+    assert status == 400
+    assert 'Content-Length' in body['error']
+
+
+def test_oversized_body_is_rejected_with_413():
+    server = SearchServer(FakeSearch(), port=0, max_body_bytes=16)
+
+    async def scenario(port):
+        return await request(port, post(b'{"query": "' + b'x' * 64 + b'"}'))
+
+    assert run(server, scenario)[0] == 413
+
+
+def test_invalid_parameters_are_rejected_with_400():
+    server = SearchServer(FakeSearch(), port=0)
+
+    async def scenario(port):
+        return [await request(port, get(path)) for path in
+                ('/search', '/search?q=flood&top_k=0', '/search?q=flood&since=yesterday')]
+
+    assert [status for status, _, _ in run(server, scenario)] == [400, 400, 400]
@@ -0,0 +1,79 @@
+import numpy as np
+
+from conftest import HashEmbedder, StubModels
+from news_scraper.db.backends import LocalIndex
+from news_scraper.db.vector_store import VectorDBStorage
+from news_scraper.summarizers import ExtractiveSummarizer, SummaryCache, split_sentences
+
+ARTICLE = ('Floods closed roads across the county on Monday. '
+           'The county council said flood water closed ten roads.\n\n'
+           'A bakery reopened after a refit.Its owner was pleased. '
+           'Flood warnings remain for roads near the river, the council said.')
+
+
+def test_sentences_split_on_punctuation_run_together_text_and_paragraphs():
+    assert split_sentences(ARTICLE) == [
+        'Floods closed roads across the county on Monday.',
+        'The county council said flood water closed ten roads.',
+        'A bakery reopened after a refit.',
+        'Its owner was pleased.',
+        'Flood warnings remain for roads near the river, the council said.',
+    ]
+
+
+def test_central_sentences_are_kept_in_article_order():
+    summary = ExtractiveSummarizer(num_sentences=2).summarize([ARTICLE])[0]
+    assert summary == ('Floods closed roads across the county on Monday. '
+                       'The county council said flood water closed ten roads.')
+
+
+def test_rank_scores_form_a_distribution():
+    summarizer = ExtractiveSummarizer()
+    scores = summarizer._rank(summarizer._term_vectors(split_sentences(ARTICLE)))
+    # The bakery sentences share no terms with the flood story and rank last
+    assert abs(scores.sum() - 1) < 1e-5
+    assert sorted(np.argsort(scores)[:2]) == [2, 3] and scores.argmax() == 1
+
+
+def test_word_budget_and_short_texts():
+    summarizer = ExtractiveSummarizer(num_sentences=3)
+    summary = summarizer.summarize([ARTICLE], max_length=12)[0]
+    assert summary == 'The county council said flood water closed ten roads.'
+    assert summarizer.summarize(['', 'Only one sentence here.']) == ['', 'Only one sentence here.']
+
+
+def test_sentence_embeddings_are_encoded_in_one_call():
+    calls = []
+
+    class RecordingEmbedder(HashEmbedder):
+        def encode(self, texts, **kwargs):
+            calls.append(len(texts))
+            return super().encode(texts, **kwargs)
+
+    models = StubModels()
+    models.embedder = RecordingEmbedder()
+    summaries = ExtractiveSummarizer(num_sentences=2, use_embeddings=True, models=models).summarize(
+        [ARTICLE, 'First point. Second point. Third point.'])
+
+    assert calls == [8] and len(summaries) == 2
+    assert all(len(split_sentences(summary)) == 2 for summary in summaries)
+
+
+def test_cached_summaries_are_not_recomputed(tmp_path, models):
+    class CountingSummarizer(ExtractiveSummarizer):
+        texts = 0
+
+        def summarize(self, texts, **kwargs):
+            CountingSummarizer.texts += len(texts)
+            return super().summarize(texts, **kwargs)
+
+    cache = SummaryCache(str(tmp_path / 'summaries.sqlite'))
+    storage = VectorDBStorage(backend=LocalIndex(str(tmp_path / 'index')), models=models,
+                              summarizer=CountingSummarizer(), summary_cache=cache)
+    first = storage.generate_summaries([ARTICLE, 'Short text.', ARTICLE])
+    second = storage.generate_summaries([ARTICLE, 'Short text.'])
+
+    assert second == first[:2] and CountingSummarizer.texts == 2
+    assert cache.stats() == {'hits': 2, 'misses': 3} and len(cache) == 2
+    storage.generate_summaries([ARTICLE], max_length=20)
+    assert CountingSummarizer.texts == 3
@@ -0,0 +1,106 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from conftest import StubModels
+from news_scraper.db import upsert
+from news_scraper.db.backends import LocalIndex
+from news_scraper.db.upsert import ParallelUpserter, UpsertCheckpoint, batch_by_size, vector_bytes
+from news_scraper.db.vector_store import VectorDBStorage
+
+
+class FlakyIndex(LocalIndex):
+    """LocalIndex failing its first `failures` upserts, and every upsert once ok_limit have succeeded"""
+
+    def __init__(self, path, failures=0, ok_limit=None):
+        super().__init__(path)
+        self.failures = failures
+        self.ok_limit = ok_limit
+        self.attempts = 0
+        self.successes = 0
+        self._flaky_lock = threading.Lock()
+
+    def upsert(self, vectors):
+        with self._flaky_lock:
+            self.attempts += 1
+            failed = self.attempts <= self.failures or (self.ok_limit is not None
+                                                        and self.successes >= self.ok_limit)
+            if not failed:
+                self.successes += 1
+        if failed:
+            raise ConnectionError('index unavailable')
+        super().upsert(vectors)
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(upsert, 'time', SimpleNamespace(sleep=lambda seconds: None))
+
+
+def vectors(count, dimension=384):
+    return [{'id': f'v{i}', 'values': np.full(dimension, i + 1, dtype=np.float32),
+             'metadata': {'url': f'https://example.com/{i}'}}
+            for i in range(count)]
+
+
+def test_batches_respect_count_and_size_limits():
+    items = vectors(10)
+    assert [len(batch) for batch in batch_by_size(items, batch_size=4)] == [4, 4, 2]
+    batches = batch_by_size(items, batch_size=100, max_bytes=3 * vector_bytes(items[0]))
+    assert [len(batch) for batch in batches] == [3, 3, 3, 1]
+
+
+def test_failed_batches_are_retried(tmp_path, no_backoff):
+    index = FlakyIndex(str(tmp_path), failures=2)
+    upserter = ParallelUpserter(index, max_in_flight=2, batch_size=3, max_retries=2)
+
+    assert upserter.upsert(vectors(10)) == 10
+    assert index.attempts == 4 + 2
+    assert index.describe_index_stats()['total_vector_count'] == 10
+
+
+def test_batches_that_succeeded_are_acknowledged_before_the_error(tmp_path, no_backoff):
+    index = FlakyIndex(str(tmp_path), ok_limit=2)
+    checkpoint = UpsertCheckpoint(str(tmp_path / 'checkpoint.sqlite'))
+    items = vectors(10)
+    checkpoint.save(items)
+    upserter = ParallelUpserter(index, max_in_flight=1, batch_size=3, max_retries=1, checkpoint=checkpoint)
+
+    with pytest.raises(ConnectionError):
+        upserter.upsert(items)
+    assert checkpoint.stats() == {'pending': 4, 'acked': 6}
+    # Acknowledged vectors are flushed, so a reopened index has them
+    assert LocalIndex(str(tmp_path)).describe_index_stats()['total_vector_count'] == 6
+
+
+def test_ingest_resumes_prepared_vectors_from_the_checkpoint(tmp_path, no_backoff):
+    articles_file = tmp_path / 'news_articles_20250901_120000.jsonl'
+    with open(articles_file, 'w', encoding='utf-8') as f:
+        for i in range(5):
+            f.write(json.dumps({'url': f'https://example.com/{i}', 'heading': f'Story {i}',
+                                'content': f'Rivers rose in town {i}. Roads were closed.', 'keywords': [],
+                                'source': 'BBC News', 'timestamp': '20250901_120000'}) + '\n')
+    checkpoint = UpsertCheckpoint(str(tmp_path / 'checkpoint.sqlite'))
+
+    failing = VectorDBStorage(backend=FlakyIndex(str(tmp_path / 'index'), ok_limit=0), models=StubModels())
+    with pytest.raises(ConnectionError):
+        failing.store_articles(str(articles_file), checkpoint=checkpoint)
+    assert checkpoint.stats() == {'pending': 5, 'acked': 0}
+
+    storage = VectorDBStorage(backend=LocalIndex(str(tmp_path / 'index')), models=StubModels())
+    prepared = []
+    prepare = storage.prepare_article_vectors
+
+    def counting_prepare(articles, **kwargs):
+        prepared.extend(articles)
+        return prepare(articles, **kwargs)
+
+    storage.prepare_article_vectors = counting_prepare
+    storage.store_articles(str(articles_file), checkpoint=checkpoint)
+
+    assert prepared == []
+    assert storage.get_index(storage.index_name).describe_index_stats()['total_vector_count'] == 5
+    assert len(checkpoint) == 0
@@ -0,0 +1,57 @@
+from news_scraper.db.article_store import ArticleWriter
+from news_scraper.hashing import content_hash
+from news_scraper.scrapers.bbc_scraper import NewsScraper
+from news_scraper.scrapers.url_index import SeenURLIndex
+
+
+def news_site(article_numbers):
+    def handler(request):
+        if request.path == '/':
+            links = ''.join(f'<a href="/news/articles/{n}">Story {n}</a>' for n in article_numbers)
+            return 200, {'Content-Type': 'text/html'}, f'<html>{links}<a href="/sport">Sport</a></html>'
+        return 200, {'Content-Type': 'text/html'}, \
+            f'<h1>Story {request.path[-1]}</h1><article><p>Rivers rose in town {request.path[-1]}.</p></article>'
+    return handler
+
+
+def scrape(server, index_path):
+    scraper = NewsScraper(server.url, delay=0, url_index=SeenURLIndex(index_path))
+    scraper._stop_words = set()
+    try:
+        return scraper.scrape_latest_news(limit=10)
+    finally:
+        scraper.close()
+
+
+def test_later_runs_download_only_new_articles(tmp_path, local_server):
+    server = local_server(news_site([1, 2]))
+    index_path = str(tmp_path / 'seen.sqlite')
+    assert [a['heading'] for a in scrape(server, index_path)] == ['Story 1', 'Story 2']
+
+    server.handler = news_site([3, 1, 2])
+    server.requests.clear()
+    assert [a['heading'] for a in scrape(server, index_path)] == ['Story 3']
+    assert server.paths() == ['/', '/news/articles/3']
+
+
+def test_index_records_scrape_time_and_content_hash(tmp_path):
+    index = SeenURLIndex(str(tmp_path / 'seen.sqlite'))
+    article = {'url': 'https://example.com/1', 'heading': 'Flood warning', 'content': 'Rivers rose.',
+               'timestamp': '20250901_120000'}
+    index.add(article)
+
+    assert index.get(article['url']) == ('20250901_120000', content_hash(article))
+    assert index.get('https://example.com/2') is None
+    assert index.filter_unseen(['https://example.com/2', article['url'], 'https://example.com/3']) == \
+        ['https://example.com/2', 'https://example.com/3']
+
+
+def test_saved_articles_files_seed_the_index(tmp_path):
+    path = str(tmp_path / 'news_articles.jsonl')
+    with ArticleWriter(path) as writer:
+        for n in range(3):
+            writer.write({'url': f'https://example.com/{n}', 'heading': f'Story {n}', 'content': 'Text.'})
+    index = SeenURLIndex(str(tmp_path / 'seen.sqlite'))
+
+    assert index.import_articles_file(path, batch_size=2) == 3
+    assert len(index) == 3 and 'https://example.com/2' in index
@@ -0,0 +1,135 @@
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+
+from conftest import HashEmbedder, StubModels
+from news_scraper.db.article_store import ArticleWriter
+from news_scraper.db.backends import LocalIndex, PineconeBackend
+from news_scraper.db.vector_store import VectorDBStorage
+from news_scraper.hashing import article_id
+from news_scraper.summarizers import AbstractiveSummarizer
+
+
+def articles(count):
+    return [{'url': f'https://example.com/{i}', 'heading': f'Story {i}',
+             'content': f'Rivers rose in town {i}. ' * (i + 1) + '\n\nRoads were closed.',
+             'keywords': ['rivers'], 'source': 'BBC News', 'timestamp': '20250901_120000'}
+            for i in range(count)]
+
+
+class RecordingEmbedder(HashEmbedder):
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        self.calls.append((1 if isinstance(texts, str) else len(texts), batch_size))
+        return super().encode(texts, batch_size=batch_size, **kwargs)
+
+
+def storage_for(tmp_path, models=None):
+    return VectorDBStorage(backend=LocalIndex(str(tmp_path / 'index')), models=models or StubModels())
+
+
+def test_batched_vectors_match_one_at_a_time(tmp_path):
+    storage = storage_for(tmp_path)
+    items = articles(5)
+    batched = storage.prepare_article_vectors(items, batch_size=2, summary_batch_size=2)
+    single = [storage.prepare_article_vector(article) for article in items]
+
+    assert [v['id'] for v in batched] == [v['id'] for v in single]
+    assert [v['metadata'] for v in batched] == [v['metadata'] for v in single]
+    for batched_vector, single_vector in zip(batched, single):
+        assert isinstance(batched_vector['values'], np.ndarray) and batched_vector['values'].dtype == np.float32
+        assert np.allclose(batched_vector['values'], single_vector['values'])
+
+
+def test_article_texts_are_embedded_in_one_batched_call(tmp_path):
+    models = StubModels()
+    models.embedder = RecordingEmbedder()
+    storage_for(tmp_path, models).prepare_article_vectors(articles(10), batch_size=4)
+
+    assert models.embedder.calls == [(10, 4)]
+
+
+def test_abstractive_summaries_run_in_length_sorted_batches():
+    batches = []
+
+    def pipeline(texts, batch_size, **kwargs):
+        batches.append([len(text) for text in texts])
+        assert batch_size == len(texts)
+        return [{'summary_text': f' summary of {len(text)} '} for text in texts]
+
+    class Models:
+        def summarizer(self, name):
+            return pipeline
+
+    texts = [article['content'] for article in articles(5)][::-1]
+    summarizer = AbstractiveSummarizer(models=Models())
+    summaries = summarizer.summarize(texts, batch_size=2)
+
+    lengths = [len(summarizer._summary_input(text)) for text in texts]
+    assert summaries == [f'summary of {length}' for length in lengths]
+    assert batches == [sorted(lengths)[0:2], sorted(lengths)[2:4], sorted(lengths)[4:]]
+
+
+class FetchCountingIndex(LocalIndex):
+    def __init__(self, path):
+        super().__init__(path)
+        self.fetches = []
+
+    def fetch(self, ids):
+        self.fetches.append(len(ids))
+        return super().fetch(ids)
+
+
+def write_articles(path, items):
+    with ArticleWriter(str(path)) as writer:
+        for article in items:
+            writer.write(article)
+    return str(path)
+
+
+def test_article_ids_are_the_same_in_every_process():
+    url = 'https://example.com/news/articles/1'
+    code = f'from news_scraper.hashing import article_id; print(article_id({url!r}))'
+    other = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert other.strip() == article_id(url)
+
+
+def test_reingesting_looks_up_ids_in_bulk_and_skips_unchanged_articles(tmp_path):
+    models = StubModels()
+    models.embedder = RecordingEmbedder()
+    index = FetchCountingIndex(str(tmp_path / 'index'))
+    storage = VectorDBStorage(backend=index, models=models)
+    items = articles(6)
+    storage.store_articles(write_articles(tmp_path / 'first.jsonl', items), chunk_size=4)
+    assert index.fetches == [4, 2] and models.embedder.calls == [(4, 32), (2, 32)]
+
+    index.fetches.clear()
+    models.embedder.calls.clear()
+    items[2] = dict(items[2], content='Rivers fell overnight.')
+    storage.store_articles(write_articles(tmp_path / 'second.jsonl', items), chunk_size=4)
+
+    assert index.fetches == [4, 2] and models.embedder.calls == [(1, 32)]
+    assert index.describe_index_stats()['total_vector_count'] == 6
+    assert index.fetch([article_id(items[2]['url'])])[article_id(items[2]['url'])]['metadata']['content_preview'] == \
+        'Rivers fell overnight.'
+
+
+def test_pinecone_fetches_are_batched():
+    requested = []
+
+    def fetch(ids):
+        requested.append(len(ids))
+        return {'vectors': {vector_id: SimpleNamespace(values=[0.0], metadata={'url': vector_id})
+                            for vector_id in ids if vector_id != 'v7'}}
+
+    backend = PineconeBackend(SimpleNamespace(fetch=fetch))
+    backend.FETCH_BATCH_SIZE = 4
+    found = backend.fetch([f'v{i}' for i in range(10)])
+
+    assert requested == [4, 4, 2]
+    assert sorted(found) == sorted(f'v{i}' for i in range(10) if i != 7)
+    assert found['v1'] == {'id': 'v1', 'values': [0.0], 'metadata': {'url': 'v1'}}